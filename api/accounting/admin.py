@@ -1,3 +1,41 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AgingDaily, AgingSummary, ClassificationJob, DebtorAccount, HeaderMapping
+
+
+@admin.register(HeaderMapping)
+class HeaderMappingAdmin(admin.ModelAdmin):
+    list_display = ("source", "header_count", "hit_count", "last_used_at", "updated_at")
+    search_fields = ("source", "signature")
+    readonly_fields = ("signature", "created_at", "updated_at", "last_used_at", "hit_count")
+
+
+@admin.register(ClassificationJob)
+class ClassificationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "original_name", "status", "columns_done", "columns_total", "columns_reused",
+                    "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("original_name",)
+    raw_id_fields = ("previous",)
+    readonly_fields = ("created_at", "started_at", "finished_at", "locked_until")
+
+
+@admin.register(DebtorAccount)
+class DebtorAccountAdmin(admin.ModelAdmin):
+    list_display = ("account_code", "name", "phone", "balance", "last_invoice_date", "last_payment_date", "updated_at")
+    search_fields = ("account_code", "name", "phone")
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(AgingSummary)
+class AgingSummaryAdmin(admin.ModelAdmin):
+    list_display = ("source", "bucket", "as_of", "account_count", "balance_kurus")
+    list_filter = ("bucket",)
+    search_fields = ("source",)
+
+
+@admin.register(AgingDaily)
+class AgingDailyAdmin(admin.ModelAdmin):
+    list_display = ("source", "reference_date", "account_count", "balance_kurus", "updated_at")
+    search_fields = ("source",)
+    date_hierarchy = "reference_date"
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AccountingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounting'
+
+    def ready(self):
+        # Memory-map the centroid artifact once; with `gunicorn --preload` the
+        # forked workers share these pages instead of each loading a copy.
+        from accounting.services import centroid_artifacts
+        from accounting.services.classify_columns_with_embeddings import (
+            DEFAULT_EMBED_MODEL,
+            TARGET_EXEMPLARS,
+        )
+        from accounting.services.embedders import resolve_embedder
+
+        try:
+            embedder = resolve_embedder(settings.EMBEDDING_BACKENDS, api_key=settings.OPENAI_API_KEY,
+                                        model=DEFAULT_EMBED_MODEL)
+        except RuntimeError:
+            return
+        centroid_artifacts.preload(settings.CENTROID_ARTIFACT_DIR, embedder.model, TARGET_EXEMPLARS)
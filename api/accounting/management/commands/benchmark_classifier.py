@@ -0,0 +1,87 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.services.benchmark import DEFAULT_HEURISTIC_ROWS, compare, run_benchmark
+
+
+class Command(BaseCommand):
+    help = ("Benchmark workbook loading, heuristics, centroid building and classification on synthetic "
+            "workbooks, offline; prints a JSON report.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, action="append",
+                            help="Workbook rows; repeat for a scaling series (default 1000 and 20000).")
+        parser.add_argument("--columns", type=int, default=None,
+                            help="Columns per workbook (default: one per label plus two distractors).")
+        parser.add_argument("--noise", type=float, default=0.1, help="Format noise, 0..1 (default 0.1).")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (default 3).")
+        parser.add_argument("--samples", type=int, default=10, help="Samples per column (default 10).")
+        parser.add_argument("--sample-tokens", type=int, default=None,
+                            help="Estimated tokens per column payload, 0 for no budget "
+                                 "(default CLASSIFICATION_SAMPLE_TOKENS).")
+        parser.add_argument("--heuristic-rows", type=int, default=DEFAULT_HEURISTIC_ROWS,
+                            help=f"Rows per column fed to the heuristics (default {DEFAULT_HEURISTIC_ROWS}).")
+        parser.add_argument("--latency-ms", type=float, default=50.0,
+                            help="Simulated latency per embeddings request (default 50).")
+        parser.add_argument("--per-input-ms", type=float, default=0.0,
+                            help="Simulated latency per embedded input (default 0).")
+        parser.add_argument("--jitter-ms", type=float, default=0.0, help="Simulated latency jitter (default 0).")
+        parser.add_argument("--vectors", choices=["ngram", "hash"], default="ngram",
+                            help="Fake embedding vectors: local n-gram features or hashes (default ngram).")
+        parser.add_argument("--no-memory", action="store_true",
+                            help="Skip the tracemalloc run per stage (halves the runtime).")
+        parser.add_argument("--workdir", default=None, help="Keep the generated workbooks here.")
+        parser.add_argument("--out", default=None, help="Write the report here instead of stdout.")
+        parser.add_argument("--compare", default=None, help="Baseline report to compare against.")
+        parser.add_argument("--max-regression", type=float, default=0.2,
+                            help="Slowdown per stage that counts as a regression (default 0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        if not 0 <= options["noise"] <= 1:
+            raise CommandError("--noise must be between 0 and 1.")
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"], encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline report: {e}")
+
+        report = run_benchmark(
+            options["rows"] or [1000, 20000],
+            workdir=options["workdir"],
+            columns=options["columns"],
+            noise=options["noise"],
+            seed=options["seed"],
+            fmt=options["format"],
+            repeat=options["repeat"],
+            samples_per_col=options["samples"],
+            heuristic_rows=options["heuristic_rows"],
+            sample_tokens=options["sample_tokens"],
+            memory=not options["no_memory"],
+            client_options={
+                "latency": options["latency_ms"] / 1000,
+                "per_input": options["per_input_ms"] / 1000,
+                "jitter": options["jitter_ms"] / 1000,
+                "vectors": options["vectors"],
+                "seed": options["seed"],
+            },
+        )
+        if baseline is not None:
+            report["comparison"] = compare(baseline, report, options["max_regression"])
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["out"]:
+            with open(options["out"], "w", encoding="utf-8") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None and report["comparison"]["regressions"]:
+            raise CommandError(
+                f"{len(report['comparison']['regressions'])} stage(s) regressed by more than "
+                f"{options['max_regression']:.0%}; see the comparison in the report."
+            )
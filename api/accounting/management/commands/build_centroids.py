@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.services.centroid_artifacts import (
+    get_or_build_centroids,
+    load_centroid_artifact,
+    write_centroid_artifact,
+)
+
+
+class Command(BaseCommand):
+    help = "Embed TARGET_EXEMPLARS and write the centroid artifact (.npy + JSON manifest)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--out", default=str(settings.CENTROID_ARTIFACT_DIR),
+                            help="Artifact directory (default settings.CENTROID_ARTIFACT_DIR).")
+        parser.add_argument("--force", action="store_true",
+                            help="Rebuild even if the existing artifact is up to date.")
+
+    def handle(self, *args, **options):
+        from accounting.services.classify_columns_with_embeddings import (
+            DEFAULT_EMBED_MODEL,
+            TARGET_EXEMPLARS,
+            build_centroids,
+        )
+        from accounting.services.embedders import resolve_embedder
+        from accounting.services.embedding_cache import EmbeddingCache
+
+        cache = None
+        if settings.EMBEDDING_CACHE_PATH:
+            cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        try:
+            embedder = resolve_embedder(settings.EMBEDDING_BACKENDS, api_key=settings.OPENAI_API_KEY,
+                                        model=DEFAULT_EMBED_MODEL, cache=cache)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        model = embedder.model
+
+        out = options["out"]
+        if options["force"]:
+            centroids = build_centroids(embedder, TARGET_EXEMPLARS, model=model)
+            write_centroid_artifact(out, centroids, model, TARGET_EXEMPLARS)
+        elif load_centroid_artifact(out, model, TARGET_EXEMPLARS) is not None:
+            self.stdout.write(f"Centroid artifact for {model} in {out} is up to date.")
+            return
+        else:
+            get_or_build_centroids(embedder, TARGET_EXEMPLARS, model, out)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {embedder.name} centroid artifact ({model}) to {out}"))
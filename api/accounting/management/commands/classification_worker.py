@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounting.services import workbook_cache
+from accounting.services.classification_jobs import RECLAIM_INTERVAL, claim_next_job, reclaim_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = ("Run queued classification jobs and workbook preview conversions (for CLASSIFICATION_JOB_RUNNER='db'). "
+            "Start several to scale out.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty (default 2).")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once the queue is empty instead of polling.")
+        parser.add_argument("--reclaim", action="store_true",
+                            help="Only requeue jobs whose worker went away (expired lease), then exit.")
+
+    def handle(self, *args, **options):
+        if options["reclaim"]:
+            self.stdout.write(str(reclaim_jobs(resubmit=False)))
+            return
+        self.stdout.write("Classification worker started.")
+        last_reclaim = None
+        while True:
+            # jobs of crashed or killed workers go back to the queue
+            if last_reclaim is None or time.monotonic() - last_reclaim >= RECLAIM_INTERVAL:
+                reclaim_jobs(resubmit=False)
+                last_reclaim = time.monotonic()
+            job = claim_next_job()
+            if job is None:
+                conversion = workbook_cache.claim_pending()
+                if conversion is not None:
+                    self.stdout.write(f"Converting workbook {conversion[0]} sheet {conversion[1]}")
+                    workbook_cache.convert_pending(*conversion)
+                    continue
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            self.stdout.write(f"Running job {job.pk} ({job.original_name})")
+            run_job(job.pk)
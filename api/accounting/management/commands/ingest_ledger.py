@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.models import ClassificationJob
+from accounting.services.ledger_ingest import DEFAULT_CHUNK_SIZE, ingest_workbook
+
+
+class Command(BaseCommand):
+    help = "Load a classified workbook into the debtor ledger (upserted by account code)."
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--job", help="Finished classification job id (uses its file and mappings).")
+        source.add_argument("--excel", help="Workbook path; requires --mapping.")
+        parser.add_argument("--mapping", help="mapping.json written by classify_columns_with_embeddings.")
+        parser.add_argument("--sheet", default=None, help="Sheet name or index (optional).")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f"Rows per bulk upsert transaction (default {DEFAULT_CHUNK_SIZE}).")
+
+    def handle(self, *args, **options):
+        sheet = options["sheet"]
+        if options["job"]:
+            try:
+                job = ClassificationJob.objects.get(pk=options["job"])
+            except (ClassificationJob.DoesNotExist, ValueError):
+                raise CommandError(f"Classification job {options['job']} not found.")
+            if job.status != ClassificationJob.DONE:
+                raise CommandError(f"Classification job {job.pk} is {job.status}, not done.")
+            path, mappings, source = job.file.path, job.columns, job.original_name
+            sheet = sheet or job.sheet or None
+        else:
+            if not options["mapping"]:
+                raise CommandError("--excel requires --mapping.")
+            with open(options["mapping"], encoding="utf-8") as f:
+                mappings = json.load(f)["mappings"]
+            path, source = options["excel"], None
+
+        if isinstance(sheet, str) and sheet.isdigit():
+            sheet = int(sheet)
+        try:
+            stats = ingest_workbook(path, mappings, sheet=sheet, source=source, chunk_size=options["chunk_size"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2))
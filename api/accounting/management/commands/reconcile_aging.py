@@ -0,0 +1,21 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from accounting.services.aging import reconcile, refresh_summary
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the aging totals from the debtor ledger and refresh the bucket summaries. "
+            "Ingest keeps them current; run this periodically (e.g. nightly) to correct drift, and "
+            "--refresh-only shortly after midnight so the summaries move to the new day.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refresh-only", action="store_true",
+                            help="Only recompute the bucket summaries as of today (no ledger scan).")
+
+    def handle(self, *args, **options):
+        if options["refresh_only"]:
+            self.stdout.write(json.dumps({"as_of": refresh_summary().isoformat()}, indent=2))
+            return
+        self.stdout.write(json.dumps(reconcile(), indent=2))
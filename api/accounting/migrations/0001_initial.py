@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeaderMapping',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.CharField(max_length=64, unique=True)),
+                ('header_count', models.PositiveIntegerField()),
+                ('headers', models.JSONField(help_text='Normalized headers, in upload order.')),
+                ('mapping', models.JSONField(help_text='Normalized header -> predicted category.')),
+                ('source', models.CharField(blank=True, help_text='ERP / customer the layout came from.', max_length=100)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Header mapping',
+                'verbose_name_plural': 'Header mappings',
+                'indexes': [models.Index(fields=['header_count', '-last_used_at'], name='accounting__header__ab0163_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to='classification_jobs/%Y/%m/%d/')),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('sheet', models.CharField(blank=True, help_text='Sheet name or index; first sheet if blank.', max_length=100)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('columns_total', models.PositiveIntegerField(default=0)),
+                ('columns_done', models.PositiveIntegerField(default=0)),
+                ('columns', models.JSONField(blank=True, default=list, help_text='Per-column progress, then the final mappings.')),
+                ('by_label', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Classification job',
+                'verbose_name_plural': 'Classification jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='accounting__status_019dd7_idx')],
+            },
+        ),
+    ]
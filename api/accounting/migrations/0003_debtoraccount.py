@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_classificationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtorAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_code', models.CharField(help_text='cari_hesap_kodu', max_length=64, unique=True)),
+                ('name', models.CharField(blank=True, help_text='cari_hesap_ismi', max_length=255)),
+                ('phone', models.CharField(blank=True, help_text='telefon_no, digits only', max_length=20)),
+                ('balance', models.DecimalField(blank=True, decimal_places=2, help_text='bakiye', max_digits=18, null=True)),
+                ('last_invoice_date', models.DateField(blank=True, help_text='son_fatura_tarihi', null=True)),
+                ('last_payment_date', models.DateField(blank=True, help_text='son_tahsilat_tarihi', null=True)),
+                ('source', models.CharField(blank=True, help_text='Workbook the row was last loaded from.', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Debtor account',
+                'verbose_name_plural': 'Debtor accounts',
+            },
+        ),
+    ]
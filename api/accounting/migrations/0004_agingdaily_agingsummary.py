@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_debtoraccount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgingDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('reference_date', models.DateField()),
+                ('account_count', models.IntegerField(default=0)),
+                ('balance_kurus', models.BigIntegerField(default=0, help_text='Sum of balances, in kuruş.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Aging daily total',
+                'verbose_name_plural': 'Aging daily totals',
+                'indexes': [models.Index(fields=['reference_date'], name='accounting__referen_6918af_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'reference_date'), name='aging_daily_source_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AgingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('bucket', models.CharField(max_length=10)),
+                ('as_of', models.DateField()),
+                ('account_count', models.IntegerField(default=0)),
+                ('balance_kurus', models.BigIntegerField(default=0, help_text='Sum of balances, in kuruş.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Aging summary',
+                'verbose_name_plural': 'Aging summaries',
+                'constraints': [models.UniqueConstraint(fields=('source', 'bucket'), name='aging_summary_source_bucket_uniq')],
+            },
+        ),
+    ]
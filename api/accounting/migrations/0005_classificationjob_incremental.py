@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_agingdaily_agingsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classificationjob',
+            name='columns_reused',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classificationjob',
+            name='diff',
+            field=models.JSONField(blank=True, default=dict, help_text='Prediction changes against `previous`.'),
+        ),
+        migrations.AddField(
+            model_name='classificationjob',
+            name='fingerprints',
+            field=models.JSONField(blank=True, default=list, help_text='Content fingerprint per column.'),
+        ),
+        migrations.AddField(
+            model_name='classificationjob',
+            name='previous',
+            field=models.ForeignKey(blank=True, help_text='Earlier job for the same workbook; unchanged columns reuse its predictions.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reruns', to='accounting.classificationjob'),
+        ),
+    ]
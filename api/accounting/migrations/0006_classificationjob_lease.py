@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_classificationjob_incremental'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classificationjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classificationjob',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='Lease of the runner holding it; expired leases are reclaimed.', null=True),
+        ),
+    ]
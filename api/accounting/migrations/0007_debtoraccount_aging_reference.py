@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:30
+
+import datetime
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_classificationjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debtoraccount',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('last_invoice_date', 'last_payment_date', models.Value(datetime.date(1, 1, 1), output_field=models.DateField())), name='debtor_aging_reference_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_debtoraccount_aging_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='headermapping',
+            name='confirmed',
+            field=models.JSONField(blank=True, default=dict, help_text='Normalized header -> {confidence, content} for columns a user confirmed or corrected.'),
+        ),
+    ]
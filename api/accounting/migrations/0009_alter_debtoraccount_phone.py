@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0008_headermapping_confirmed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='debtoraccount',
+            name='phone',
+            field=models.CharField(blank=True, help_text='telefon_no in E.164, e.g. +905321112233', max_length=20),
+        ),
+    ]
@@ -1,2 +1,170 @@
+import uuid
+from datetime import date
+
 from django.db import models
+from django.db.models import DateField, Value
+from django.db.models.functions import Coalesce
+
+
+class HeaderMapping(models.Model):
+    """
+    Confirmed column mapping for one header layout (e.g. a customer's monthly
+    Logo/Mikro export), keyed by an order-insensitive signature of its
+    normalized headers so repeat uploads skip classifying confirmed columns.
+    """
+    signature = models.CharField(max_length=64, unique=True)
+    header_count = models.PositiveIntegerField()
+    headers = models.JSONField(help_text="Normalized headers, in upload order.")
+    mapping = models.JSONField(help_text="Normalized header -> predicted category.")
+    confirmed = models.JSONField(
+        default=dict, blank=True,
+        help_text="Normalized header -> {confidence, content} for columns a user confirmed or corrected.",
+    )
+    source = models.CharField(max_length=100, blank=True, help_text="ERP / customer the layout came from.")
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.source or 'layout'} ({self.header_count} columns)"
+
+    class Meta:
+        verbose_name = "Header mapping"
+        verbose_name_plural = "Header mappings"
+        indexes = [
+            models.Index(fields=["header_count", "-last_used_at"]),
+        ]
+
+
+class ClassificationJob(models.Model):
+    """
+    One uploaded workbook waiting for, or going through, column classification.
+    The upload only stores the file; a worker (see
+    accounting.services.classification_jobs) runs the classification.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to="classification_jobs/%Y/%m/%d/")
+    original_name = models.CharField(max_length=255, blank=True)
+    sheet = models.CharField(max_length=100, blank=True, help_text="Sheet name or index; first sheet if blank.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    columns_total = models.PositiveIntegerField(default=0)
+    columns_done = models.PositiveIntegerField(default=0)
+    columns = models.JSONField(default=list, blank=True, help_text="Per-column progress, then the final mappings.")
+    by_label = models.JSONField(default=dict, blank=True)
+    previous = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="reruns",
+        help_text="Earlier job for the same workbook; unchanged columns reuse its predictions.",
+    )
+    fingerprints = models.JSONField(default=list, blank=True, help_text="Content fingerprint per column.")
+    columns_reused = models.PositiveIntegerField(default=0)
+    diff = models.JSONField(default=dict, blank=True, help_text="Prediction changes against `previous`.")
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True,
+                                        help_text="Lease of the runner holding it; expired leases are reclaimed.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.original_name or self.file.name} ({self.status})"
+
+    class Meta:
+        verbose_name = "Classification job"
+        verbose_name_plural = "Classification jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+
+class DebtorAccount(models.Model):
+    """
+    One row of a customer's debtor ledger (cari hesap), upserted by account
+    code on every re-upload (see accounting.services.ledger_ingest).
+    """
+    account_code = models.CharField(max_length=64, unique=True, help_text="cari_hesap_kodu")
+    name = models.CharField(max_length=255, blank=True, help_text="cari_hesap_ismi")
+    phone = models.CharField(max_length=20, blank=True, help_text="telefon_no in E.164, e.g. +905321112233")
+    balance = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True, help_text="bakiye")
+    last_invoice_date = models.DateField(null=True, blank=True, help_text="son_fatura_tarihi")
+    last_payment_date = models.DateField(null=True, blank=True, help_text="son_tahsilat_tarihi")
+    source = models.CharField(max_length=255, blank=True, help_text="Workbook the row was last loaded from.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.account_code} {self.name}".strip()
+
+    class Meta:
+        verbose_name = "Debtor account"
+        verbose_name_plural = "Debtor accounts"
+        indexes = [
+            # aging reference date, as `accounting.services.aging.account_reference()` computes it
+            models.Index(
+                Coalesce("last_invoice_date", "last_payment_date", Value(date(1, 1, 1), output_field=DateField())),
+                name="debtor_aging_reference_idx",
+            ),
+        ]
+
+
+class AgingDaily(models.Model):
+    """
+    Ledger totals per source workbook and aging reference date (the invoice
+    date, else the payment date; `UNDATED` when neither is known). Kept
+    current by ledger ingest deltas, rebuilt by `reconcile_aging`; aging
+    buckets are sums over its date ranges (see accounting.services.aging).
+    """
+    source = models.CharField(max_length=255, blank=True)
+    reference_date = models.DateField()
+    account_count = models.IntegerField(default=0)
+    balance_kurus = models.BigIntegerField(default=0, help_text="Sum of balances, in kuruş.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source or 'ledger'} {self.reference_date}: {self.account_count}"
+
+    class Meta:
+        verbose_name = "Aging daily total"
+        verbose_name_plural = "Aging daily totals"
+        constraints = [
+            models.UniqueConstraint(fields=["source", "reference_date"], name="aging_daily_source_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["reference_date"]),
+        ]
+
+
+class AgingSummary(models.Model):
+    """
+    Receivables totals per source and aging bucket as of `as_of`, derived from
+    `AgingDaily`; dashboards read these rows only.
+    """
+    source = models.CharField(max_length=255, blank=True)
+    bucket = models.CharField(max_length=10)
+    as_of = models.DateField()
+    account_count = models.IntegerField(default=0)
+    balance_kurus = models.BigIntegerField(default=0, help_text="Sum of balances, in kuruş.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source or 'ledger'} {self.bucket} @ {self.as_of}"
 
+    class Meta:
+        verbose_name = "Aging summary"
+        verbose_name_plural = "Aging summaries"
+        constraints = [
+            models.UniqueConstraint(fields=["source", "bucket"], name="aging_summary_source_bucket_uniq"),
+        ]
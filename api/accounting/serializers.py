@@ -0,0 +1,84 @@
+from rest_framework import serializers
+
+from .models import ClassificationJob
+
+
+class ClassificationJobUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClassificationJob
+        fields = ["file", "sheet", "previous"]
+
+    def validate_file(self, value):
+        from accounting.services.batch_classify import WORKBOOK_EXTENSIONS
+
+        if not value.name.lower().endswith(WORKBOOK_EXTENSIONS):
+            raise serializers.ValidationError(
+                f"Unsupported file type; expected one of {', '.join(WORKBOOK_EXTENSIONS)}."
+            )
+        return value
+
+    def validate_previous(self, value):
+        if value is not None and value.status != ClassificationJob.DONE:
+            raise serializers.ValidationError("Only a finished job can be re-run incrementally.")
+        return value
+
+    def create(self, validated_data):
+        validated_data["original_name"] = validated_data["file"].name
+        return super().create(validated_data)
+
+
+class WorkbookUploadSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    sheet = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+    validate_file = ClassificationJobUploadSerializer.validate_file
+
+
+class ClassificationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClassificationJob
+        fields = [
+            "id", "original_name", "sheet", "status", "progress", "columns_total", "columns_done",
+            "columns", "by_label", "previous", "columns_reused", "diff", "error", "attempts",
+            "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        return round(obj.columns_done / obj.columns_total, 3) if obj.columns_total else 0.0
+
+
+class ColumnCorrectionSerializer(serializers.Serializer):
+    column_index = serializers.IntegerField(min_value=0)
+    label = serializers.CharField()
+
+    def validate_label(self, value):
+        from accounting.services.classify_columns_with_embeddings import TARGET_EXEMPLARS
+
+        labels = [*TARGET_EXEMPLARS, "unknown"]
+        if value not in labels:
+            raise serializers.ValidationError(f"Unknown label; expected one of {', '.join(labels)}.")
+        return value
+
+
+class ClassificationCorrectionSerializer(serializers.Serializer):
+    """
+    `{"corrections": [{"column_index": 3, "label": "bakiye"}], "confirm": true}`;
+    either part may be left out, not both. `columns` (context) bounds the indices.
+    """
+    corrections = ColumnCorrectionSerializer(many=True, required=False)
+    confirm = serializers.BooleanField(default=False)
+
+    def validate_corrections(self, value):
+        n_columns = self.context["columns"]
+        for c in value:
+            if c["column_index"] >= n_columns:
+                raise serializers.ValidationError(f"column_index must be below {n_columns}.")
+        return value
+
+    def validate(self, attrs):
+        if not attrs.get("corrections") and not attrs["confirm"]:
+            raise serializers.ValidationError("Send corrections, confirm, or both.")
+        return attrs
@@ -0,0 +1,303 @@
+"""
+Receivables aging summaries.
+
+Aging buckets (0-30, 31-60, 61-90, 90+ days since the last invoice date, else
+the last payment date) move every day, so the ledger is not summarized by
+bucket directly. Instead:
+
+  - `AgingDaily` keeps account count and balance per (source, reference
+    date). Ledger ingest applies per-chunk deltas to it (old contribution of
+    each upserted account out, new one in) in the same transaction as the
+    upsert; no ledger rows are rescanned.
+  - `AgingSummary` holds the bucket totals per source as of a date, derived
+    from `AgingDaily` with one conditional aggregate (O(distinct dates), not
+    O(accounts)); dashboards read O(buckets) rows. Ingest refreshes the
+    sources it touched (all of them when the summary is from an earlier day)
+    and `python manage.py reconcile_aging --refresh-only` rolls it over to a
+    new day; schedule that shortly after midnight. Reads never write: a
+    summary from an earlier day is recomputed for the response only.
+  - Per customer (debtor account), the bucket follows from the account's own
+    reference date: `customer_aging` lists one bucket's accounts through an
+    index on that date, largest balance first.
+  - `reconcile` rebuilds `AgingDaily` from the ledger with one GROUP BY and
+    reports drift (ledger edits outside ingest, concurrent ingests touching the
+    same accounts); run it periodically with `python manage.py reconcile_aging`.
+"""
+
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounting.models import AgingDaily, AgingSummary, DebtorAccount
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+# (name, min age in days, max age in days or None for open-ended); future dates count as age 0
+BUCKETS: List[Tuple[str, int, Optional[int]]] = [
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+]
+UNDATED_BUCKET = "undated"
+BUCKET_NAMES = [name for name, _, _ in BUCKETS] + [UNDATED_BUCKET]
+
+# Reference date of accounts with neither an invoice nor a payment date
+UNDATED = date(1, 1, 1)
+
+# (source, reference date, balance in kuruş) of one account
+Contribution = Tuple[str, date, int]
+
+
+def to_kurus(balance) -> int:
+    if balance is None:
+        return 0
+    return int((Decimal(balance) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def reference_date(last_invoice_date: Optional[date], last_payment_date: Optional[date]) -> date:
+    return last_invoice_date or last_payment_date or UNDATED
+
+
+def bucket_of(reference: date, as_of: date) -> str:
+    if reference == UNDATED:
+        return UNDATED_BUCKET
+    age = max((as_of - reference).days, 0)
+    for name, min_age, max_age in BUCKETS:
+        if age >= min_age and (max_age is None or age <= max_age):
+            return name
+    return BUCKETS[-1][0]
+
+
+def _bucket_filters(as_of: date, field: str = "reference_date") -> Dict[str, Q]:
+    """Reference-date range per bucket; the first bucket has no upper bound, so future dates count as current."""
+    filters = {}
+    for name, min_age, max_age in BUCKETS:
+        q = Q(**{f"{field}__lte": as_of - timedelta(days=min_age)}) if min_age > 0 else Q()
+        if max_age is not None:
+            q &= Q(**{f"{field}__gte": as_of - timedelta(days=max_age)})
+        else:
+            q &= ~Q(**{field: UNDATED})
+        filters[name] = q
+    filters[UNDATED_BUCKET] = Q(**{field: UNDATED})
+    return filters
+
+
+def account_reference():
+    """`reference_date` of a `DebtorAccount` as a query expression (the expression `DebtorAccount` indexes)."""
+    return Coalesce("last_invoice_date", "last_payment_date", Value(UNDATED, output_field=DateField()))
+
+
+# -------------------------------
+# Incremental maintenance
+# -------------------------------
+
+def ledger_contributions(
+    accounts: Mapping[str, Tuple[Optional[Decimal], Optional[date], Optional[date]]],
+    mapped: Set[str],
+    source: str,
+) -> Tuple[List[Contribution], List[Contribution]]:
+    """
+    (removed, added) contributions for a chunk about to be upserted:
+    `accounts` is {account_code: (balance, last_invoice_date,
+    last_payment_date)} as parsed; fields not in `mapped` keep their stored
+    values on existing accounts, like the upsert does. Must run before it.
+    """
+    removed: List[Contribution] = []
+    stored: Dict[str, tuple] = {}
+    for code, old_source, balance, invoice, payment in (
+            DebtorAccount.objects.filter(account_code__in=list(accounts))
+            .values_list("account_code", "source", "balance", "last_invoice_date", "last_payment_date")):
+        removed.append((old_source, reference_date(invoice, payment), to_kurus(balance)))
+        stored[code] = (balance, invoice, payment)
+
+    added: List[Contribution] = []
+    for code, values in accounts.items():
+        previous = stored.get(code)
+        if previous is not None:
+            values = tuple(new if field in mapped else old for field, new, old in
+                           zip(("balance", "last_invoice_date", "last_payment_date"), values, previous))
+        balance, invoice, payment = values
+        added.append((source, reference_date(invoice, payment), to_kurus(balance)))
+    return removed, added
+
+
+def _delta_statement() -> str:
+    qn = connection.ops.quote_name
+    opts = AgingDaily._meta
+    count, balance = qn(opts.get_field("account_count").column), qn(opts.get_field("balance_kurus").column)
+    columns = [qn(opts.get_field(f).column)
+               for f in ("source", "reference_date", "account_count", "balance_kurus", "updated_at")]
+    return (
+        f"INSERT INTO {qn(opts.db_table)} ({', '.join(columns)}) VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({columns[0]}, {columns[1]}) DO UPDATE SET "
+        f"{count} = {qn(opts.db_table)}.{count} + EXCLUDED.{count}, "
+        f"{balance} = {qn(opts.db_table)}.{balance} + EXCLUDED.{balance}, "
+        f"{columns[4]} = EXCLUDED.{columns[4]}"
+    )
+
+
+def apply_deltas(removed: Iterable[Contribution], added: Iterable[Contribution]) -> Set[str]:
+    """Net the contributions per (source, date) into `AgingDaily`; returns the sources touched."""
+    deltas: Dict[Tuple[str, date], List[int]] = {}
+    for sign, contributions in ((-1, removed), (1, added)):
+        for source, reference, kurus in contributions:
+            delta = deltas.setdefault((source, reference), [0, 0])
+            delta[0] += sign
+            delta[1] += sign * kurus
+    rows = [(source, reference, n, kurus) for (source, reference), (n, kurus) in deltas.items() if n or kurus]
+    if not rows:
+        return set()
+
+    adapt_date = connection.ops.adapt_datefield_value
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_delta_statement(),
+                           [(source, adapt_date(reference), n, kurus, now) for source, reference, n, kurus in rows])
+        touched = {source for source, _, _, _ in rows}
+        AgingDaily.objects.filter(source__in=touched, account_count=0, balance_kurus=0).delete()
+    return touched
+
+
+def _summary_rows(sources: Optional[Set[str]], as_of: date) -> List[AgingSummary]:
+    """Unsaved bucket totals per source from `AgingDaily`, for `sources` (default: all)."""
+    daily = AgingDaily.objects.all()
+    if sources is not None:
+        daily = daily.filter(source__in=sources)
+    aggregates = {}
+    for i, q in enumerate(_bucket_filters(as_of).values()):
+        aggregates[f"n{i}"] = Sum("account_count", filter=q, default=0)
+        aggregates[f"k{i}"] = Sum("balance_kurus", filter=q, default=0)
+    rows = []
+    for totals in daily.values("source").annotate(**aggregates).order_by():
+        for i, name in enumerate(BUCKET_NAMES):
+            rows.append(AgingSummary(source=totals["source"], bucket=name, as_of=as_of,
+                                     account_count=totals[f"n{i}"], balance_kurus=totals[f"k{i}"]))
+    return rows
+
+
+def summary_is_stale(as_of: Optional[date] = None) -> bool:
+    """Whether `AgingSummary` was computed on an earlier day (or never, while there are totals)."""
+    as_of = as_of or timezone.localdate()
+    if AgingSummary.objects.exists():
+        return AgingSummary.objects.exclude(as_of=as_of).exists()
+    return AgingDaily.objects.exists()
+
+
+def refresh_summary(sources: Optional[Iterable[str]] = None, as_of: Optional[date] = None) -> date:
+    """Recompute and store bucket totals from `AgingDaily` for `sources` (default: all)."""
+    as_of = as_of or timezone.localdate()
+    if sources is not None:
+        sources = set(sources)
+    rows = _summary_rows(sources, as_of)
+    with transaction.atomic():
+        stale = AgingSummary.objects.all()
+        if sources is not None:
+            stale = stale.filter(source__in=sources)
+        stale.delete()
+        AgingSummary.objects.bulk_create(rows)
+    return as_of
+
+
+# -------------------------------
+# Reads and reconciliation
+# -------------------------------
+
+def _amount(kurus: int) -> str:
+    return str(Decimal(kurus).scaleb(-2))
+
+
+def aging_summary(source: Optional[str] = None) -> dict:
+    """
+    Bucket totals for one source or the whole ledger. Read-only: when the
+    stored summary is from an earlier day (no refresh has run since
+    midnight), today's totals are computed from `AgingDaily` without saving.
+    """
+    as_of = timezone.localdate()
+    if summary_is_stale(as_of):
+        rows = _summary_rows({source} if source is not None else None, as_of)
+    else:
+        rows = AgingSummary.objects.all()
+        if source is not None:
+            rows = rows.filter(source=source)
+    totals = {name: [0, 0] for name in BUCKET_NAMES}
+    by_source: Dict[str, Dict[str, dict]] = {}
+    for row in rows:
+        totals[row.bucket][0] += row.account_count
+        totals[row.bucket][1] += row.balance_kurus
+        by_source.setdefault(row.source, {})[row.bucket] = {
+            "account_count": row.account_count, "balance": _amount(row.balance_kurus)}
+    return {
+        "as_of": as_of.isoformat(),
+        "buckets": [{"bucket": name, "account_count": n, "balance": _amount(kurus)}
+                    for name, (n, kurus) in totals.items()],
+        "by_source": by_source,
+    }
+
+
+def customer_aging(
+    bucket: Optional[str] = None,
+    source: Optional[str] = None,
+    account_code: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> dict:
+    """
+    Per-customer aging: each debtor account with its reference date, age,
+    bucket and balance, largest balance first. `bucket` narrows to one
+    bucket through the reference-date index; `account_code` to one account.
+    """
+    if bucket is not None and bucket not in BUCKET_NAMES:
+        raise ValueError(f"Unknown bucket {bucket!r}; expected one of {', '.join(BUCKET_NAMES)}.")
+    as_of = timezone.localdate()
+    accounts = DebtorAccount.objects.annotate(reference=account_reference())
+    if bucket is not None:
+        accounts = accounts.filter(_bucket_filters(as_of, "reference")[bucket])
+    if source is not None:
+        accounts = accounts.filter(source=source)
+    if account_code is not None:
+        accounts = accounts.filter(account_code=account_code)
+    page = (accounts.order_by("-balance", "account_code")
+            .values("id", "account_code", "name", "source", "balance", "reference")[offset:offset + limit])
+    customers = []
+    for row in page:
+        reference = row["reference"]
+        customers.append({
+            "id": row["id"], "account_code": row["account_code"], "name": row["name"], "source": row["source"],
+            "balance": _amount(to_kurus(row["balance"])),
+            "reference_date": None if reference == UNDATED else reference.isoformat(),
+            "age_days": None if reference == UNDATED else max((as_of - reference).days, 0),
+            "bucket": bucket_of(reference, as_of),
+        })
+    return {"as_of": as_of.isoformat(), "bucket": bucket, "limit": limit, "offset": offset,
+            "customers": customers}
+
+
+def reconcile(as_of: Optional[date] = None) -> dict:
+    """Rebuild `AgingDaily` from the ledger and refresh the summary; reports how many totals had drifted."""
+    reference = account_reference()
+    expected: Dict[Tuple[str, date], Tuple[int, int]] = {}
+    for row in (DebtorAccount.objects.annotate(reference=reference)
+                .values("source", "reference").annotate(n=Count("id"), total=Sum("balance")).order_by()):
+        expected[(row["source"], row["reference"])] = (row["n"], to_kurus(row["total"]))
+
+    with transaction.atomic():
+        current = {(r.source, r.reference_date): (r.account_count, r.balance_kurus)
+                   for r in AgingDaily.objects.select_for_update()}
+        drifted = sum(1 for key in expected.keys() | current.keys() if expected.get(key) != current.get(key))
+        AgingDaily.objects.all().delete()
+        AgingDaily.objects.bulk_create(
+            [AgingDaily(source=source, reference_date=reference, account_count=n, balance_kurus=kurus)
+             for (source, reference), (n, kurus) in expected.items()],
+            batch_size=1000,
+        )
+    refresh_summary(as_of=as_of)
+    return {"accounts": sum(n for n, _ in expected.values()), "daily_rows": len(expected), "drifted": drifted}
@@ -0,0 +1,174 @@
+"""
+Async, concurrent column classification.
+
+Embedding batches are dispatched concurrently through any async embeddings
+client (`AsyncOpenAI`, or `accounting.testing.FakeAsyncEmbeddingsClient`) with:
+  - bounded concurrency (a semaphore over in-flight requests)
+  - a token-bucket rate limiter (requests per second, with burst)
+  - retry with jittered exponential backoff on 429/5xx and connection errors
+
+Payload building and scoring are shared with the sync path
+(`column_payloads` / `score_columns`), so results are identical to
+`classify_columns` for the same vectors.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from accounting.services import metrics
+from accounting.services.classify_columns_with_embeddings import column_payloads, score_columns
+from accounting.services.column_profile import profile_columns
+from accounting.services.embedding_batch import iter_batches, prepare_input
+from accounting.services.embedding_cache import EmbeddingCache
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 20.0
+DEFAULT_BATCH_SIZE = 64
+
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+# -------------------------------
+# Rate limiting and retries
+# -------------------------------
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second refill, up to `capacity` burst."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def delay(self, attempt: int) -> float:
+        # "full jitter": uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    if type(exc).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return isinstance(exc, (asyncio.TimeoutError, ConnectionError))
+
+
+# -------------------------------
+# Async embedding
+# -------------------------------
+
+class AsyncEmbedder:
+    """Concurrent, rate-limited, retrying embedder over an async embeddings client."""
+
+    def __init__(
+        self,
+        client,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        retry: Optional[RetryPolicy] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(requests_per_second)
+        self.batch_size = batch_size
+        self.retry = retry or RetryPolicy()
+        self.cache = cache
+        self.requests = 0
+        self.retries = 0
+
+    async def _create(self, model: str, inputs: List[str], semaphore: asyncio.Semaphore):
+        attempt = 0
+        while True:
+            async with semaphore:
+                await self.bucket.acquire()
+                try:
+                    self.requests += 1
+                    return await self.client.embeddings.create(model=model, input=inputs)
+                except Exception as exc:
+                    if attempt >= self.retry.max_retries or not is_retryable(exc):
+                        raise
+            # back off outside the semaphore so other batches keep flowing
+            self.retries += 1
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    async def embed(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        prepared = [prepare_input(t) for t in texts]
+        out: List[Optional[List[float]]] = [None] * len(prepared)
+
+        if self.cache is not None:
+            for i, vec in self.cache.get_many(model, prepared).items():
+                out[i] = vec
+        pending = [i for i, v in enumerate(out) if v is None]
+        pending_texts = [prepared[i] for i in pending]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: List[int]) -> None:
+            resp = await self._create(model, [pending_texts[j] for j in batch], semaphore)
+            for pos, item in enumerate(resp.data):
+                out[pending[batch[getattr(item, "index", pos)]]] = item.embedding
+
+        batches = list(iter_batches(pending_texts, max_inputs=self.batch_size))
+        await asyncio.gather(*(run(b) for b in batches))
+
+        if self.cache is not None and pending:
+            self.cache.put_many(model, pending_texts, [out[i] for i in pending])
+        return out
+
+
+async def classify_columns_async(
+    df: pd.DataFrame,
+    centroids: Dict[str, List[float]],
+    embedder: AsyncEmbedder,
+    model: str,
+    samples_per_col: int = 10,
+    threshold: float = 0.6,
+    token_budget: Optional[int] = None
+) -> Tuple[List[dict], Dict[str, List[int]]]:
+    """Async counterpart of `classify_columns`; same inputs give the same result."""
+    samples_by_col, payloads = column_payloads(df, samples_per_col, token_budget)
+    with metrics.stage("classification", "embed", items=len(payloads)):
+        vectors = await embedder.embed(payloads, model=model)
+    return score_columns(list(df.columns), samples_by_col, vectors, centroids, threshold,
+                         profiles=profile_columns(df))
+
+
+def make_async_openai_embedder(api_key: str, **kwargs) -> AsyncEmbedder:
+    from accounting.services.llm_client import get_client_manager
+
+    # retries are handled by AsyncEmbedder; the shared client adds timeouts and the circuit breaker
+    return AsyncEmbedder(get_client_manager(api_key).async_client(max_retries=0), **kwargs)
@@ -0,0 +1,197 @@
+"""
+Multi-workbook, multi-sheet batch classification.
+
+Workbooks are parsed (sampled) in a process pool while the parent process
+embeds and scores them as they complete, using one centroid set and one
+embeddings client (and so one batcher / cache) for every sheet. Each sheet's
+result is streamed to a single JSONL file and a flat CSV as soon as it is
+ready, with per-file timing. A workbook that fails to parse or classify is
+recorded as an error row and the run continues. If a parser process dies
+(a crash or the OOM killer), the pool breaks for every workbook still in
+it; those are parsed again one at a time, so only the workbook that kills
+its own parser is recorded as failed.
+"""
+
+import csv
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+from accounting.services import metrics
+from accounting.services.classify_columns_with_embeddings import column_payloads, score_columns
+from accounting.services.column_profile import profile_columns
+from accounting.services.embedding_batch import embed_texts
+from accounting.services.sampling import candidate_count
+from accounting.services.workbook_reader import DEFAULT_WINDOW_ROWS, read_samples, sheet_names
+
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv")
+
+CSV_FIELDS = [
+    "file", "sheet", "status", "error", "column_index", "column_header",
+    "predicted_category", "confidence", "parse_seconds", "classify_seconds",
+]
+
+
+def discover_workbooks(target: str) -> List[str]:
+    """Workbooks in a directory (recursively) or matching a glob pattern."""
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "**", "*"), recursive=True)
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(
+        p for p in paths
+        if os.path.isfile(p)
+        and p.lower().endswith(WORKBOOK_EXTENSIONS)
+        and not os.path.basename(p).startswith("~$")  # Excel lock files
+    )
+
+
+def parse_workbook(path: str, sheet=None, samples_per_col: int = 10,
+                   window_rows: int = DEFAULT_WINDOW_ROWS) -> dict:
+    """Process-pool worker: sample every requested sheet of one workbook."""
+    started = time.perf_counter()
+    try:
+        names = sheet_names(path) if sheet is None else [sheet]
+        sheets = [
+            {"sheet": name,
+             "df": read_samples(path, sheet=name, samples_per_col=candidate_count(samples_per_col),
+                                window_rows=window_rows)}
+            for name in names
+        ]
+        return {"file": path, "sheets": sheets, "error": None,
+                "parse_seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"file": path, "sheets": [], "error": f"{type(e).__name__}: {e}",
+                "parse_seconds": time.perf_counter() - started}
+
+
+class BatchWriter:
+    """Appends sheet results to a JSONL file and a flat per-column CSV."""
+
+    def __init__(self, jsonl_path: str, csv_path: str):
+        self._jsonl = open(jsonl_path, "w", encoding="utf-8")
+        self._csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDS)
+        self._csv.writeheader()
+
+    def write(self, record: dict) -> None:
+        self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._jsonl.flush()
+        base = {k: record.get(k) for k in ("file", "sheet", "status", "error",
+                                           "parse_seconds", "classify_seconds")}
+        if not record.get("mappings"):
+            self._csv.writerow(base)
+        for m in record.get("mappings", []):
+            self._csv.writerow({**base, **{k: m[k] for k in
+                                           ("column_index", "column_header", "predicted_category", "confidence")}})
+        self._csv_file.flush()
+
+    def close(self) -> None:
+        self._jsonl.close()
+        self._csv_file.close()
+
+
+def classify_parsed(parsed: dict, centroids: Dict[str, List[float]], client, model: str,
+                    samples_per_col: int, threshold: float) -> Iterable[dict]:
+    """Embed all sheets of one parsed workbook in shared batches and score them."""
+    started = time.perf_counter()
+    payload_sets = [column_payloads(s["df"], samples_per_col) for s in parsed["sheets"]]
+    flat = [p for _, payloads in payload_sets for p in payloads]
+    with metrics.stage("classification", "embed", items=len(flat)):
+        vectors = embed_texts(client, flat, model=model)
+    classify_seconds = time.perf_counter() - started
+
+    offset = 0
+    for s, (samples_by_col, payloads) in zip(parsed["sheets"], payload_sets):
+        sheet_vectors = vectors[offset:offset + len(payloads)]
+        offset += len(payloads)
+        mappings, by_label = score_columns(list(s["df"].columns), samples_by_col, sheet_vectors,
+                                           centroids, threshold, profiles=profile_columns(s["df"]))
+        yield {
+            "file": parsed["file"],
+            "sheet": s["sheet"],
+            "status": "ok",
+            "error": None,
+            "parse_seconds": round(parsed["parse_seconds"], 4),
+            "classify_seconds": round(classify_seconds, 4),
+            "mappings": mappings,
+            "by_label": by_label,
+        }
+
+
+def _parse_alone(path: str, *args) -> dict:
+    """Parse one workbook in its own parser process, so a crash cannot take others with it."""
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(parse_workbook, path, *args).result()
+    except BrokenProcessPool:
+        return {"file": path, "sheets": [], "error": "BrokenProcessPool: the parser process died",
+                "parse_seconds": time.perf_counter() - started}
+
+
+def run_batch(
+    target: str,
+    centroids: Dict[str, List[float]],
+    client,
+    model: str,
+    output_prefix: str,
+    sheet=None,
+    samples_per_col: int = 10,
+    threshold: float = 0.6,
+    window_rows: int = DEFAULT_WINDOW_ROWS,
+    workers: Optional[int] = None,
+) -> dict:
+    """Classify every workbook under `target`; returns a run summary."""
+    paths = discover_workbooks(target)
+    jsonl_path, csv_path = f"{output_prefix}.jsonl", f"{output_prefix}.csv"
+    summary = {"files": len(paths), "sheets": 0, "columns": 0, "failed_files": [],
+               "outputs": [jsonl_path, csv_path]}
+    started = time.perf_counter()
+    parse_args = (sheet, samples_per_col, window_rows)
+
+    def record(parsed: dict) -> None:
+        try:
+            if parsed["error"]:
+                raise RuntimeError(parsed["error"])
+            records = list(classify_parsed(parsed, centroids, client, model, samples_per_col, threshold))
+        except Exception as e:
+            error = str(e) if parsed["error"] else f"{type(e).__name__}: {e}"
+            summary["failed_files"].append({"file": parsed["file"], "error": error})
+            writer.write({"file": parsed["file"], "sheet": None, "status": "error", "error": error,
+                          "parse_seconds": round(parsed["parse_seconds"], 4)})
+            return
+        for result in records:
+            summary["sheets"] += 1
+            summary["columns"] += len(result["mappings"])
+            writer.write(result)
+
+    writer = BatchWriter(jsonl_path, csv_path)
+    try:
+        broken: List[str] = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(parse_workbook, p, *parse_args): p for p in paths}
+            for future in as_completed(futures):
+                try:
+                    parsed = future.result()
+                except BrokenProcessPool:
+                    broken.append(futures[future])
+                    continue
+                record(parsed)
+        if broken:
+            logger.warning("Parser pool broke; re-parsing %d workbook(s) one at a time", len(broken))
+        for path in sorted(broken):
+            record(_parse_alone(path, *parse_args))
+    finally:
+        writer.close()
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
@@ -0,0 +1,341 @@
+"""
+Offline classifier benchmarks.
+
+Runs the classification pipeline stage by stage on synthetic workbooks (see
+`synthetic_workbook`), with no network access:
+
+  - generate_workbook   write the synthetic .xlsx / .csv
+  - load_samples        `sample_rows` of `candidate_count` values over `workbook_reader.iter_rows`
+                        (what jobs read)
+  - load_full           every row through `workbook_reader.iter_rows`
+  - likely_heuristics   `phone/amount/date_hit_rate` over every column's full text
+  - profile_columns     vectorized `profile_columns` over the same text
+  - build_centroids     `build_centroids` of `TARGET_EXEMPLARS`
+  - classify_columns    `classify_columns` on the samples, scored against the generated labels;
+                        `sample_tokens` sets the per-column payload budget
+
+Embeddings come from `SimulatedEmbeddingsClient`: deterministic vectors
+(local n-gram features, or hashes) behind the OpenAI surface, with simulated
+per-request latency, so request counts and batching behave as in production.
+
+Each stage reports wall time over `repeat` runs (min / median), throughput,
+Python peak memory (tracemalloc, one extra run) and embedding requests, inputs
+and estimated tokens. The
+report is JSON; `compare` diffs two reports, so a regression shows up as a
+stage whose median grew between commits.
+"""
+
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from accounting.services.classify_columns_with_embeddings import (
+    TARGET_EXEMPLARS,
+    amount_hit_rate,
+    build_centroids,
+    classify_columns,
+    date_hit_rate,
+    phone_hit_rate,
+)
+from accounting.services.column_profile import profile_columns
+from accounting.services.embedders import LocalNgramEmbedder
+from accounting.services.sampling import candidate_count
+from accounting.services.synthetic_workbook import write_workbook
+from accounting.services.workbook_reader import iter_rows, sample_rows, samples_frame
+from accounting.testing import FakeEmbeddingsClient
+
+
+REPORT_VERSION = 1
+BENCHMARK_MODEL = "benchmark-embedding"
+
+# Rows per column fed to the heuristics and the profiler
+DEFAULT_HEURISTIC_ROWS = 100_000
+
+
+# -------------------------------
+# Simulated embeddings
+# -------------------------------
+
+class SimulatedEmbeddingsClient(FakeEmbeddingsClient):
+    """
+    `FakeEmbeddingsClient` that sleeps like a remote API: `latency` seconds per
+    request plus `per_input` per input, plus up to `jitter` (seeded, so runs
+    repeat). `vectors="ngram"` embeds with `LocalNgramEmbedder`, which makes
+    the predictions meaningful; "hash" gives unrelated vectors.
+    """
+
+    def __init__(self, latency: float = 0.05, per_input: float = 0.0, jitter: float = 0.0,
+                 vectors: str = "ngram", seed: int = 0):
+        if vectors not in ("ngram", "hash"):
+            raise ValueError(f"Unknown vectors {vectors!r} (expected 'ngram' or 'hash')")
+        self._local = LocalNgramEmbedder() if vectors == "ngram" else None
+        super().__init__(dim=self._local.dim if self._local else 64)
+        self.latency = latency
+        self.per_input = per_input
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.sleep_seconds = 0.0
+
+    def vector(self, text: str, model: str) -> List[float]:
+        if self._local is None:
+            return super().vector(text, model)
+        return self._local.embed([text])[0]
+
+    def _create(self, model: str, input):
+        items = [input] if isinstance(input, str) else list(input)
+        delay = self.latency + self.per_input * len(items) + self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+            self.sleep_seconds += delay
+        return super()._create(model=model, input=items)
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+
+def _measure(
+    fn: Callable[[], object],
+    repeat: int,
+    items: int,
+    unit: str,
+    client: Optional[SimulatedEmbeddingsClient] = None,
+    memory: bool = True,
+) -> Tuple[dict, object]:
+    """Time `fn` `repeat` times, then once more under tracemalloc; returns (stats, last result)."""
+    timings = []
+    requests = inputs = tokens = 0
+    result = None
+    for _ in range(max(repeat, 1)):
+        before = (client.requests, client.inputs, client.tokens) if client else (0, 0, 0)
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+        if client:
+            requests = client.requests - before[0]
+            inputs = client.inputs - before[1]
+            tokens = client.tokens - before[2]
+
+    stats = {
+        "seconds_min": round(min(timings), 6),
+        "seconds_median": round(median(timings), 6),
+        "runs": len(timings),
+        "items": items,
+        "unit": unit,
+        "throughput_per_second": round(items / median(timings), 2) if median(timings) > 0 else None,
+    }
+    if client:
+        stats["requests"] = requests
+        stats["inputs"] = inputs
+        stats["tokens"] = tokens
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            stats["peak_memory_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return stats, result
+
+
+def _column_texts(path: str, limit: int) -> List[List[str]]:
+    rows = iter_rows(path)
+    try:
+        header = next(rows, ())
+        columns: List[List[str]] = [[] for _ in header]
+        for n, row in enumerate(rows):
+            if n >= limit:
+                break
+            for c, value in enumerate(row[:len(columns)]):
+                if value is not None:
+                    columns[c].append(str(value))
+    finally:
+        rows.close()
+    return columns
+
+
+def _load_full(path: str) -> int:
+    rows = iter_rows(path)
+    n = -1  # header
+    for n, _ in enumerate(rows):
+        pass
+    return n
+
+
+def _accuracy(mappings: List[dict], truth: Dict[int, Optional[str]]) -> dict:
+    labelled = [i for i, label in truth.items() if label is not None]
+    correct = [i for i in labelled if mappings[i]["predicted_category"] == truth[i]]
+    distractors = [i for i, label in truth.items() if label is None]
+    false_positives = [i for i in distractors if mappings[i]["predicted_category"] != "unknown"]
+    return {
+        "labelled_columns": len(labelled),
+        "correct": len(correct),
+        "accuracy": round(len(correct) / len(labelled), 4) if labelled else None,
+        "distractor_columns": len(distractors),
+        "distractors_labelled": len(false_positives),
+    }
+
+
+# -------------------------------
+# Suite
+# -------------------------------
+
+def run_size(
+    workdir: Path,
+    rows: int,
+    columns: Optional[int] = None,
+    noise: float = 0.1,
+    seed: int = 0,
+    fmt: str = "xlsx",
+    repeat: int = 3,
+    samples_per_col: int = 10,
+    threshold: float = 0.6,
+    heuristic_rows: int = DEFAULT_HEURISTIC_ROWS,
+    sample_tokens: Optional[int] = None,
+    client_options: Optional[dict] = None,
+    memory: bool = True,
+) -> dict:
+    """Every stage for one synthetic workbook of `rows` rows."""
+    path = str(workdir / f"synthetic_{rows}_{columns}_{seed}.{fmt}")
+    stages: Dict[str, dict] = {}
+
+    stages["generate_workbook"], truth = _measure(
+        lambda: write_workbook(path, rows, columns=columns, noise=noise, seed=seed),
+        1, rows, "rows", memory=False)
+    n_cols = len(truth)
+
+    def load_samples():
+        data = iter_rows(path)
+        try:
+            return sample_rows(data, samples_per_col=candidate_count(samples_per_col))
+        finally:
+            data.close()
+
+    stages["load_samples"], (headers, samples, scanned) = _measure(load_samples, repeat, n_cols, "columns",
+                                                                   memory=memory)
+    stages["load_samples"]["rows_scanned"] = scanned
+    stages["load_full"], _ = _measure(lambda: _load_full(path), repeat, rows, "rows", memory=memory)
+
+    texts = _column_texts(path, heuristic_rows)
+    values = sum(len(t) for t in texts)
+    stages["likely_heuristics"], _ = _measure(
+        lambda: [(phone_hit_rate(t), amount_hit_rate(t), date_hit_rate(t)) for t in texts],
+        repeat, values, "values", memory=memory)
+    frame = pd.DataFrame({i: pd.Series(t, dtype=object) for i, t in enumerate(texts)})
+    stages["profile_columns"], _ = _measure(lambda: profile_columns(frame), repeat, values, "values", memory=memory)
+
+    client = SimulatedEmbeddingsClient(**(client_options or {}))
+    exemplars = sum(len(v) for v in TARGET_EXEMPLARS.values())
+    stages["build_centroids"], centroids = _measure(
+        lambda: build_centroids(client, TARGET_EXEMPLARS, BENCHMARK_MODEL),
+        repeat, exemplars, "exemplars", client=client, memory=memory)
+
+    df = samples_frame(headers, samples)
+    stages["classify_columns"], (mappings, _) = _measure(
+        lambda: classify_columns(df, centroids, client, BENCHMARK_MODEL, samples_per_col=samples_per_col,
+                                 threshold=threshold, token_budget=sample_tokens),
+        repeat, n_cols, "columns", client=client, memory=memory)
+
+    return {
+        "rows": rows,
+        "columns": n_cols,
+        "file_bytes": Path(path).stat().st_size,
+        "stages": stages,
+        "accuracy": _accuracy(mappings, truth),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=5, cwd=Path(__file__).resolve().parent)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _max_rss_kib() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB elsewhere
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    workdir: Optional[str] = None,
+    **options,
+) -> dict:
+    """Run the suite for each row count in `sizes`; returns the JSON-ready report."""
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="bts-bench-") as tmp:
+        directory = Path(workdir or tmp)
+        directory.mkdir(parents=True, exist_ok=True)
+        runs = [run_size(directory, rows, **options) for rows in sizes]
+    return {
+        "version": REPORT_VERSION,
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: v for k, v in options.items()},
+        "runs": runs,
+        "max_rss_kib": _max_rss_kib(),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# -------------------------------
+# Comparison
+# -------------------------------
+
+def compare(baseline: dict, current: dict, max_regression: float = 0.2) -> dict:
+    """
+    Median-time change per (rows, stage) present in both reports; a stage
+    regressed when it got more than `max_regression` (0.2 = 20 %) slower.
+    Request and token counts are compared exactly.
+    """
+    before = {(run["rows"], stage): stats for run in baseline.get("runs", [])
+              for stage, stats in run["stages"].items()}
+    changes, regressions = [], []
+    for run in current.get("runs", []):
+        for stage, stats in run["stages"].items():
+            old = before.get((run["rows"], stage))
+            if old is None:
+                continue
+            ratio = (stats["seconds_median"] / old["seconds_median"] - 1) if old["seconds_median"] else 0.0
+            change = {
+                "rows": run["rows"],
+                "stage": stage,
+                "baseline_seconds": old["seconds_median"],
+                "current_seconds": stats["seconds_median"],
+                "change": round(ratio, 4),
+            }
+            for count in ("requests", "tokens"):
+                if count in stats and count in old:
+                    change[f"baseline_{count}"] = old[count]
+                    change[f"current_{count}"] = stats[count]
+            changes.append(change)
+            if (ratio > max_regression or stats.get("requests", 0) > old.get("requests", 0)
+                    or stats.get("tokens", 0) > old.get("tokens", 0)):
+                regressions.append(change)
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "current_commit": current.get("commit"),
+        "max_regression": max_regression,
+        # timings are only comparable between runs with the same options (format, latency, ...)
+        "options_match": baseline.get("options") == current.get("options"),
+        "changes": changes,
+        "regressions": regressions,
+    }
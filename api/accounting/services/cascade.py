@@ -0,0 +1,206 @@
+"""
+Heuristics-first classification cascade.
+
+Cheap stages run before any embedding call:
+  1. pattern  - column-profile hit rates for phone / amount formats
+  2. header   - header keyword match, combined with the pattern evidence
+                (noisy-OR), e.g. "Son Tahsilat Tarihi" + date-shaped samples
+
+A column is decided by the first stage whose confidence reaches
+`min_confidence` with a clear margin over the runner-up label. Only the
+remaining, ambiguous columns are embedded and scored. The date
+disambiguation post-pass then runs over all columns, as in `classify_columns`.
+
+Per-stage decision counts are returned so embedding traffic saved by the
+cascade is visible.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from accounting.services import metrics
+from accounting.services.classify_columns_with_embeddings import (
+    column_payloads,
+    disambiguate_dates,
+    group_by_label,
+    score_columns,
+)
+from accounting.services.column_profile import ColumnProfile, profile_columns
+from accounting.services.embedders import normalize_header
+from accounting.services.embedding_batch import embed_texts
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULT_MIN_CONFIDENCE = 0.85
+DEFAULT_MIN_MARGIN = 0.1
+
+STAGES = ("pattern", "header", "embedding")
+
+# Header synonyms per label, written in normalize_header() form (lowercase, ASCII-folded)
+HEADER_KEYWORDS: Dict[str, List[str]] = {
+    "cari_hesap_kodu": [
+        "cari kod", "cari hesap kodu", "cari no", "cari kodu", "hesap no", "hesap kodu", "ch kodu",
+        "carikod", "chcode", "musteri kodu", "tedarikci kodu", "account code", "customer code",
+    ],
+    "cari_hesap_ismi": [
+        "ad soyad", "isim", "adi soyadi", "musteri adi", "yetkili adi", "hesap unvani", "cari unvani",
+        "cari adi", "unvan", "full name", "customer name",
+    ],
+    "telefon_no": [
+        "telefon", "gsm", "cep", "tel", "tel no", "telefon no", "mobile", "cell", "phone", "irtibat no",
+    ],
+    "bakiye": [
+        "borc", "borc tutari", "tutar", "bakiye", "borc bakiyesi", "toplam borc", "odenecek tutar",
+        "balance", "amount",
+    ],
+    "son_fatura_tarihi": [
+        "son fatura tarihi", "son fatura", "en son fatura", "fatura kesim tarihi", "fatura kesim",
+        "fatura tarihi", "son duzenleme tarihi", "son ft tar", "latest invoice date", "last invoice date",
+    ],
+    "son_tahsilat_tarihi": [
+        "son tahsilat tarihi", "son tahsilat", "tahsilat tarihi", "en son tahsilat", "son odeme tarihi",
+        "son odeme", "odeme tarihi", "tahsil tarihi", "son tahs tar", "last payment date",
+        "last collection date",
+    ],
+}
+
+# Evidence weights: how far each signal alone can push a label's confidence
+EXACT_HEADER_EVIDENCE = 0.9
+PARTIAL_HEADER_EVIDENCE = 0.7
+PATTERN_EVIDENCE = {"telefon_no": 0.95, "bakiye": 0.9}
+DATE_LABELS = ("son_fatura_tarihi", "son_tahsilat_tarihi")
+DATE_PATTERN_EVIDENCE = 0.5  # a date shape alone can't tell the two date labels apart
+
+# -------------------------------
+# Cheap stages
+# -------------------------------
+
+def header_evidence(header) -> Dict[str, float]:
+    """Per-label evidence from the header: exact synonym, or synonym as a whole-word phrase."""
+    h = normalize_header(header)
+    padded = f" {h} "
+    out: Dict[str, float] = {}
+    for label, keywords in HEADER_KEYWORDS.items():
+        best = 0.0
+        for k in keywords:
+            if h == k:
+                best = EXACT_HEADER_EVIDENCE
+                break
+            if f" {k} " in padded:
+                best = PARTIAL_HEADER_EVIDENCE
+        if best:
+            out[label] = best
+    return out
+
+
+def pattern_evidence(profile: ColumnProfile) -> Dict[str, float]:
+    out = {
+        "telefon_no": profile.phone_rate * PATTERN_EVIDENCE["telefon_no"],
+        "bakiye": profile.amount_rate * PATTERN_EVIDENCE["bakiye"],
+    }
+    for label in DATE_LABELS:
+        out[label] = profile.date_rate * DATE_PATTERN_EVIDENCE
+    return out
+
+
+def _decide(conf: Dict[str, float], min_confidence: float, min_margin: float) -> Optional[Tuple[str, float]]:
+    ranked = sorted(conf.items(), key=lambda x: x[1], reverse=True)
+    if not ranked:
+        return None
+    top_label, top = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    if top >= min_confidence and top - runner_up >= min_margin:
+        return top_label, top
+    return None
+
+
+def cheap_decision(
+    header,
+    profile: ColumnProfile,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    min_margin: float = DEFAULT_MIN_MARGIN,
+) -> Optional[Tuple[str, str, float, Dict[str, float]]]:
+    """(stage, label, confidence, all label confidences) or None if ambiguous."""
+    pattern = pattern_evidence(profile)
+    header_ev = header_evidence(header)
+    decided = _decide(pattern, min_confidence, min_margin)
+    # a header naming a different label (e.g. 10-digit account codes) vetoes the pattern stage
+    if decided and all(label == decided[0] for label in header_ev):
+        return "pattern", decided[0], decided[1], pattern
+
+    labels = set(pattern) | set(header_ev)
+    # noisy-OR: independent signals reinforce each other
+    combined = {
+        label: 1 - (1 - header_ev.get(label, 0.0)) * (1 - pattern.get(label, 0.0))
+        for label in labels
+    }
+    decided = _decide(combined, min_confidence, min_margin)
+    if decided and decided[0] in header_ev:
+        return "header", decided[0], decided[1], combined
+    return None
+
+
+# -------------------------------
+# Cascade
+# -------------------------------
+
+def classify_columns_cascade(
+    df: pd.DataFrame,
+    centroids: Dict[str, List[float]],
+    client,
+    model: str,
+    samples_per_col: int = 10,
+    threshold: float = 0.6,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    min_margin: float = DEFAULT_MIN_MARGIN,
+) -> Tuple[List[dict], Dict[str, List[int]], dict]:
+    """
+    Like `classify_columns`, but only embeds columns the cheap stages can't decide.
+
+    Returns (mappings, by_label, stats); each mapping carries a `decided_by` stage.
+    """
+    samples_by_col, payloads = column_payloads(df, samples_per_col)
+    profiles = profile_columns(df)
+    headers = list(df.columns)
+    mappings: List[Optional[dict]] = [None] * len(headers)
+    stats = {stage: 0 for stage in STAGES}
+
+    ambiguous: List[int] = []
+    for idx, col in enumerate(headers):
+        decision = cheap_decision(col, profiles[idx], min_confidence, min_margin)
+        if decision is None:
+            ambiguous.append(idx)
+            continue
+        stage, label, conf, all_conf = decision
+        alternatives = sorted(((l, s) for l, s in all_conf.items() if l != label),
+                              key=lambda x: x[1], reverse=True)[:2]
+        mappings[idx] = {
+            "column_index": idx,
+            "column_header": str(col),
+            "predicted_category": label,
+            "confidence": round(float(conf), 3),
+            "alternatives": [{"label": l, "score": round(float(s), 3)} for l, s in alternatives],
+            "sample_preview": samples_by_col[idx],
+            "decided_by": stage,
+        }
+        stats[stage] += 1
+
+    if ambiguous:
+        with metrics.stage("classification", "embed", items=len(ambiguous)):
+            vectors = embed_texts(client, [payloads[i] for i in ambiguous], model=model)
+        scored, _ = score_columns([headers[i] for i in ambiguous], [samples_by_col[i] for i in ambiguous],
+                                  vectors, centroids, threshold, profiles=[profiles[i] for i in ambiguous])
+        for i, m in zip(ambiguous, scored):
+            m["column_index"] = i
+            m["decided_by"] = "embedding"
+            mappings[i] = m
+        stats["embedding"] = len(ambiguous)
+
+    disambiguate_dates(mappings, profiles)
+    stats["columns"] = len(headers)
+    stats["embedding_skipped_ratio"] = round(1 - len(ambiguous) / len(headers), 3) if headers else 0.0
+    return mappings, group_by_label(mappings, centroids.keys()), stats
@@ -0,0 +1,145 @@
+"""
+Precompiled, versioned centroid artifacts.
+
+A build step embeds the exemplars once and writes:
+  - centroids.npy   float32 matrix, one row per label
+  - centroids.json  manifest: format version, embed model, exemplar hash, labels
+
+Loaders memory-map the matrix read-only, so every process (and every gunicorn
+worker forked from a preloaded master) shares the same page-cache pages
+instead of holding its own copy. An artifact is only reused while its manifest
+matches the current embed model and `TARGET_EXEMPLARS` hash; otherwise it is
+rebuilt.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+ARTIFACT_VERSION = 1
+MATRIX_FILENAME = "centroids.npy"
+MANIFEST_FILENAME = "centroids.json"
+
+# Process-wide artifacts loaded at startup, keyed by (directory, model)
+_loaded: Dict[Tuple[str, str], "CentroidArtifact"] = {}
+
+
+def exemplar_hash(exemplars: Dict[str, List[str]]) -> str:
+    blob = json.dumps(exemplars, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CentroidArtifact:
+    labels: List[str]
+    matrix: np.ndarray
+    manifest: dict = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """{label: centroid row}; rows are views into the shared matrix, not copies."""
+        return {label: self.matrix[i] for i, label in enumerate(self.labels)}
+
+
+# -------------------------------
+# Build / load
+# -------------------------------
+
+def write_centroid_artifact(
+    directory,
+    centroids: Dict[str, List[float]],
+    model: str,
+    exemplars: Dict[str, List[str]],
+) -> dict:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    labels = list(centroids.keys())
+    matrix = np.asarray([centroids[label] for label in labels], dtype=np.float32)
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "embed_model": model,
+        "exemplar_hash": exemplar_hash(exemplars),
+        "labels": labels,
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+    # write to temp files and rename, so concurrent readers never see a partial artifact
+    pid = os.getpid()
+    tmp_matrix = directory / f".{MATRIX_FILENAME}.{pid}.tmp"
+    tmp_manifest = directory / f".{MANIFEST_FILENAME}.{pid}.tmp"
+    with open(tmp_matrix, "wb") as f:
+        np.save(f, matrix)
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_matrix, directory / MATRIX_FILENAME)
+    os.replace(tmp_manifest, directory / MANIFEST_FILENAME)
+    return manifest
+
+
+def load_centroid_artifact(
+    directory,
+    model: str,
+    exemplars: Dict[str, List[str]],
+) -> Optional[CentroidArtifact]:
+    """Memory-map the artifact, or return None if it is missing or stale."""
+    directory = Path(directory)
+    try:
+        with open(directory / MANIFEST_FILENAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (manifest.get("version") != ARTIFACT_VERSION
+            or manifest.get("embed_model") != model
+            or manifest.get("exemplar_hash") != exemplar_hash(exemplars)):
+        return None
+
+    try:
+        matrix = np.load(directory / MATRIX_FILENAME, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if matrix.shape[0] != len(manifest["labels"]):
+        return None
+    return CentroidArtifact(labels=list(manifest["labels"]), matrix=matrix, manifest=manifest)
+
+
+def get_or_build_centroids(
+    client,
+    exemplars: Dict[str, List[str]],
+    model: str,
+    directory,
+) -> CentroidArtifact:
+    """Load the artifact for (model, exemplars); rebuild it first if it is stale."""
+    # imported lazily: the classifier module pulls in the OpenAI SDK and pandas
+    from accounting.services.classify_columns_with_embeddings import build_centroids
+
+    artifact = load_centroid_artifact(directory, model, exemplars)
+    if artifact is None:
+        centroids = build_centroids(client, exemplars, model=model)
+        write_centroid_artifact(directory, centroids, model, exemplars)
+        artifact = load_centroid_artifact(directory, model, exemplars)
+    _loaded[(str(directory), model)] = artifact
+    return artifact
+
+
+# -------------------------------
+# Process-wide registry
+# -------------------------------
+
+def preload(directory, model: str, exemplars: Dict[str, List[str]]) -> Optional[CentroidArtifact]:
+    """Load an artifact at startup without building it (no API calls)."""
+    artifact = load_centroid_artifact(directory, model, exemplars)
+    if artifact is not None:
+        _loaded[(str(directory), model)] = artifact
+    return artifact
+
+
+def get_loaded(directory, model: str) -> Optional[CentroidArtifact]:
+    return _loaded.get((str(directory), model))
@@ -0,0 +1,362 @@
+"""
+Background classification jobs.
+
+The upload endpoint only stores the workbook and a `ClassificationJob` row;
+classification runs off the request thread in one of two runners (no
+external broker either way):
+
+  - "local": a process pool inside the web process (default)
+  - "db":    jobs stay queued in the database and are claimed by
+             `python manage.py classification_worker` processes
+
+Both runners call `run_job`, which embeds the columns in chunks and writes
+per-column progress to the job row after each chunk, so the status endpoint
+can report it while the job runs. A claimed job carries a lease that its
+worker renews while alive; `reclaim_jobs` queues jobs whose lease expired
+(worker killed, web process restarted) again, and with the "local" runner
+resubmits queued jobs that no pool picked up, so nothing stays queued or
+running forever. The same runners convert uploaded workbooks into the
+preview cache (`enqueue_conversion`). Columns a user confirmed for a known
+header layout skip embedding. A job with a `previous` job re-classifies only the
+columns whose fingerprint changed (see `incremental`) and records a diff of
+the predictions.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounting.models import ClassificationJob
+from accounting.services import metrics
+from accounting.services.centroid_artifacts import get_or_build_centroids
+from accounting.services.classify_columns_with_embeddings import (
+    DEFAULT_EMBED_MODEL,
+    TARGET_EXEMPLARS,
+    column_payloads,
+    group_by_label,
+    score_columns,
+)
+from accounting.services.column_profile import profile_columns
+from accounting.services.embedders import resolve_embedder
+from accounting.services.embedding_batch import embed_texts
+from accounting.services.embedding_cache import EmbeddingCache
+from accounting.services.header_memory import classify_with_memory, learn_correction, remember_mappings
+from accounting.services.incremental import (
+    classifier_context,
+    column_fingerprints,
+    diff_predictions,
+    reusable_columns,
+)
+from accounting.services.sampling import candidate_count
+from accounting.services import workbook_cache
+from accounting.services.workbook_cache import read_samples
+from accounting.services.workbook_reader import parse_sheet
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+# Columns embedded per progress update
+PROGRESS_CHUNK = 16
+# Seconds between reclaim passes triggered by enqueueing (local runner)
+RECLAIM_INTERVAL = 60.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+_classifier = None
+_last_reclaim: Optional[float] = None
+
+
+def _get_classifier():
+    """(embedder, centroids), built once per worker process."""
+    global _classifier
+    if _classifier is None:
+        cache = None
+        if settings.EMBEDDING_CACHE_PATH:
+            cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+        embedder = resolve_embedder(settings.EMBEDDING_BACKENDS, api_key=settings.OPENAI_API_KEY,
+                                    model=DEFAULT_EMBED_MODEL, cache=cache)
+        artifact = get_or_build_centroids(embedder, TARGET_EXEMPLARS, embedder.model,
+                                          settings.CENTROID_ARTIFACT_DIR)
+        _classifier = (embedder, artifact.as_dict())
+    return _classifier
+
+
+# -------------------------------
+# Running a job
+# -------------------------------
+
+def _lease() -> datetime:
+    return timezone.now() + timedelta(seconds=settings.CLASSIFICATION_JOB_LEASE_SECONDS)
+
+
+class _Heartbeat:
+    """Renews a running job's lease from a side thread, so long steps keep it too."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="classification-heartbeat", daemon=True)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(settings.CLASSIFICATION_JOB_LEASE_SECONDS / 3):
+                try:
+                    (ClassificationJob.objects.filter(pk=self.job_id, status=ClassificationJob.RUNNING)
+                     .update(locked_until=_lease()))
+                except Exception:
+                    logger.exception("Renewing the lease of classification job %s failed.", self.job_id)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def _save_progress(job: ClassificationJob, **fields) -> None:
+    for name, value in fields.items():
+        setattr(job, name, value)
+    with metrics.stage("classification", "persist"):
+        ClassificationJob.objects.filter(pk=job.pk).update(**fields)
+
+
+def _classify_columns(job: ClassificationJob, embedder, centroids, headers: List, samples_by_col, payloads,
+                      profiles, fingerprints: List[str], previous: Optional[ClassificationJob],
+                      indices: List[int]) -> List[dict]:
+    """
+    Embed and score the columns at `indices` in chunks, recording progress,
+    and return their mappings (the other columns were answered from the
+    mapping memory). Columns whose fingerprint is unchanged since `previous`
+    reuse its mappings instead.
+    """
+    wanted = set(indices)
+    reused = reusable_columns(fingerprints, previous.fingerprints, previous.columns) if previous else {}
+    reused = {i: m for i, m in reused.items() if i in wanted}
+    pending = [i for i in indices if i not in reused]
+    done = len(headers) - len(pending)
+
+    columns = [{"column_index": i, "column_header": str(h), "status": "memory"} if i not in wanted
+               else dict(reused[i], status="reused") if i in reused
+               else {"column_index": i, "column_header": str(h), "status": "pending"}
+               for i, h in enumerate(headers)]
+    _save_progress(job, columns_done=done, columns=columns, columns_reused=len(reused))
+
+    vectors: List[List[float]] = []
+    for start in range(0, len(pending), PROGRESS_CHUNK):
+        chunk = pending[start:start + PROGRESS_CHUNK]
+        with metrics.stage("classification", "embed", items=len(chunk)):
+            vectors.extend(embed_texts(embedder, [payloads[i] for i in chunk], model=embedder.model))
+        for i in chunk:
+            columns[i]["status"] = "embedded"
+        _save_progress(job, columns_done=done + len(vectors), columns=columns)
+
+    # only the changed columns are scored (and go through the date post-pass)
+    scored, _ = score_columns([headers[i] for i in pending], [samples_by_col[i] for i in pending],
+                              vectors, centroids, settings.CLASSIFICATION_THRESHOLD,
+                              profiles=[profiles[i] for i in pending])
+    for i, m in zip(pending, scored):
+        m["column_index"] = i
+        m["status"] = "done"
+        columns[i] = m
+    return [columns[i] for i in indices]
+
+
+def run_job(job_id) -> None:
+    """
+    Classify one queued job's workbook, recording progress on the job row.
+    Columns a user confirmed for a known header layout are answered from the
+    mapping memory (see `header_memory`); the rest are classified. The job's
+    lease is renewed until it finishes.
+    """
+    close_old_connections()
+    job = ClassificationJob.objects.get(pk=job_id)
+    _save_progress(job, status=ClassificationJob.RUNNING, started_at=timezone.now(), error="", locked_until=_lease())
+    with _Heartbeat(job.pk):
+        _run_job(job)
+
+
+def _run_job(job: ClassificationJob) -> None:
+    try:
+        embedder, centroids = _get_classifier()
+        samples_per_col = settings.CLASSIFICATION_SAMPLES_PER_COLUMN
+        threshold = settings.CLASSIFICATION_THRESHOLD
+        df = read_samples(job.file.path, sheet=parse_sheet(job.sheet),
+                          samples_per_col=candidate_count(samples_per_col))
+        headers = list(df.columns)
+        samples_by_col, payloads = column_payloads(df, samples_per_col)
+        profiles = profile_columns(df)
+        context = classifier_context(embedder.name, embedder.model, centroids, threshold)
+        fingerprints = column_fingerprints(payloads, profiles, context)
+        _save_progress(job, columns_total=len(headers), columns_done=0, fingerprints=fingerprints)
+
+        previous = job.previous
+        if previous is not None and previous.status != ClassificationJob.DONE:
+            previous = None
+        # a column whose contents changed since `previous` is classified again, even under a confirmed header
+        changed = set()
+        if previous is not None:
+            reused = reusable_columns(fingerprints, previous.fingerprints, previous.columns)
+            changed = {i for i in range(len(headers)) if i not in reused}
+        mappings, by_label, _ = classify_with_memory(
+            df, centroids, embedder, embedder.model, samples_per_col=samples_per_col, threshold=threshold,
+            classify=lambda indices: _classify_columns(job, embedder, centroids, headers, samples_by_col,
+                                                       payloads, profiles, fingerprints, previous, indices),
+            profiles=profiles, changed=changed,
+        )
+        for m in mappings:
+            m.setdefault("status", "done")
+        diff = diff_predictions(previous.columns, mappings) if previous else {}
+        _save_progress(job, status=ClassificationJob.DONE, columns=mappings, by_label=by_label, diff=diff,
+                       columns_done=len(mappings), finished_at=timezone.now(), locked_until=None)
+    except Exception as e:
+        _save_progress(job, status=ClassificationJob.FAILED, error=f"{type(e).__name__}: {e}",
+                       finished_at=timezone.now(), locked_until=None)
+    finally:
+        metrics.log_event("classification_job", job_id=str(job.pk), status=job.status,
+                          columns=job.columns_total, reused=job.columns_reused, attempts=job.attempts)
+        metrics.flush()
+
+
+@transaction.atomic
+def apply_corrections(job: ClassificationJob, corrections: List[dict], confirm: bool = False) -> ClassificationJob:
+    """
+    Overwrite predictions of a finished job with the user's labels and teach
+    them to the mapping memory, so the next upload of the layout comes back
+    corrected. With `confirm` the whole (corrected) result is remembered.
+    """
+    job = ClassificationJob.objects.select_for_update().get(pk=job.pk)
+    columns = [dict(c) for c in job.columns]
+    headers = [c["column_header"] for c in columns]
+    for c in corrections:
+        columns[c["column_index"]].update(predicted_category=c["label"], confidence=1.0, decided_by="correction")
+        if not confirm:
+            learn_correction(headers, c["column_index"], c["label"], content=columns[c["column_index"]].get("content"),
+                             source=job.original_name)
+    if confirm:
+        remember_mappings(columns, source=job.original_name)
+    _save_progress(job, columns=columns, by_label=group_by_label(columns, TARGET_EXEMPLARS.keys()))
+    return job
+
+
+# -------------------------------
+# Runners
+# -------------------------------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawned (not forked) workers: no database connections are inherited from the web process
+        _pool = ProcessPoolExecutor(max_workers=settings.CLASSIFICATION_JOB_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=django.setup)
+    return _pool
+
+
+def _submit(job_ids: Sequence) -> None:
+    # the lease marks the jobs as handed to this process's pool; once it expires they are resubmitted
+    ClassificationJob.objects.filter(pk__in=job_ids, status=ClassificationJob.QUEUED).update(locked_until=_lease())
+    pool = _get_pool()
+    for pk in job_ids:
+        pool.submit(run_queued_job, pk)
+
+
+def enqueue(job: ClassificationJob) -> None:
+    """Hand a freshly created job to the configured runner once it is committed."""
+    if settings.CLASSIFICATION_JOB_RUNNER == "local":
+        transaction.on_commit(lambda: _submit([job.pk]))
+        transaction.on_commit(_maybe_reclaim)
+    # "db": the row itself is the queue entry; a classification_worker picks it up
+
+
+def enqueue_conversion(digest: str, index: int) -> None:
+    """Convert a workbook sheet into the preview cache off the request (see `workbook_cache.request_conversion`)."""
+    local = settings.CLASSIFICATION_JOB_RUNNER == "local"
+    if workbook_cache.request_conversion(digest, index, leased=local) and local:
+        _get_pool().submit(workbook_cache.convert_pending, digest, index)
+    # "db": classification_worker processes claim the pending sheet
+
+
+def claim_job(job_id) -> bool:
+    """Move a queued job to running under a fresh lease; False if another runner got it first."""
+    return bool(ClassificationJob.objects
+                .filter(pk=job_id, status=ClassificationJob.QUEUED)
+                .update(status=ClassificationJob.RUNNING, started_at=timezone.now(), locked_until=_lease(),
+                        attempts=F("attempts") + 1))
+
+
+def run_queued_job(job_id) -> None:
+    """Pool entry point: run the job unless it was claimed elsewhere (resubmitted after a reclaim)."""
+    close_old_connections()
+    if claim_job(job_id):
+        run_job(job_id)
+
+
+def claim_next_job() -> Optional[ClassificationJob]:
+    """Atomically move the oldest queued job to running (for the "db" runner)."""
+    with transaction.atomic():
+        job = (ClassificationJob.objects
+               .select_for_update(skip_locked=True)
+               .filter(status=ClassificationJob.QUEUED)
+               .order_by("created_at")
+               .first())
+        # the status guard in claim_job keeps the claim safe where row locks are unsupported (SQLite)
+        if job is None or not claim_job(job.pk):
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def reclaim_jobs(resubmit: bool = True) -> Dict[str, int]:
+    """
+    Recover jobs whose runner went away. Running jobs with an expired lease
+    are queued again, or failed once they used CLASSIFICATION_JOB_MAX_ATTEMPTS;
+    with the "local" runner and `resubmit`, queued jobs whose lease expired
+    before any pool worker claimed them are submitted to this process's pool.
+    """
+    now = timezone.now()
+    expired = Q(locked_until__lt=now) | Q(locked_until__isnull=True)
+    running = ClassificationJob.objects.filter(expired, status=ClassificationJob.RUNNING)
+    max_attempts = settings.CLASSIFICATION_JOB_MAX_ATTEMPTS
+    failed = running.filter(attempts__gte=max_attempts).update(
+        status=ClassificationJob.FAILED, locked_until=None, finished_at=now,
+        error=f"The worker running this job stopped responding {max_attempts} times; giving up.")
+    requeued = running.update(status=ClassificationJob.QUEUED, locked_until=None)
+    resubmitted = 0
+    if resubmit and settings.CLASSIFICATION_JOB_RUNNER == "local":
+        ids = list(ClassificationJob.objects.filter(expired, status=ClassificationJob.QUEUED)
+                   .order_by("created_at").values_list("pk", flat=True))
+        if ids:
+            _submit(ids)
+        resubmitted = len(ids)
+    if failed or requeued or resubmitted:
+        logger.warning("Reclaimed classification jobs: %d requeued, %d failed, %d resubmitted.",
+                       requeued, failed, resubmitted)
+    return {"requeued": requeued, "failed": failed, "resubmitted": resubmitted}
+
+
+def _maybe_reclaim() -> None:
+    global _last_reclaim
+    if _last_reclaim is not None and time.monotonic() - _last_reclaim < RECLAIM_INTERVAL:
+        return
+    _last_reclaim = time.monotonic()
+    try:
+        reclaim_jobs()
+    except Exception:
+        logger.exception("Reclaiming classification jobs failed.")
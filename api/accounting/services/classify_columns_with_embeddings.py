@@ -1,37 +1,57 @@
 #!/usr/bin/env python3
 """
-Classify Excel columns into 5 categories using OpenAI embeddings + centroids.
+Classify Excel columns into 6 categories using OpenAI embeddings + centroids.
 
 Targets:
-- name
-- phone_number
-- debt_amount
-- debt_date
-- other_date
+- cari_hesap_kodu
+- cari_hesap_ismi
+- telefon_no
+- bakiye
+- son_fatura_tarihi
+- son_tahsilat_tarihi
 
-Usage (macOS/Linux):
-  python classify_columns_with_embeddings.py --excel "your_file.xlsx" [--sheet "Sheet1"] [--samples 10] [--threshold 0.6]
+Usage (macOS/Linux, from the `api/` directory):
+  python -m accounting.services.classify_columns_with_embeddings --excel "your_file.xlsx" [--sheet "Sheet1"] [--samples 10] [--threshold 0.6]
+  python -m accounting.services.classify_columns_with_embeddings --batch "exports/2025-08/" [--workers 4]
 
 Requirements:
-  pip install openai pandas python-dateutil chardet
+  pip install openai pandas numpy openpyxl python-dateutil chardet   (+ xlrd for .xls)
 
 Environment:
-  export OPENAI_API_KEY="sk-..."
+  export OPENAI_API_KEY="sk-..."      (not needed with --embedder local)
+  export EMBEDDING_BACKENDS="openai,local"   (fallback chain; first available backend wins)
 """
 
 import argparse
 import json
-import math
 import os
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 try:
     from openai import OpenAI
-except Exception as e:
-    raise SystemExit("Please install the OpenAI SDK v1: pip install openai\n" + str(e))
+except ImportError:
+    # only the OpenAI backend needs the SDK; the local backend runs without it
+    OpenAI = None
+
+from accounting.services import metrics
+from accounting.services.centroid_artifacts import get_or_build_centroids
+from accounting.services.column_profile import (
+    AMOUNT_PATTERN,
+    DATE_PATTERN,
+    PHONE_STRIP,
+    ColumnProfile,
+    profile_columns,
+    profile_values,
+)
+from accounting.services.embedding_batch import embed_texts
+from accounting.services.embedders import resolve_embedder
+from accounting.services.embedding_cache import EmbeddingCache
+from accounting.services.sampling import candidate_count, select_samples
+from accounting.services.scoring import CentroidScorer
+from accounting.services.workbook_reader import DEFAULT_WINDOW_ROWS, read_samples
 
 
 # -------------------------------
@@ -159,10 +179,10 @@ TARGET_EXEMPLARS: Dict[str, List[str]] = {
 
 # Heuristic keywords for post-adjustment between two date-like columns
 DATE_HINTS = {
-    "debt_date": [
+    "son_fatura_tarihi": [
         "borç", "issue", "issued", "created", "düzenlenme", "fatura", "oluşturma"
     ],
-    "other_date": [
+    "son_tahsilat_tarihi": [
         "vade", "due", "ödeme", "payment", "son güncelleme", "update", "tahsilat"
     ]
 }
@@ -173,43 +193,36 @@ DATE_HINTS = {
 # -------------------------------
 
 def cosine_similarity(a: List[float], b: List[float]) -> float:
-    dot = sum(x*y for x, y in zip(a, b))
-    na = math.sqrt(sum(x*x for x in a))
-    nb = math.sqrt(sum(y*y for y in b))
-    denom = (na * nb)
+    va = np.asarray(a, dtype=np.float64)
+    vb = np.asarray(b, dtype=np.float64)
+    denom = float(np.linalg.norm(va) * np.linalg.norm(vb))
     if denom == 0:
         return 0.0
-    return dot / denom
+    return float(va @ vb) / denom
 
 
 def average_vectors(vecs: List[List[float]]) -> List[float]:
     if not vecs:
         return []
-    n = len(vecs[0])
-    sums = [0.0] * n
-    for v in vecs:
-        for i in range(n):
-            sums[i] += v[i]
-    return [s / len(vecs) for s in sums]
+    return np.asarray(vecs, dtype=np.float64).mean(axis=0).tolist()
 
 
-def likely_phone(texts: List[str]) -> bool:
-    """Light heuristic: if many rows look like TR phone numbers (+90 or 10+ digits)."""
+def phone_hit_rate(texts: List[str]) -> float:
+    """Share of non-empty rows that look like TR phone numbers (+90 or 10+ digits)."""
     phone_like = 0
     total = 0
     for t in texts:
-        s = re.sub(r"[^\d+]", "", str(t))
+        s = PHONE_STRIP.sub("", str(t))
         if not s:
             continue
         total += 1
-        if s.startswith("+90") or len(re.sub(r"\D", "", s)) >= 10:
+        if s.startswith("+90") or sum(ch.isdigit() for ch in s) >= 10:
             phone_like += 1
-    return total > 0 and (phone_like / total) >= 0.4
+    return phone_like / total if total else 0.0
 
 
-def likely_amount(texts: List[str]) -> bool:
-    """Heuristic for TRY amounts: TL/TRY/₺ or numeric with thousand/decimal separators."""
-    patt = re.compile(r"(TL|TRY|₺)|^\s*\d{1,3}([.,]\d{3})*([.,]\d{2})?\s*$", re.IGNORECASE)
+def amount_hit_rate(texts: List[str]) -> float:
+    """Share of rows that look like TRY amounts: TL/TRY/₺ or numeric with thousand/decimal separators."""
     hits = 0
     total = 0
     for t in texts:
@@ -217,14 +230,13 @@ def likely_amount(texts: List[str]) -> bool:
         if not s:
             continue
         total += 1
-        if patt.search(s):
+        if AMOUNT_PATTERN.search(s):
             hits += 1
-    return total > 0 and (hits / total) >= 0.4
+    return hits / total if total else 0.0
 
 
-def likely_date(texts: List[str]) -> bool:
-    """Heuristic for common date patterns."""
-    patt = re.compile(r"\b(\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}|\d{4}[-/]\d{1,2}[-/]\d{1,2})\b")
+def date_hit_rate(texts: List[str]) -> float:
+    """Share of rows matching common date patterns."""
     hits = 0
     total = 0
     for t in texts:
@@ -232,9 +244,24 @@ def likely_date(texts: List[str]) -> bool:
         if not s.strip():
             continue
         total += 1
-        if patt.search(s):
+        if DATE_PATTERN.search(s):
             hits += 1
-    return total > 0 and (hits / total) >= 0.4
+    return hits / total if total else 0.0
+
+
+def likely_phone(texts: List[str]) -> bool:
+    """Light heuristic: if many rows look like TR phone numbers (+90 or 10+ digits)."""
+    return phone_hit_rate(texts) >= 0.4
+
+
+def likely_amount(texts: List[str]) -> bool:
+    """Heuristic for TRY amounts: TL/TRY/₺ or numeric with thousand/decimal separators."""
+    return amount_hit_rate(texts) >= 0.4
+
+
+def likely_date(texts: List[str]) -> bool:
+    """Heuristic for common date patterns."""
+    return date_hit_rate(texts) >= 0.4
 
 
 def keyword_score(header: str, keywords: List[str]) -> int:
@@ -246,20 +273,22 @@ def keyword_score(header: str, keywords: List[str]) -> int:
 # Embedding helpers
 # -------------------------------
 
-def embed_text(client: OpenAI, text: str, model: str = DEFAULT_EMBED_MODEL) -> List[float]:
-    # truncate to be safe; embeddings models accept long inputs but we keep it short
-    text = text.strip()
-    if len(text) > 8000:
-        text = text[:8000]
-    resp = client.embeddings.create(model=model, input=text)
-    return resp.data[0].embedding
+def embed_text(client: "OpenAI", text: str, model: str = DEFAULT_EMBED_MODEL) -> List[float]:
+    return embed_texts(client, [text], model=model)[0]
+
 
+def build_centroids(client: "OpenAI", exemplars: Dict[str, List[str]], model: str) -> Dict[str, List[float]]:
+    # embed every exemplar of every label in as few requests as possible
+    labels = list(exemplars.keys())
+    flat = [it for label in labels for it in exemplars[label]]
+    vecs = embed_texts(client, flat, model=model)
 
-def build_centroids(client: OpenAI, exemplars: Dict[str, List[str]], model: str) -> Dict[str, List[float]]:
     centroids = {}
-    for label, items in exemplars.items():
-        vecs = [embed_text(client, it, model=model) for it in items]
-        centroids[label] = average_vectors(vecs)
+    start = 0
+    for label in labels:
+        end = start + len(exemplars[label])
+        centroids[label] = average_vectors(vecs[start:end])
+        start = end
     return centroids
 
 
@@ -267,147 +296,321 @@ def build_centroids(client: OpenAI, exemplars: Dict[str, List[str]], model: str)
 # Classification logic
 # -------------------------------
 
+def column_payloads(
+    df: pd.DataFrame,
+    samples_per_col: int = 10,
+    token_budget: Optional[int] = None
+) -> Tuple[List[List[str]], List[str]]:
+    """
+    Sample values and the `HEADER: ... SAMPLES: ...` embedding payload per column.
+
+    Samples are chosen by `sampling.select_samples` (distinct, format-diverse,
+    within `token_budget` estimated tokens per payload) from the column's
+    non-null values, so `df` may hold more candidates than `samples_per_col`.
+    """
+    samples_by_col: List[List[str]] = []
+    payloads: List[str] = []
+    tokens = 0
+    for col in df.columns:
+        sample = select_samples(col, df[col].dropna(), max_samples=samples_per_col, token_budget=token_budget)
+        samples_by_col.append(sample.values)
+        payloads.append(sample.payload)
+        tokens += sample.tokens
+    metrics.SAMPLE_TOKENS.inc(tokens)
+    return samples_by_col, payloads
+
+
 def classify_columns(
     df: pd.DataFrame,
     centroids: Dict[str, List[float]],
-    client: OpenAI,
+    client: "OpenAI",
     model: str,
     samples_per_col: int = 10,
-    threshold: float = 0.6
+    threshold: float = 0.6,
+    token_budget: Optional[int] = None
 ) -> Tuple[List[dict], Dict[str, List[int]]]:
     """
+    `token_budget` caps each column's payload (see `sampling.select_samples`).
+
     Returns:
         - mappings: list of dict with predictions per column
         - by_label: indices per predicted label
     """
-    mappings = []
-    by_label: Dict[str, List[int]] = {k: [] for k in centroids.keys()}
-
-    for idx, col in enumerate(df.columns):
-        col_series = df[col].dropna().astype(str)
-        samples = col_series.head(samples_per_col).tolist()
-        payload = f"HEADER: {col}\nSAMPLES: " + " ; ".join(samples)
-        vec = embed_text(client, payload, model=model)
-
-        # similarity to each centroid
-        scored = sorted(
-            ((label, cosine_similarity(vec, centroid)) for label, centroid in centroids.items()),
-            key=lambda x: x[1], reverse=True
-        )
-        top_label, top_score = scored[0]
-
-        # Heuristic nudges (do not override if score is clearly strong)
-        # - If phone/amount/date patterns are detected, bump corresponding label if close
-        nudged_label = top_label
-        header_lower = str(col).lower()
-        if likely_phone(samples):
-            # bump phone if it's close (within margin) or top is not overwhelmingly strong
-            for label, score in scored:
-                if label == "phone_number" and (score + 0.05) >= top_score:
-                    nudged_label, top_score = label, max(top_score, score)
-                    break
-
-        if likely_amount(samples):
-            for label, score in scored:
-                if label == "debt_amount" and (score + 0.05) >= top_score:
-                    nudged_label, top_score = label, max(top_score, score)
-                    break
-
-        if likely_date(samples):
-            # keep whichever date label scores higher; we'll disambiguate later
-            pass
+    # Collect every column's payload first so they can be embedded in batches
+    samples_by_col, payloads = column_payloads(df, samples_per_col, token_budget)
+    with metrics.stage("classification", "embed", items=len(payloads)):
+        vectors = embed_texts(client, payloads, model=model)
+    return score_columns(list(df.columns), samples_by_col, vectors, centroids, threshold,
+                         profiles=profile_columns(df))
+
+
+def score_columns(
+    headers: List,
+    samples_by_col: List[List[str]],
+    vectors: List[List[float]],
+    centroids: Dict[str, List[float]],
+    threshold: float = 0.6,
+    profiles: Optional[List[ColumnProfile]] = None
+) -> Tuple[List[dict], Dict[str, List[int]]]:
+    """
+    Turn column embeddings into predictions (shared by the sync and async paths).
+
+    `profiles` (see column_profile) drive the pattern nudges and the date
+    post-pass; without them the columns are profiled from their samples.
+    """
+    if profiles is None:
+        profiles = [profile_values(samples) for samples in samples_by_col]
+
+    with metrics.stage("classification", "score", items=len(headers)):
+        mappings = []
+        by_label: Dict[str, List[int]] = {k: [] for k in centroids.keys()}
+
+        # similarity of every column to every centroid in one matmul
+        scorer = CentroidScorer(centroids)
+        scores = scorer.score(vectors)
+        ranked = scorer.ranked(scores, k=3)
+
+        for idx, col in enumerate(headers):
+            samples = samples_by_col[idx]
+            scored = ranked[idx]
+            top_label, top_score = scored[0]
+
+            def label_score(label: str):
+                j = scorer.label_index.get(label)
+                return None if j is None else float(scores[idx, j])
+
+            # Heuristic nudges (do not override if score is clearly strong)
+            # - If phone/amount/date patterns are detected, bump corresponding label if close
+            nudged_label = top_label
+            profile = profiles[idx]
+            if profile.likely_phone:
+                # bump phone if it's close (within margin) or top is not overwhelmingly strong
+                score = label_score("telefon_no")
+                if score is not None and (score + 0.05) >= top_score:
+                    nudged_label, top_score = "telefon_no", max(top_score, score)
+
+            if profile.likely_amount:
+                score = label_score("bakiye")
+                if score is not None and (score + 0.05) >= top_score:
+                    nudged_label, top_score = "bakiye", max(top_score, score)
+
+            if profile.likely_date:
+                # keep whichever date label scores higher; we'll disambiguate later
+                pass
+
+            prediction = {
+                "column_index": idx,
+                "column_header": str(col),
+                "predicted_category": nudged_label if top_score >= threshold else "unknown",
+                "confidence": round(float(top_score), 3),
+                "alternatives": [
+                    {"label": l, "score": round(float(s), 3)} for l, s in scored[1:3]
+                ],
+                "sample_preview": samples,
+            }
+            mappings.append(prediction)
+            if prediction["predicted_category"] in by_label:
+                by_label[prediction["predicted_category"]].append(idx)
+
+    with metrics.stage("classification", "post_pass", items=len(mappings)):
+        disambiguate_dates(mappings, profiles)
+
+    # Rebuild by_label after adjustments
+    return mappings, group_by_label(mappings, centroids.keys())
+
+
+def group_by_label(mappings: List[dict], labels) -> Dict[str, List[int]]:
+    by_label: Dict[str, List[int]] = {k: [] for k in labels}
+    for m in mappings:
+        if m["predicted_category"] in by_label:
+            by_label[m["predicted_category"]].append(m["column_index"])
+    return by_label
 
-        prediction = {
-            "column_index": idx,
-            "column_header": str(col),
-            "predicted_category": nudged_label if top_score >= threshold else "unknown",
-            "confidence": round(float(top_score), 3),
-            "alternatives": [
-                {"label": l, "score": round(float(s), 3)} for l, s in scored[1:3]
-            ],
-            "sample_preview": samples,
-        }
-        mappings.append(prediction)
-        if prediction["predicted_category"] in by_label:
-            by_label[prediction["predicted_category"]].append(idx)
-
-    # Post-pass: if we have multiple date-like columns, try to separate debt_date vs other_date
-    date_indices = [m["column_index"] for m in mappings
-                    if m["predicted_category"] in ("debt_date", "other_date", "unknown")]
+
+def disambiguate_dates(mappings: List[dict], profiles: Optional[List[ColumnProfile]] = None) -> None:
+    """Post-pass: if we have multiple date-like columns, try to separate invoice vs collection dates."""
+    invoice, collection = "son_fatura_tarihi", "son_tahsilat_tarihi"
+    date_indices = [i for i, m in enumerate(mappings)
+                    if m["predicted_category"] in (invoice, collection, "unknown")]
     # Evaluate keywords to break ties
     for i in date_indices:
         m = mappings[i]
         header = m["column_header"]
         # Only adjust if currently date-ish or unknown but looks like a date
-        looks_like_date = likely_date(m.get("sample_preview", []))
+        if profiles is not None:
+            looks_like_date = profiles[i].likely_date
+        else:
+            looks_like_date = likely_date(m.get("sample_preview", []))
         if not looks_like_date:
             continue
 
-        debt_kw = keyword_score(header, DATE_HINTS["debt_date"])
-        other_kw = keyword_score(header, DATE_HINTS["other_date"])
-
-        if debt_kw > other_kw and m["predicted_category"] in ("other_date", "unknown"):
-            m["predicted_category"] = "debt_date"
-        elif other_kw > debt_kw and m["predicted_category"] in ("debt_date", "unknown"):
-            m["predicted_category"] = "other_date"
-
-    # Rebuild by_label after adjustments
-    by_label = {k: [] for k in centroids.keys()}
-    for m in mappings:
-        if m["predicted_category"] in by_label:
-            by_label[m["predicted_category"]].append(m["column_index"])
+        invoice_kw = keyword_score(header, DATE_HINTS[invoice])
+        collection_kw = keyword_score(header, DATE_HINTS[collection])
 
-    return mappings, by_label
+        if invoice_kw > collection_kw and m["predicted_category"] in (collection, "unknown"):
+            m["predicted_category"] = invoice
+        elif collection_kw > invoice_kw and m["predicted_category"] in (invoice, "unknown"):
+            m["predicted_category"] = collection
 
 
 # -------------------------------
 # Main
 # -------------------------------
 
+def _setup_django() -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Classify Excel columns with OpenAI embeddings.")
-    parser.add_argument("--excel", required=True, help="Path to the Excel file (.xlsx/.xls).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--excel", help="Path to the workbook (.xlsx/.xls/.csv).")
+    source.add_argument("--batch", help="Directory or glob of workbooks; classifies every sheet of each.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes for --batch (default: CPU count).")
     parser.add_argument("--sheet", default=None, help="Sheet name or index (optional).")
     parser.add_argument("--samples", type=int, default=10, help="Sample values per column (default 10).")
     parser.add_argument("--threshold", type=float, default=0.6, help="Confidence threshold (default 0.6).")
-    parser.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL, help="Embeddings model name.")
+    parser.add_argument("--window-rows", type=int, default=DEFAULT_WINDOW_ROWS,
+                        help=f"Max data rows scanned for samples (default {DEFAULT_WINDOW_ROWS}).")
+    parser.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL, help="Embeddings model name (OpenAI backend).")
+    parser.add_argument("--embedder", default=os.getenv("EMBEDDING_BACKENDS", "openai,local"),
+                        help="Embedding backend fallback chain, e.g. 'openai,local' or 'local'.")
     parser.add_argument("--output-prefix", default="mapping", help="Output file prefix (default 'mapping').")
+    parser.add_argument("--centroids-dir", default=os.getenv("CENTROID_ARTIFACT_DIR", "artifacts/centroids"),
+                        help="Centroid artifact directory; rebuilt only when model/exemplars change.")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Decide obvious columns by pattern/header heuristics and embed only the rest "
+                             "(--excel only).")
+    parser.add_argument("--cascade-confidence", type=float, default=0.85,
+                        help="Confidence a heuristic stage needs to skip embedding (default 0.85).")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Concurrent embedding requests; >1 uses the async pipeline (default 1; --excel only).")
+    parser.add_argument("--embed-cache", default=os.getenv("EMBEDDING_CACHE_PATH"),
+                        help="SQLite embedding cache file (default $EMBEDDING_CACHE_PATH; disabled if unset).")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the header mapping memory (needs no database); always classify.")
+    parser.add_argument("--remember", action="store_true",
+                        help="Store this result in the header mapping memory as confirmed (--excel only).")
     args = parser.parse_args()
+    if args.batch and (args.cascade or args.concurrency > 1):
+        # batch mode embeds each workbook's columns in shared requests (see batch_classify)
+        parser.error("--cascade and --concurrency apply to --excel only, not to --batch.")
+    if args.excel and args.workers is not None:
+        parser.error("--workers applies to --batch only.")
+    if args.remember and (args.batch or args.no_memory):
+        parser.error("--remember needs --excel and the header mapping memory (drop --no-memory).")
+    if args.cascade and args.concurrency > 1:
+        parser.error("--cascade embeds its leftover columns synchronously; drop --concurrency.")
 
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise SystemExit("Please set OPENAI_API_KEY in your environment. Example:\n  export OPENAI_API_KEY='sk-...'")
-
-    client = OpenAI(api_key=api_key)
-
-    # Load Excel
+    cache = EmbeddingCache(args.embed_cache) if args.embed_cache else None
     try:
-        if args.sheet is None:
-            df = pd.read_excel(args.excel)
-        else:
-            # allow sheet index (int) or name (str)
-            try:
-                sheet = int(args.sheet)
-            except ValueError:
-                sheet = args.sheet
-            df = pd.read_excel(args.excel, sheet_name=sheet)
-    except Exception as e:
-        raise SystemExit(f"Failed to read Excel: {e}")
-
-    # Build centroids
-    print("Building class centroids from exemplars...")
-    centroids = build_centroids(client, TARGET_EXEMPLARS, model=args.embed_model)
+        embedder = resolve_embedder(args.embedder, api_key=api_key, model=args.embed_model, cache=cache)
+    except RuntimeError as e:
+        raise SystemExit(f"{e}. Set OPENAI_API_KEY (export OPENAI_API_KEY='sk-...') "
+                         f"or use --embedder local.")
+    if args.concurrency > 1 and embedder.name != "openai":
+        # the async pipeline drives AsyncOpenAI; other backends only have the sync path
+        parser.error(f"--concurrency needs the openai embedder, not {embedder.name!r}.")
+    print(f"Embedding backend: {embedder.name} ({embedder.model})")
+    client, model = embedder, embedder.model
+
+    sheet = args.sheet
+    if sheet is not None:
+        # allow sheet index (int) or name (str)
+        try:
+            sheet = int(sheet)
+        except ValueError:
+            pass
+
+    # Stream just enough rows to sample every column (no full-sheet parse)
+    if args.excel:
+        try:
+            df = read_samples(args.excel, sheet=sheet, samples_per_col=candidate_count(args.samples),
+                              window_rows=args.window_rows)
+        except Exception as e:
+            raise SystemExit(f"Failed to read Excel: {e}")
+
+    # Load precompiled centroids (rebuilt only if the model or exemplars changed)
+    print(f"Loading class centroids from {args.centroids_dir} ...")
+    artifact = get_or_build_centroids(client, TARGET_EXEMPLARS, model=model,
+                                      directory=args.centroids_dir)
+    centroids = artifact.as_dict()
+
+    if args.batch:
+        from accounting.services.batch_classify import run_batch
+
+        print(f"Batch classifying workbooks from: {args.batch}")
+        summary = run_batch(
+            args.batch, centroids, client, model, args.output_prefix,
+            sheet=sheet, samples_per_col=args.samples, threshold=args.threshold,
+            window_rows=args.window_rows, workers=args.workers,
+        )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        if cache is not None:
+            print(f"\nEmbedding cache: {cache.stats()}")
+        return
 
     # Classify
     print(f"Classifying {len(df.columns)} columns from: {args.excel}")
-    mappings, by_label = classify_columns(
-        df=df,
-        centroids=centroids,
-        client=client,
-        model=args.embed_model,
-        samples_per_col=args.samples,
-        threshold=args.threshold
-    )
+
+    def classify(frame):
+        if args.cascade:
+            from accounting.services.cascade import classify_columns_cascade
+
+            mappings, by_label, cascade_stats = classify_columns_cascade(
+                df=frame,
+                centroids=centroids,
+                client=client,
+                model=model,
+                samples_per_col=args.samples,
+                threshold=args.threshold,
+                min_confidence=args.cascade_confidence
+            )
+            print(f"Cascade decisions: {cascade_stats}")
+            return mappings, by_label
+        if args.concurrency > 1:
+            import asyncio
+
+            from accounting.services.async_classify import classify_columns_async, make_async_openai_embedder
+
+            async_embedder = make_async_openai_embedder(api_key, max_concurrency=args.concurrency, cache=cache)
+            return asyncio.run(classify_columns_async(
+                df=frame,
+                centroids=centroids,
+                embedder=async_embedder,
+                model=model,
+                samples_per_col=args.samples,
+                threshold=args.threshold
+            ))
+        return classify_columns(
+            df=frame,
+            centroids=centroids,
+            client=client,
+            model=model,
+            samples_per_col=args.samples,
+            threshold=args.threshold
+        )
+
+    if args.no_memory:
+        mappings, by_label = classify(df)
+    else:
+        # columns confirmed for a known header layout come from the mapping memory (database)
+        _setup_django()
+        from accounting.services.header_memory import classify_with_memory, remember_mappings
+
+        mappings, by_label, decided = classify_with_memory(
+            df, centroids, client, model, samples_per_col=args.samples, threshold=args.threshold,
+            classify=lambda indices: classify(df.iloc[:, indices])[0],
+        )
+        print(f"Mappings from: {decided}")
+        if args.remember:
+            remember_mappings(mappings, source=os.path.basename(args.excel))
+            print("Mappings remembered as confirmed.")
 
     # Save outputs
     json_path = f"{args.output_prefix}.json"
@@ -422,6 +625,8 @@ def main():
     for m in mappings:
         print(f"[{m['column_index']}] '{m['column_header']}' -> {m['predicted_category']} "
               f"(conf {m['confidence']}) alts={m['alternatives']}")
+    if cache is not None:
+        print(f"\nEmbedding cache: {cache.stats()}")
 
 if __name__ == "__main__":
     main()
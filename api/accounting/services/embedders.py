@@ -0,0 +1,198 @@
+"""
+Pluggable embedding backends.
+
+An `Embedder` turns texts into vectors for one model identity (`model`), which
+is also what centroid artifacts and caches are keyed by. Backends:
+
+  - OpenAIEmbedder       batched `embeddings.create` calls (optionally cached)
+  - LocalNgramEmbedder   hashed character n-grams with Turkish-aware
+                         normalization; no downloads, no network, ~ms per sheet
+
+Vectors from different backends live in different spaces, so a fallback chain
+(`resolve_embedder`) picks the first *available* backend for a whole run
+rather than mixing backends mid-classification.
+
+Every function that takes an embeddings `client` (embed_texts, build_centroids,
+classify_columns, ...) also accepts an `Embedder`.
+"""
+
+import os
+import re
+import unicodedata
+import zlib
+from typing import List, Optional, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+from accounting.services import metrics
+
+
+DEFAULT_BACKENDS = "openai,local"
+LOCAL_DIM = 512
+LOCAL_NGRAM_RANGE = (2, 4)
+
+
+@runtime_checkable
+class Embedder(Protocol):
+    name: str
+    model: str
+
+    def available(self) -> bool:
+        ...
+
+    def embed(self, texts: Sequence[str], model: Optional[str] = None) -> List[List[float]]:
+        ...
+
+
+# -------------------------------
+# OpenAI backend
+# -------------------------------
+
+class OpenAIEmbedder:
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "text-embedding-3-small",
+                 client=None, cache=None):
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        self._client = None
+        if client is not None:
+            self._client = self._wrap(client)
+
+    def _wrap(self, client):
+        if self.cache is None:
+            return client
+        from accounting.services.embedding_cache import CachedEmbeddingsClient
+
+        return CachedEmbeddingsClient(client, self.cache)
+
+    def available(self) -> bool:
+        if self._client is not None:
+            return True
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            return False
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from accounting.services.llm_client import get_client_manager
+
+            # shared pooled client: timeouts, retries and circuit breaker live there
+            self._client = self._wrap(get_client_manager(self.api_key).client())
+        return self._client
+
+    def embed(self, texts: Sequence[str], model: Optional[str] = None) -> List[List[float]]:
+        from accounting.services.embedding_batch import embed_texts
+
+        return embed_texts(self.client, texts, model=model or self.model)
+
+
+# -------------------------------
+# Local backend
+# -------------------------------
+
+# Turkish dotted/dotless i must be mapped before lower(), then ASCII-fold the rest
+_TR_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_TR_FOLD = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u"})
+_PAYLOAD_MARKERS = re.compile(r"\b(HEADER|SAMPLES):")
+_DIGITS = re.compile(r"\d")
+_SPACES = re.compile(r"\s+")
+_PUNCT = re.compile(r"[^\w ]+")
+
+
+def normalize_tr(text: str, fold_digits: bool = True) -> str:
+    """Turkish-aware casefold + ASCII fold; digits collapse to '0' so n-grams capture format."""
+    text = _PAYLOAD_MARKERS.sub(" ", str(text))
+    text = text.translate(_TR_UPPER).lower().translate(_TR_FOLD)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    if fold_digits:
+        text = _DIGITS.sub("0", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def normalize_header(header, fold_digits: bool = True) -> str:
+    """normalize_tr() with punctuation dropped, for comparing column headers."""
+    return " ".join(_PUNCT.sub(" ", normalize_tr(str(header), fold_digits)).split())
+
+
+class LocalNgramEmbedder:
+    """
+    Feature-hashed bag of character n-grams (word-boundary padded) plus word
+    unigrams, signed-hashed into `dim` buckets and L2-normalized.
+    """
+
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_DIM, ngram_range=LOCAL_NGRAM_RANGE):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model = f"local-char-ngram-v1-d{dim}"
+
+    def available(self) -> bool:
+        return True
+
+    def features(self, text: str) -> List[str]:
+        norm = normalize_tr(text)
+        feats = []
+        lo, hi = self.ngram_range
+        for word in norm.split(" "):
+            if not word:
+                continue
+            feats.append("w:" + word)
+            padded = f" {word} "
+            for n in range(lo, hi + 1):
+                feats.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return feats
+
+    def _vector(self, text: str) -> np.ndarray:
+        feats = self.features(text)
+        if not feats:
+            return np.zeros(self.dim, dtype=np.float32)
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+        buckets = (hashes % self.dim).astype(np.int64)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vec = np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed(self, texts: Sequence[str], model: Optional[str] = None) -> List[List[float]]:
+        metrics.EMBEDDING_INPUTS.inc(len(texts), backend=self.name)
+        return [self._vector(t).tolist() for t in texts]
+
+
+# -------------------------------
+# Fallback chain
+# -------------------------------
+
+def make_embedder(name: str, api_key: Optional[str] = None, model: str = "text-embedding-3-small",
+                  cache=None) -> Embedder:
+    name = name.strip().lower()
+    if name == "openai":
+        return OpenAIEmbedder(api_key=api_key, model=model, cache=cache)
+    if name == "local":
+        return LocalNgramEmbedder()
+    raise ValueError(f"Unknown embedding backend: {name!r} (expected 'openai' or 'local')")
+
+
+def resolve_embedder(
+    chain: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: str = "text-embedding-3-small",
+    cache=None,
+) -> Embedder:
+    """First available backend from a comma-separated chain, e.g. "openai,local"."""
+    chain = chain or os.getenv("EMBEDDING_BACKENDS", DEFAULT_BACKENDS)
+    tried = []
+    for name in chain.split(","):
+        if not name.strip():
+            continue
+        embedder = make_embedder(name, api_key=api_key, model=model, cache=cache)
+        if embedder.available():
+            return embedder
+        tried.append(embedder.name)
+    raise RuntimeError(f"No embedding backend available (tried: {', '.join(tried) or 'none'})")
@@ -0,0 +1,93 @@
+"""
+Batched embedding requests.
+
+Packs many inputs into each `client.embeddings.create` call instead of sending
+one input per round-trip. Batches respect a per-request input count and a
+(conservatively estimated) per-request token budget, and vectors are always
+returned in the same order as the inputs.
+
+`accounting.testing.FakeEmbeddingsClient` mimics the OpenAI embeddings surface
+with deterministic vectors so callers can be exercised without network access.
+"""
+
+import math
+from typing import Iterator, List, Sequence
+
+from accounting.services import metrics
+from accounting.services.embedders import Embedder
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request.
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+
+# Single inputs are truncated to this many characters before sending.
+MAX_INPUT_CHARS = 8000
+
+
+# -------------------------------
+# Batching
+# -------------------------------
+
+def prepare_input(text: str) -> str:
+    # truncate to be safe; embeddings models accept long inputs but we keep it short
+    text = str(text).strip()
+    if len(text) > MAX_INPUT_CHARS:
+        text = text[:MAX_INPUT_CHARS]
+    return text
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate (~2 chars/token) that needs no tokenizer."""
+    return max(1, math.ceil(len(text) / 2))
+
+
+def iter_batches(
+    texts: Sequence[str],
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+    max_tokens: int = MAX_TOKENS_PER_REQUEST,
+) -> Iterator[List[int]]:
+    """Yield lists of indices into `texts`, each fitting in one request."""
+    batch: List[int] = []
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if batch and (len(batch) >= max_inputs or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def embed_texts(
+    client,
+    texts: Sequence[str],
+    model: str,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+    max_tokens: int = MAX_TOKENS_PER_REQUEST,
+) -> List[List[float]]:
+    """
+    Embed `texts` with as few requests as the limits allow, preserving order.
+
+    `client` is an OpenAI-style embeddings client or an `Embedder` backend.
+    """
+    if isinstance(client, Embedder):
+        return client.embed(list(texts), model=model)
+
+    prepared = [prepare_input(t) for t in texts]
+    out: List[List[float]] = [[] for _ in prepared]
+    for batch in iter_batches(prepared, max_inputs=max_inputs, max_tokens=max_tokens):
+        resp = client.embeddings.create(model=model, input=[prepared[i] for i in batch])
+        metrics.EMBEDDING_REQUESTS.inc(backend="api")
+        metrics.EMBEDDING_INPUTS.inc(len(batch), backend="api")
+        # the API reports each item's position in the request; don't rely on list order
+        for pos, item in enumerate(resp.data):
+            item_index = getattr(item, "index", pos)
+            out[batch[item_index]] = item.embedding
+    return out
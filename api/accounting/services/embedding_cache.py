@@ -0,0 +1,214 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are stored in a SQLite file keyed by sha256(model, text), so the same
+exemplar strings and column payloads are only ever embedded once. The cache is
+size-bounded with least-recently-used eviction and keeps hit/miss counters.
+
+SQLite runs in WAL mode with a busy timeout and every write happens inside an
+IMMEDIATE transaction, so several gunicorn workers can share one cache file.
+Connections are opened lazily per process, which keeps a cache created in a
+preloaded master usable after fork.
+
+`CachedEmbeddingsClient` wraps any client exposing `embeddings.create` and only
+forwards cache misses, so fully cached runs make zero network calls.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence
+
+from accounting.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULT_MAX_ENTRIES = 20_000
+
+# When over capacity, evict down to this fraction so eviction isn't run per insert
+EVICT_TO_FRACTION = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(vec: List[float]) -> bytes:
+    return array("d", vec).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vec = array("d")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+# -------------------------------
+# Cache
+# -------------------------------
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # never reuse a connection inherited across fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[int, List[float]]:
+        """Return {position in texts: vector} for every cached text."""
+        keys = [cache_key(model, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(keys))
+            # stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                found.update((k, _unpack(v)) for k, v in rows)
+            if found:
+                self._touch(conn, found)
+            out = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(out)
+            self.misses += len(keys) - len(out)
+
+        metrics.cache_lookup("embeddings", hits=len(out), misses=len(keys) - len(out))
+        return out
+
+    def _touch(self, conn: sqlite3.Connection, keys) -> None:
+        """Mark `keys` recently used; best effort: a failed update is rolled back and the hits are still served."""
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            logger.warning("Embedding cache busy; last-used times not updated.", exc_info=True)
+            return
+        try:
+            conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in keys])
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            logger.warning("Updating embedding cache last-used times failed; rolled back.", exc_info=True)
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        now = time.time()
+        rows = [(cache_key(model, t), model, _pack(v), now) for t, v in zip(texts, vectors)]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * EVICT_TO_FRACTION)
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def stats(self) -> dict:
+        entries = len(self)
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM embeddings")
+
+
+# -------------------------------
+# Client wrapper
+# -------------------------------
+
+class CachedEmbeddingsClient:
+    """
+    Drop-in wrapper for an embeddings client that serves cached vectors and only
+    sends cache misses upstream (in a single request per call).
+    """
+
+    def __init__(self, client, cache: EmbeddingCache):
+        self.client = client
+        self.cache = cache
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model: str, input, **kwargs):
+        items = [input] if isinstance(input, str) else list(input)
+        vectors: Dict[int, List[float]] = self.cache.get_many(model, items)
+
+        missing = [i for i in range(len(items)) if i not in vectors]
+        if missing:
+            # one upstream request for the distinct missing texts
+            distinct = list(dict.fromkeys(items[i] for i in missing))
+            resp = self.client.embeddings.create(model=model, input=distinct, **kwargs)
+            fresh: Dict[str, List[float]] = {}
+            for pos, item in enumerate(resp.data):
+                fresh[distinct[getattr(item, "index", pos)]] = item.embedding
+            self.cache.put_many(model, list(fresh.keys()), list(fresh.values()))
+            for i in missing:
+                vectors[i] = fresh[items[i]]
+
+        data = [SimpleNamespace(index=i, embedding=vectors[i]) for i in range(len(items))]
+        return SimpleNamespace(data=data, model=model)
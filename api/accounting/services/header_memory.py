@@ -0,0 +1,288 @@
+"""
+Header-signature mapping memory.
+
+Mappings a user confirmed or corrected are stored per header layout
+(`HeaderMapping`), keyed by an order-insensitive signature of the normalized
+headers. A repeat upload with the same layout is answered by one indexed
+lookup; layouts whose headers were reordered or slightly renamed are matched
+fuzzily against stored layouts with a similar column count.
+
+Only explicit decisions are remembered: `remember_mappings` when a user
+confirms a result, `learn_correction` for a single corrected column.
+Classifier output is never stored on its own. A stored column is replayed
+with the confidence it was confirmed at, and only while the upload's values
+still look like the confirmed ones (same `content_fingerprint`); any other
+column goes to the classifier.
+"""
+
+import hashlib
+from difflib import SequenceMatcher
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounting.models import HeaderMapping
+from accounting.services.classify_columns_with_embeddings import classify_columns, group_by_label
+from accounting.services.column_profile import ColumnProfile, profile_columns
+from accounting.services.embedders import normalize_header
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+# Renamed headers count as the same column above this string similarity
+HEADER_SIMILARITY = 0.85
+# Stored layouts compared during a fuzzy lookup (most recently used first)
+FUZZY_CANDIDATES = 200
+# Columns a fuzzy candidate may have more or fewer than the upload
+COLUMN_SLACK = 2
+
+
+def header_keys(headers: Sequence) -> List[str]:
+    """
+    Normalized headers, one distinct key per column. Digits are kept ("Tel 1"
+    and "Tel 2", or pandas' "Tutar" / "Tutar.1", stay apart) and repeated
+    headers get a " #2", " #3" suffix, so no column is lost from a mapping.
+    """
+    keys: List[str] = []
+    seen: Dict[str, int] = {}
+    for h in headers:
+        key = normalize_header(h, fold_digits=False)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key} #{seen[key]}")
+    return keys
+
+
+def header_signature(headers: Sequence) -> str:
+    normalized = sorted(header_keys(headers))
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(profile: ColumnProfile) -> str:
+    """
+    What a column's values look like ("phone", "date", "amount", "number",
+    "text", or "empty"), not what they are, so next month's export of the
+    same layout still matches while names under a "Telefon" header do not.
+    """
+    if profile.non_null == 0:
+        return "empty"
+    if profile.likely_date:
+        return "date"  # before phone: "2025-07-15 10:30" has ten digits
+    if profile.likely_phone:
+        return "phone"
+    if profile.likely_amount:
+        return "amount"
+    if profile.numeric_rate >= 0.5:
+        return "number"
+    return "text"
+
+
+def _same_content(stored: Optional[str], current: str) -> bool:
+    # an empty column has no evidence against the stored label
+    return stored is not None and (stored == current or "empty" in (stored, current))
+
+
+def _match_headers(headers: List[str], stored: Sequence[str]) -> Optional[Dict[str, str]]:
+    """Map every normalized upload header to a stored one, or None if any is missing."""
+    matched: Dict[str, str] = {}
+    remaining = set(stored)
+    for h in headers:
+        if h in remaining:
+            matched[h] = h
+            remaining.discard(h)
+            continue
+        best, best_ratio = None, HEADER_SIMILARITY
+        for candidate in remaining:
+            ratio = SequenceMatcher(None, h, candidate).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = candidate, ratio
+        if best is None:
+            return None
+        matched[h] = best
+        remaining.discard(best)
+    return matched
+
+
+# -------------------------------
+# Lookup / store
+# -------------------------------
+
+def _find(normalized: List[str], signature: str) -> Optional[Tuple[HeaderMapping, Dict[str, str], bool]]:
+    """(stored layout, {upload header: stored header}, exact signature match) or None."""
+    record = HeaderMapping.objects.filter(signature=signature).first()
+    if record is not None:
+        matched = _match_headers(normalized, record.headers)
+        if matched is not None:
+            return record, matched, True
+
+    n = len(normalized)
+    candidates = (HeaderMapping.objects
+                  .filter(header_count__gte=n - COLUMN_SLACK, header_count__lte=n + COLUMN_SLACK)
+                  .order_by(F("last_used_at").desc(nulls_last=True))[:FUZZY_CANDIDATES])
+    for record in candidates:
+        matched = _match_headers(normalized, record.headers)
+        if matched is not None:
+            return record, matched, False
+    return None
+
+
+def lookup(headers: Sequence) -> Optional[Tuple[HeaderMapping, Dict[str, dict], bool]]:
+    """
+    (stored layout, {header key: confirmed column}, exact) for a known layout,
+    else None. A confirmed column is {"label", "confidence", "content"}; headers
+    nobody confirmed or corrected are left out.
+    """
+    normalized = header_keys(headers)
+    found = _find(normalized, header_signature(headers))
+    if found is None:
+        return None
+    record, matched, exact = found
+    known = {}
+    for h, stored in matched.items():
+        confirmed = record.confirmed.get(stored)
+        if confirmed is not None and stored in record.mapping:
+            known[h] = {"label": record.mapping[stored], **confirmed}
+    return record, known, exact
+
+
+def _touch(record: HeaderMapping) -> None:
+    HeaderMapping.objects.filter(pk=record.pk).update(hit_count=F("hit_count") + 1, last_used_at=timezone.now())
+
+
+def remember(
+    headers: Sequence,
+    labels: Sequence[str],
+    confidences: Sequence[float],
+    contents: Sequence[Optional[str]],
+    source: str = "",
+) -> HeaderMapping:
+    """Store (or replace) the mapping a user confirmed for this header layout."""
+    normalized = header_keys(headers)
+    record, _ = HeaderMapping.objects.update_or_create(
+        signature=header_signature(headers),
+        defaults={
+            "header_count": len(normalized),
+            "headers": normalized,
+            "mapping": dict(zip(normalized, labels)),
+            "confirmed": {h: {"confidence": confidence, "content": content}
+                          for h, confidence, content in zip(normalized, confidences, contents)},
+            "source": source[:100],
+        },
+    )
+    return record
+
+
+def remember_mappings(mappings: List[dict], source: str = "") -> HeaderMapping:
+    """Store a classification result the user confirmed as-is."""
+    return remember([m["column_header"] for m in mappings],
+                    [m["predicted_category"] for m in mappings],
+                    [m.get("confidence") for m in mappings],
+                    [m.get("content") for m in mappings], source=source)
+
+
+@transaction.atomic
+def learn_correction(headers: Sequence, column_index: int, label: str, content: Optional[str] = None,
+                     source: str = "") -> HeaderMapping:
+    """
+    Apply a user's correction for column `column_index`, whose values had the
+    `content_fingerprint` `content`. The matching stored layout is updated in
+    place (so fuzzy variants of it learn too); for an unknown layout only the
+    corrected column is stored.
+    """
+    normalized = header_keys(headers)
+    target = normalized[column_index]
+    found = _find(normalized, header_signature(headers))
+    if found is None:
+        record, _ = HeaderMapping.objects.update_or_create(
+            signature=header_signature(headers),
+            defaults={"header_count": len(normalized), "headers": normalized, "mapping": {}, "confirmed": {},
+                      "source": source[:100]},
+        )
+        stored = target
+    else:
+        record, matched, _ = found
+        stored = matched.get(target, target)
+
+    record = HeaderMapping.objects.select_for_update().get(pk=record.pk)
+    record.mapping = {**record.mapping, stored: label}
+    record.confirmed = {**record.confirmed, stored: {"confidence": 1.0, "content": content}}
+    if source:
+        record.source = source[:100]
+    record.save(update_fields=["mapping", "confirmed", "source", "updated_at"])
+    return record
+
+
+# -------------------------------
+# Classification front door
+# -------------------------------
+
+def classify_with_memory(
+    df: pd.DataFrame,
+    centroids: Dict[str, List[float]],
+    client,
+    model: str,
+    samples_per_col: int = 10,
+    threshold: float = 0.6,
+    classify: Optional[Callable[[List[int]], List[dict]]] = None,
+    profiles: Optional[List[ColumnProfile]] = None,
+    changed: Collection[int] = (),
+) -> Tuple[List[dict], Dict[str, List[int]], str]:
+    """
+    Answer confirmed columns of a known layout from the mapping memory and
+    classify the rest.
+
+    A column is replayed when its header was confirmed or corrected and its
+    `content_fingerprint` still matches; it keeps the stored confidence.
+    `classify(indices)` returns the mappings of the columns at `indices`
+    (jobs pass their progress-reporting, incremental classifier); by default
+    those columns go through `classify_columns`. `profiles` saves profiling
+    the frame again when the caller already has them. Columns at `changed`
+    indices (their contents differ from a previous run) are always
+    classified, whatever the memory holds. Nothing is stored here.
+
+    Returns (mappings, by_label, decided) with decided "memory",
+    "classifier" or "memory+classifier". Every mapping carries its column's
+    `content` fingerprint, so a later confirmation can store it.
+    """
+    headers = list(df.columns)
+    contents = [content_fingerprint(p) for p in (profiles or profile_columns(df))]
+    found = lookup(headers)
+    known = found[1] if found else {}
+
+    mappings: List[Optional[dict]] = [None] * len(headers)
+    for idx, (col, key) in enumerate(zip(headers, header_keys(headers))):
+        confirmed = known.get(key)
+        if idx in changed or confirmed is None or not _same_content(confirmed.get("content"), contents[idx]):
+            continue
+        mappings[idx] = {
+            "column_index": idx,
+            "column_header": str(col),
+            "predicted_category": confirmed["label"],
+            "confidence": confirmed["confidence"],
+            "alternatives": [],
+            "sample_preview": df[col].dropna().astype(str).head(samples_per_col).tolist(),
+            "decided_by": "memory",
+        }
+    if found is not None and any(mappings):
+        _touch(found[0])
+
+    pending = [i for i, m in enumerate(mappings) if m is None]
+    if pending:
+        if classify is None:
+            classified, _ = classify_columns(df.iloc[:, pending], centroids, client, model,
+                                             samples_per_col=samples_per_col, threshold=threshold)
+        else:
+            classified = classify(pending)
+        for i, m in zip(pending, classified):
+            m["column_index"] = i
+            mappings[i] = m
+    for m, content in zip(mappings, contents):
+        m["content"] = content
+
+    decided = ("classifier" if len(pending) == len(headers) else
+               "memory" if not pending else "memory+classifier")
+    return mappings, group_by_label(mappings, centroids.keys()), decided
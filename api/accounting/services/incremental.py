@@ -0,0 +1,186 @@
+"""
+Incremental re-classification of an edited or extended workbook.
+
+Every classified column gets a content fingerprint: a hash of everything its
+prediction depends on, which is its embedding payload (header plus sampled
+values), the profile flags the scorer nudges on (phone / amount / date),
+and the classifier context (embedding backend and model, centroids,
+threshold). A re-run against a previous result:
+
+  - reuses the previous mapping of every column whose fingerprint is
+    unchanged, wherever the column moved to
+  - embeds and scores only the other columns; `score_columns` runs the date
+    post-pass over just those (`disambiguate_dates` decides each column from
+    its own header and profile, so a reused column's post-pass result is
+    still valid)
+  - diffs the new predictions against the previous ones
+
+Appending rows usually leaves the sampled head of every column, and so every
+fingerprint, unchanged; fixing a header re-classifies that column only.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from accounting.services.column_profile import ColumnProfile
+from accounting.services.embedders import normalize_header
+
+
+# -------------------------------
+# Fingerprints
+# -------------------------------
+
+def classifier_context(backend: str, model: str, centroids: Dict[str, Sequence[float]], threshold: float) -> str:
+    """Hash of the classifier setup; any change to it invalidates every fingerprint."""
+    digest = hashlib.sha256(f"{backend}\x00{model}\x00{threshold!r}".encode("utf-8"))
+    for label in sorted(centroids):
+        digest.update(label.encode("utf-8"))
+        digest.update(np.asarray(centroids[label], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def column_fingerprints(payloads: Sequence[str], profiles: Sequence[ColumnProfile], context: str) -> List[str]:
+    """One fingerprint per column from its payload, its scorer-relevant profile flags and `context`."""
+    out = []
+    for payload, profile in zip(payloads, profiles):
+        blob = json.dumps([context, payload, profile.likely_phone, profile.likely_amount, profile.likely_date],
+                          ensure_ascii=False)
+        out.append(hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32])
+    return out
+
+
+# -------------------------------
+# Matching
+# -------------------------------
+
+def reusable_columns(
+    fingerprints: Sequence[str],
+    previous_fingerprints: Sequence[str],
+    previous_mappings: Sequence[dict],
+) -> Dict[int, dict]:
+    """
+    {new column index: copy of the previous mapping} for every column whose
+    fingerprint appears in the previous run. Duplicate columns pair up in order.
+    """
+    available: Dict[str, List[int]] = {}
+    for j, fp in enumerate(previous_fingerprints[:len(previous_mappings)]):
+        available.setdefault(fp, []).append(j)
+
+    reused: Dict[int, dict] = {}
+    for i, fp in enumerate(fingerprints):
+        candidates = available.get(fp)
+        if candidates:
+            j = candidates.pop(0)
+            mapping = dict(previous_mappings[j])
+            mapping["column_index"] = i
+            mapping["previous_index"] = j
+            reused[i] = mapping
+    return reused
+
+
+def _match_previous(mappings: Sequence[dict], previous_mappings: Sequence[dict]) -> Dict[int, int]:
+    """
+    {new index: previous index}: reused columns first, then the same
+    (normalized) header, then, for columns whose header changed, the slot
+    next to a matched neighbour or the same position.
+    """
+    matches: Dict[int, int] = {}
+    for m in mappings:
+        if m.get("previous_index") is not None:
+            matches[m["column_index"]] = m["previous_index"]
+    taken = set(matches.values())
+
+    by_header: Dict[str, List[int]] = {}
+    for j, p in enumerate(previous_mappings):
+        if j not in taken:
+            by_header.setdefault(normalize_header(p["column_header"]), []).append(j)
+    for m in mappings:
+        i = m["column_index"]
+        candidates = by_header.get(normalize_header(m["column_header"])) if i not in matches else None
+        if candidates:
+            matches[i] = candidates.pop(0)
+            taken.add(matches[i])
+
+    # a renamed column sits next to the same neighbours as before, even when columns were inserted
+    n_prev = len(previous_mappings)
+    for m in mappings:
+        i = m["column_index"]
+        if i in matches:
+            continue
+        for j in (matches[i - 1] + 1 if i - 1 in matches else None,
+                  matches[i + 1] - 1 if i + 1 in matches else None, i):
+            if j is not None and 0 <= j < n_prev and j not in taken:
+                matches[i] = j
+                taken.add(j)
+                break
+    return matches
+
+
+# -------------------------------
+# Diff
+# -------------------------------
+
+def _prediction(m: dict) -> Tuple[str, Optional[float]]:
+    return m.get("predicted_category"), m.get("confidence")
+
+
+def diff_predictions(previous_mappings: Sequence[dict], mappings: Sequence[dict]) -> dict:
+    """
+    Prediction changes from `previous_mappings` to `mappings`. Each change is
+    "changed" (a matched column got another label), "added" or "removed";
+    columns that kept their label are only counted.
+    """
+    matches = _match_previous(mappings, previous_mappings)
+    changes = []
+    unchanged = 0
+    for m in mappings:
+        i = m["column_index"]
+        j = matches.get(i)
+        if j is None:
+            changes.append({
+                "change": "added",
+                "column_index": i,
+                "column_header": m["column_header"],
+                "after": m["predicted_category"],
+                "confidence": m.get("confidence"),
+            })
+            continue
+        before, before_conf = _prediction(previous_mappings[j])
+        if before == m["predicted_category"]:
+            unchanged += 1
+        else:
+            changes.append({
+                "change": "changed",
+                "column_index": i,
+                "previous_index": j,
+                "column_header": m["column_header"],
+                "previous_header": previous_mappings[j]["column_header"],
+                "before": before,
+                "after": m["predicted_category"],
+                "previous_confidence": before_conf,
+                "confidence": m.get("confidence"),
+            })
+
+    matched = set(matches.values())
+    for j, p in enumerate(previous_mappings):
+        if j not in matched:
+            changes.append({
+                "change": "removed",
+                "previous_index": j,
+                "previous_header": p["column_header"],
+                "before": p.get("predicted_category"),
+            })
+
+    return {
+        "columns": len(mappings),
+        "previous_columns": len(previous_mappings),
+        "reused": sum(1 for m in mappings if m.get("previous_index") is not None),
+        "from_memory": sum(1 for m in mappings if m.get("decided_by") == "memory"),
+        "reclassified": sum(1 for m in mappings
+                            if m.get("previous_index") is None and m.get("decided_by") != "memory"),
+        "unchanged": unchanged,
+        "changes": changes,
+    }
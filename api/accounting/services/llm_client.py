@@ -0,0 +1,355 @@
+"""
+Process-wide, pooled OpenAI client manager.
+
+One `LLMClientManager` per (api key, base URL) per process owns:
+  - one sync and one async (per event loop) SDK client over pooled,
+    keep-alive HTTP connections, instead of a new client per service
+  - per-call timeouts and retries with jittered backoff (SDK retries off)
+  - a circuit breaker: after `breaker_failures` consecutive upstream
+    failures calls fail fast with `CircuitOpenError` for
+    `breaker_reset_seconds`, then a single trial call decides whether it closes
+  - latency / error counters per operation (`stats()`), also exported as
+    `metrics` (calls by outcome, latency, retries, tokens)
+
+`manager.client()` / `manager.async_client()` return drop-in stand-ins for
+`OpenAI()` / `AsyncOpenAI()` (`.chat.completions.create`,
+`.embeddings.create`), so `OpenAIService`, `OpenAIEmbedder` and
+`embed_texts` use them unchanged.
+
+Configuration comes from Django settings when configured, else the same
+environment variables (the classifier CLI runs without Django).
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Tuple
+
+from accounting.services import metrics
+from accounting.services.async_classify import RetryPolicy, is_retryable
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULTS = {
+    "OPENAI_TIMEOUT_SECONDS": 30.0,
+    "OPENAI_MAX_RETRIES": 3,
+    "OPENAI_MAX_CONNECTIONS": 20,
+    "OPENAI_BREAKER_FAILURES": 5,
+    "OPENAI_BREAKER_RESET_SECONDS": 30.0,
+}
+
+
+def _setting(name: str):
+    default = DEFAULTS.get(name)
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+    value = os.getenv(name)
+    if value is None or default is None:
+        return value if value is not None else default
+    return type(default)(value)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream the circuit breaker has marked degraded."""
+
+
+# -------------------------------
+# Circuit breaker and counters
+# -------------------------------
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one trial call) -> closed/open."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[bool]:
+        """None when the call must fail fast, else whether it is the half-open trial call."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return None
+
+    def record(self, ok: Optional[bool], trial: bool = False) -> None:
+        """
+        Settle a call `acquire` let through: ok, failed, or None when it ended
+        without a verdict (cancelled). A trial without a verdict counts as
+        failed, so the circuit opens again instead of waiting on it forever.
+        """
+        with self._lock:
+            if trial:
+                self._trial_in_flight = False
+            if ok:
+                self.state = self.CLOSED
+                self.failures = 0
+            elif ok is False or trial:
+                self.failures += 1
+                if trial or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state = self.OPEN
+                    self.opened_at = time.monotonic()
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    rejected: int = 0  # failed fast by the open circuit
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+    errors_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        ok = self.calls - self.errors
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "latency_avg": round(self.latency_total / self.calls, 4) if self.calls else 0.0,
+            "latency_max": round(self.latency_max, 4),
+            "success_rate": round(ok / self.calls, 4) if self.calls else 1.0,
+            "errors_by_type": dict(self.errors_by_type),
+        }
+
+
+# -------------------------------
+# Manager
+# -------------------------------
+
+class LLMClientManager:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        breaker_failures: Optional[int] = None,
+        breaker_reset_seconds: Optional[float] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = float(timeout if timeout is not None else _setting("OPENAI_TIMEOUT_SECONDS"))
+        self.retry = RetryPolicy(max_retries=int(max_retries if max_retries is not None
+                                                 else _setting("OPENAI_MAX_RETRIES")))
+        self.max_connections = int(max_connections or _setting("OPENAI_MAX_CONNECTIONS"))
+        self.breaker = CircuitBreaker(
+            int(breaker_failures or _setting("OPENAI_BREAKER_FAILURES")),
+            float(breaker_reset_seconds or _setting("OPENAI_BREAKER_RESET_SECONDS")),
+        )
+        self._stats: Dict[str, OperationStats] = {}
+        self._stats_lock = threading.Lock()
+        self._client_lock = threading.Lock()
+        self._sync_raw = None
+        self._async_raw: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    # ---- raw SDK clients (pooled) ----
+
+    def _limits(self):
+        from openai import DEFAULT_CONNECTION_LIMITS
+
+        # same Limits class as the SDK's own transport, whichever HTTP package that is
+        return type(DEFAULT_CONNECTION_LIMITS)(max_connections=self.max_connections,
+                                               max_keepalive_connections=self.max_connections)
+
+    def raw_client(self):
+        with self._client_lock:
+            if self._sync_raw is None:
+                from openai import DefaultHttpxClient, OpenAI
+
+                self._sync_raw = OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout,
+                                        max_retries=0, http_client=DefaultHttpxClient(limits=self._limits()))
+            return self._sync_raw
+
+    def raw_async_client(self):
+        # httpx async pools are bound to the event loop that first uses them
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_raw.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+                client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout,
+                                     max_retries=0, http_client=DefaultAsyncHttpxClient(limits=self._limits()))
+                self._async_raw[loop] = client
+            return client
+
+    # ---- instrumented calls ----
+
+    def _record(self, operation: str, seconds: float, exc: Optional[BaseException] = None,
+                retries: int = 0, rejected: bool = False, result=None) -> None:
+        outcome = "ok" if exc is None else "rejected" if rejected else "error"
+        metrics.EXTERNAL_CALLS.inc(service="openai", operation=operation, outcome=outcome)
+        metrics.EXTERNAL_RETRIES.inc(retries, service="openai", operation=operation)
+        if not rejected:
+            metrics.EXTERNAL_SECONDS.observe(seconds, service="openai", operation=operation)
+        usage = getattr(result, "usage", None)
+        if usage is not None:
+            for kind, field_name in (("prompt", "prompt_tokens"), ("completion", "completion_tokens")):
+                metrics.LLM_TOKENS.inc(getattr(usage, field_name, 0) or 0, operation=operation, kind=kind)
+        with self._stats_lock:
+            s = self._stats.setdefault(operation, OperationStats())
+            s.calls += 1
+            s.retries += retries
+            s.latency_total += seconds
+            s.latency_max = max(s.latency_max, seconds)
+            if exc is not None:
+                s.errors += 1
+                name = type(exc).__name__
+                s.errors_by_type[name] = s.errors_by_type.get(name, 0) + 1
+                if rejected:
+                    s.rejected += 1
+                if "Timeout" in name:
+                    s.timeouts += 1
+
+    def _reject(self, operation: str) -> CircuitOpenError:
+        exc = CircuitOpenError(f"OpenAI circuit open after {self.breaker.failures} consecutive failures; "
+                               f"retrying after {self.breaker.reset_timeout:g}s")
+        self._record(operation, 0.0, exc, rejected=True)
+        return exc
+
+    def _policy(self, max_retries: Optional[int]) -> RetryPolicy:
+        if max_retries is None:
+            return self.retry
+        return RetryPolicy(max_retries=max_retries, base_delay=self.retry.base_delay, max_delay=self.retry.max_delay)
+
+    def call(self, operation: str, fn: Callable, *args, max_retries: Optional[int] = None, **kwargs):
+        policy = self._policy(max_retries)
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            trial = self.breaker.acquire()
+            if trial is None:
+                raise self._reject(operation)
+            ok, error = None, None
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+            except Exception as exc:
+                error = exc
+                ok = not is_retryable(exc)  # a non-retryable error is still an answer from the upstream
+            finally:
+                self.breaker.record(ok, trial)
+            if error is None:
+                self._record(operation, time.perf_counter() - started, retries=attempt, result=result)
+                return result
+            if attempt >= policy.max_retries or ok:
+                self._record(operation, time.perf_counter() - started, error, retries=attempt)
+                raise error
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+
+    async def acall(self, operation: str, fn: Callable, *args, max_retries: Optional[int] = None, **kwargs):
+        policy = self._policy(max_retries)
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            trial = self.breaker.acquire()
+            if trial is None:
+                raise self._reject(operation)
+            ok, error = None, None
+            try:
+                result = await fn(*args, **kwargs)
+                ok = True
+            except Exception as exc:
+                error = exc
+                ok = not is_retryable(exc)  # a non-retryable error is still an answer from the upstream
+            finally:
+                self.breaker.record(ok, trial)
+            if error is None:
+                self._record(operation, time.perf_counter() - started, retries=attempt, result=result)
+                return result
+            if attempt >= policy.max_retries or ok:
+                self._record(operation, time.perf_counter() - started, error, retries=attempt)
+                raise error
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+
+    # ---- drop-in clients ----
+
+    def client(self, max_retries: Optional[int] = None) -> SimpleNamespace:
+        """`OpenAI()` stand-in routed through the pool, timeouts, retries and breaker."""
+        def chat(**kw):
+            return self.call("chat", self.raw_client().chat.completions.create, max_retries=max_retries, **kw)
+
+        def embeddings(**kw):
+            return self.call("embeddings", self.raw_client().embeddings.create, max_retries=max_retries, **kw)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=chat)),
+                               embeddings=SimpleNamespace(create=embeddings))
+
+    def async_client(self, max_retries: Optional[int] = None) -> SimpleNamespace:
+        """`AsyncOpenAI()` stand-in; the pooled client is picked per running event loop."""
+        async def chat(**kw):
+            return await self.acall("chat", self.raw_async_client().chat.completions.create,
+                                    max_retries=max_retries, **kw)
+
+        async def embeddings(**kw):
+            return await self.acall("embeddings", self.raw_async_client().embeddings.create,
+                                    max_retries=max_retries, **kw)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=chat)),
+                               embeddings=SimpleNamespace(create=embeddings))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            ops = {name: s.as_dict() for name, s in self._stats.items()}
+        return {"circuit": self.breaker.state, "consecutive_failures": self.breaker.failures, "operations": ops}
+
+
+_managers: Dict[Tuple[int, Optional[str], Optional[str]], LLMClientManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_client_manager(api_key: Optional[str] = None, base_url: Optional[str] = None) -> LLMClientManager:
+    """
+    The process-wide manager for this key / base URL (default: OPENAI_API_KEY,
+    OPENAI_BASE_URL). Keyed by pid too, so forked workers build their own pools.
+    """
+    api_key = api_key or _setting("OPENAI_API_KEY")
+    base_url = base_url or _setting("OPENAI_BASE_URL")
+    key = (os.getpid(), api_key, base_url)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = LLMClientManager(api_key=api_key, base_url=base_url)
+        return manager
+
+
+def client_stats() -> Dict[str, dict]:
+    """Counters of every manager in this process, keyed by base URL."""
+    pid = os.getpid()
+    with _managers_lock:
+        managers = [(base_url, m) for (p, _, base_url), m in _managers.items() if p == pid]
+    return {base_url or "default": m.stats() for base_url, m in managers}
@@ -0,0 +1,503 @@
+"""
+Lightweight process metrics with Prometheus text exposition.
+
+Counters and histograms live in this process's registry; recording is a
+dict update under a lock, and a single flag check when METRICS_ENABLED is
+off (`stage()` then returns a shared no-op context manager). Recorded:
+
+  - bts_stage_duration_seconds{pipeline, stage}: classification read /
+    profile / embed / score / post_pass / persist, message generation
+  - bts_stage_items_total{pipeline, stage}: columns, rows, messages handled
+  - bts_external_calls_total / _duration_seconds / _retries_total /
+    bts_llm_tokens_total: OpenAI calls through `llm_client`
+  - bts_embedding_inputs_total / bts_embedding_requests_total{backend}
+  - bts_cache_lookups_total{cache, result}: embedding, LLM response and
+    workbook caches
+  - bts_http_request_duration_seconds{method, route, status} (see
+    backend.middleware.RequestMetricsMiddleware)
+
+Web workers, classification pool processes and `classification_worker`
+each have their own registry. With METRICS_DIR set, every process writes a
+snapshot there every METRICS_FLUSH_SECONDS (and at exit), and `render()`
+sums the snapshots of all live processes plus a persistent aggregate of
+the exited ones, so the exported totals never go down (the prometheus_client
+multiprocess approach). A process folds its own values into the aggregate
+at a clean exit; a snapshot not refreshed for a few intervals belongs to a
+killed process and is folded in by the next `render()`. A process whose
+snapshot was folded while it was merely stalled notices on its next write
+and from then on reports only what it recorded since. Folding and writing
+hold a lock file in METRICS_DIR; delete the directory to reset the totals.
+
+METRICS_LOG additionally logs every stage timing and request as one JSON
+line on the "bts.metrics" logger.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: folding is best-effort without the lock
+    fcntl = None
+
+logger = logging.getLogger("bts.metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DEFAULTS = {
+    "METRICS_ENABLED": True,
+    "METRICS_LOG": False,
+    "METRICS_DIR": "",
+    "METRICS_FLUSH_SECONDS": 10.0,
+}
+# Snapshots older than this many flush intervals are from exited processes
+STALE_INTERVALS = 6
+AGGREGATE_FILE = "aggregate.totals"
+LOCK_FILE = "aggregate.lock"
+
+
+def _setting(name: str):
+    default = DEFAULTS[name]
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+    value = os.getenv(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
+
+class _Config:
+    def __init__(self):
+        self.loaded = False
+        self.enabled = False
+        self.log = False
+        self.directory: Optional[Path] = None
+        self.flush_seconds = DEFAULTS["METRICS_FLUSH_SECONDS"]
+
+    def load(self) -> None:
+        self.enabled = bool(_setting("METRICS_ENABLED"))
+        self.log = bool(_setting("METRICS_LOG"))
+        directory = _setting("METRICS_DIR")
+        self.directory = Path(directory) if directory else None
+        self.flush_seconds = float(_setting("METRICS_FLUSH_SECONDS"))
+        self.loaded = True
+
+
+_config = _Config()
+
+
+def enabled() -> bool:
+    if not _config.loaded:
+        _config.load()
+    return _config.enabled
+
+
+def configure(enabled: Optional[bool] = None, log: Optional[bool] = None, directory=None) -> None:
+    """Override the settings (CLI runs, benchmarks); unspecified values keep their setting."""
+    _config.load()
+    if enabled is not None:
+        _config.enabled = enabled
+    if log is not None:
+        _config.log = log
+    if directory is not None:
+        _config.directory = Path(directory) if directory else None
+
+
+# -------------------------------
+# Metric types
+# -------------------------------
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(k), v if not isinstance(v, list) else list(v)] for k, v in self._values.items()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def subtract(self, values: List[list]) -> None:
+        """Remove a snapshot's values that were already folded into the aggregate."""
+        with self._lock:
+            for labels, value in values:
+                key = tuple(labels)
+                current = self._values.get(key)
+                if current is None:
+                    continue
+                if isinstance(current, list):
+                    self._values[key] = [a - b for a, b in zip(current, value)]
+                else:
+                    self._values[key] = current - value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not amount or not enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _touch()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        if not enabled():
+            return
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket (non-cumulative)..., +Inf bucket, sum]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+        _touch()
+
+
+_registry: List[_Metric] = []
+
+STAGE_SECONDS = Histogram("bts_stage_duration_seconds", "Time spent per pipeline stage.", ["pipeline", "stage"])
+STAGE_ITEMS = Counter("bts_stage_items_total", "Items (columns, rows, messages) handled per pipeline stage.",
+                      ["pipeline", "stage"])
+EXTERNAL_CALLS = Counter("bts_external_calls_total", "Calls to external APIs by outcome.",
+                         ["service", "operation", "outcome"])
+EXTERNAL_SECONDS = Histogram("bts_external_call_duration_seconds", "External API call latency, retries included.",
+                             ["service", "operation"])
+EXTERNAL_RETRIES = Counter("bts_external_retries_total", "Retried external API attempts.", ["service", "operation"])
+LLM_TOKENS = Counter("bts_llm_tokens_total", "Tokens reported by the API.", ["operation", "kind"])
+EMBEDDING_INPUTS = Counter("bts_embedding_inputs_total", "Texts embedded.", ["backend"])
+SAMPLE_TOKENS = Counter("bts_sample_tokens_total", "Estimated tokens of column embedding payloads built.")
+EMBEDDING_REQUESTS = Counter("bts_embedding_requests_total", "Embedding requests sent (batches).", ["backend"])
+CACHE_LOOKUPS = Counter("bts_cache_lookups_total", "Cache lookups by result.", ["cache", "result"])
+HTTP_SECONDS = Histogram("bts_http_request_duration_seconds", "HTTP request latency.", ["method", "route", "status"])
+
+
+# -------------------------------
+# Recording helpers
+# -------------------------------
+
+class _NoopStage:
+    items = 0
+
+    def __setattr__(self, name, value):
+        pass  # `timer.items = n` inside a disabled stage
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("pipeline", "stage", "items", "started")
+
+    def __init__(self, pipeline: str, stage: str, items: int):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.items = items
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(seconds, pipeline=self.pipeline, stage=self.stage)
+        STAGE_ITEMS.inc(self.items, pipeline=self.pipeline, stage=self.stage)
+        if _config.log:
+            log_event("stage", pipeline=self.pipeline, stage=self.stage, seconds=round(seconds, 6),
+                      items=self.items, error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+def stage(pipeline: str, name: str, items: int = 0):
+    """`with stage("classification", "embed", items=len(chunk)):` times the block."""
+    if not enabled():
+        return _NOOP
+    return _Stage(pipeline, name, items)
+
+
+def cache_lookup(cache: str, hits: int = 0, misses: int = 0) -> None:
+    CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+
+
+def log_event(event: str, **fields) -> None:
+    if _config.log:
+        logger.info(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
+
+
+# -------------------------------
+# Multi-process snapshots
+# -------------------------------
+
+@contextmanager
+def _directory_lock(directory: Path):
+    if fcntl is None:
+        yield
+        return
+    with open(directory / LOCK_FILE, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _load_aggregate(directory: Path) -> dict:
+    try:
+        return _read_json(directory / AGGREGATE_FILE)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.exception("Reading the metrics aggregate in %s failed.", directory)
+        return {}
+
+
+def _fold(totals: dict, snapshot: dict) -> None:
+    for name, values in snapshot.items():
+        merged = {tuple(labels): value for labels, value in totals.get(name, [])}
+        _merge(merged, values)
+        totals[name] = [[list(k), v] for k, v in merged.items()]
+
+
+class _Snapshots:
+    def __init__(self):
+        self.pid = None
+        self.path: Optional[Path] = None
+        self.written: Optional[dict] = None  # last snapshot written to `path`
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """First record in this (possibly forked) process: reset inherited values, start the flusher."""
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if self.pid is not None:
+                for metric in _registry:
+                    metric.reset()
+            self.pid = os.getpid()
+            self.written = None
+            _config.directory.mkdir(parents=True, exist_ok=True)
+            self.path = _config.directory / f"{self.pid}-{uuid.uuid4().hex[:8]}.json"
+            threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+    def _run(self) -> None:
+        pid = self.pid
+        while pid == os.getpid():
+            time.sleep(_config.flush_seconds)
+            self.write()
+
+    def _reconcile(self) -> None:
+        # our last snapshot was folded into the aggregate (we looked dead): keep only what came after it
+        if self.written is not None and not self.path.exists():
+            for metric in _registry:
+                metric.subtract(self.written.get(metric.name, []))
+            self.written = None
+
+    def write(self) -> None:
+        if self.path is None or self.pid != os.getpid():
+            return
+        try:
+            with _directory_lock(self.path.parent):
+                self._reconcile()
+                data = {m.name: m.snapshot() for m in _registry}
+                _write_json(self.path, data)
+                self.written = data
+        except OSError:
+            logger.exception("Writing metrics snapshot %s failed.", self.path)
+
+    def retire(self) -> None:
+        """At exit: fold this process's values into the aggregate and drop its snapshot."""
+        if self.path is None or self.pid != os.getpid():
+            return
+        directory = self.path.parent
+        try:
+            with _directory_lock(directory):
+                self._reconcile()
+                totals = _load_aggregate(directory)
+                _fold(totals, {m.name: m.snapshot() for m in _registry})
+                _write_json(directory / AGGREGATE_FILE, totals)
+                self.path.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Folding metrics snapshot %s into the aggregate failed.", self.path)
+        self.path = None
+
+
+_snapshots = _Snapshots()
+atexit.register(_snapshots.retire)
+
+
+def _touch() -> None:
+    if _config.directory is not None and _snapshots.pid != os.getpid():
+        _snapshots.start()
+
+
+def flush() -> None:
+    """Write this process's snapshot now (end of a job in a short-lived worker)."""
+    _snapshots.write()
+
+
+def _fold_stale(directory: Path, paths: List[Path], stale_before: float) -> None:
+    """Fold the snapshots of killed processes into the aggregate, then remove them."""
+    try:
+        with _directory_lock(directory):
+            totals = _load_aggregate(directory)
+            folded = []
+            for path in paths:
+                try:
+                    # re-check under the lock: the process may have written since
+                    if path.stat().st_mtime >= stale_before:
+                        continue
+                    _fold(totals, _read_json(path))
+                except FileNotFoundError:
+                    continue
+                except ValueError:
+                    logger.warning("Dropping unreadable metrics snapshot %s.", path)
+                folded.append(path)
+            if folded:
+                _write_json(directory / AGGREGATE_FILE, totals)
+                for path in folded:
+                    path.unlink(missing_ok=True)
+    except OSError:
+        logger.exception("Folding stale metrics snapshots in %s failed.", directory)
+
+
+def _other_snapshots() -> Iterable[dict]:
+    """Snapshots of the other live processes, and the aggregate of exited ones."""
+    directory = _config.directory
+    if directory is None or not directory.is_dir():
+        return []
+    stale_before = time.time() - STALE_INTERVALS * _config.flush_seconds
+    stale = []
+    found = []
+    for path in directory.glob("*.json"):
+        if path == _snapshots.path:
+            continue
+        try:
+            if path.stat().st_mtime < stale_before:
+                stale.append(path)
+                continue
+            found.append(_read_json(path))
+        except (OSError, ValueError):
+            continue  # replaced or removed concurrently
+    if stale:
+        _fold_stale(directory, stale, stale_before)
+    found.append(_load_aggregate(directory))
+    return found
+
+
+# -------------------------------
+# Exposition
+# -------------------------------
+
+def _merge(into: Dict[Tuple[str, ...], object], values: List[list]) -> None:
+    for labels, value in values:
+        key = tuple(labels)
+        current = into.get(key)
+        if current is None:
+            into[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            into[key] = [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = current + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+def render() -> str:
+    """All metrics, summed over all processes when METRICS_DIR is set, in Prometheus text format."""
+    _snapshots.write()  # also drops values of ours another process already folded in
+    others = list(_other_snapshots())
+    lines: List[str] = []
+    for metric in _registry:
+        values: Dict[Tuple[str, ...], object] = {}
+        _merge(values, metric.snapshot())
+        for snapshot in others:
+            _merge(values, snapshot.get(metric.name, []))
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key in sorted(values):
+            value = values[key]
+            if metric.kind == "counter":
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {repr(float(value[-1]))}")
+            lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
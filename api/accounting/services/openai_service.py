@@ -1,20 +1,294 @@
-from openai import OpenAI
-from django.conf import settings
+"""
+Chat-completion message generation.
+
+`generate_message` sends one prompt. `generate_bulk` / `agenerate_bulk` run a
+reminder campaign: per-debtor prompts are rendered from a template,
+identical prompts are sent once, and the unique prompts run concurrently
+(bounded concurrency, token-bucket rate limit, jittered retries on 429/5xx;
+the primitives are shared with `async_classify`). Results stream back as
+they complete, one `BulkMessageResult` per input item, with failures reported
+per item rather than as empty strings.
+
+Completions are cached by (model, system prompt, prompt, parameters) in the
+`response_cache`, so repeated prompts and repeated campaign runs skip the
+round-trip. With `reuse_fields`, items differing only in those fields share
+one skeleton completion that the values are substituted into afterwards.
+
+Clients come from the process-wide `llm_client` manager (pooled
+connections, per-call timeouts, circuit breaker); `generate_message` raises
+on failure (`CircuitOpenError` while the upstream is marked degraded).
+
+`accounting.testing.FakeChatCompletionsServer` is a local HTTP stand-in for
+the chat-completions endpoint, so the real SDK path can be exercised offline.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from accounting.services import metrics
+from accounting.services.async_classify import RetryPolicy, TokenBucket, is_retryable
+from accounting.services.llm_client import get_client_manager
+from accounting.services.response_cache import (
+    TEMPLATE_INSTRUCTION,
+    ResponseCache,
+    fill_skeleton,
+    get_response_cache,
+    is_reusable,
+    render_skeleton,
+    response_key,
+    split_cached,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULT_CHAT_MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a helpful assistant."
+TEMPLATE_SYSTEM_PROMPT = f"{SYSTEM_PROMPT} {TEMPLATE_INSTRUCTION}"
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+
+
+@dataclass
+class BulkMessageResult:
+    index: int                         # position in the input items
+    prompt: Optional[str]
+    content: Optional[str] = None
+    error: Optional[str] = None
+    duplicate_of: Optional[int] = None  # item whose identical prompt was actually sent
+    cached: bool = False               # answered from the response cache
+    from_template: bool = False        # filled into a shared skeleton completion
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _Unit:
+    """One completion to obtain, shared by the items in `indices`."""
+    key: str
+    system: str
+    prompt: str
+    indices: List[int]
+    fields: Tuple[str, ...] = ()  # placeholders to fill per item (skeleton units only)
+
+
+def render_prompts(template: str, items: Sequence[Mapping]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(prompt, error) per item; `template` is a str.format template over the item's fields."""
+    rendered = []
+    for item in items:
+        try:
+            rendered.append((template.format_map(item), None))
+        except KeyError as e:
+            rendered.append((None, f"Template field {e} missing from item"))
+        except (IndexError, ValueError, AttributeError) as e:
+            rendered.append((None, f"Template error: {e}"))
+    return rendered
+
 
 class OpenAIService:
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, client=None, async_client=None, model: str = DEFAULT_CHAT_MODEL,
+                 params: Optional[Mapping] = None, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True):
+        self.client = client if client is not None else get_client_manager().client()
+        self.async_client = async_client
+        self.model = model
+        self.params = dict(params or {})  # extra completion parameters (temperature, ...)
+        self.cache = (cache or get_response_cache()) if use_cache else None
+
+    def _messages(self, prompt: str, system: str = SYSTEM_PROMPT) -> List[dict]:
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _key(self, prompt: str, system: str = SYSTEM_PROMPT) -> str:
+        return response_key(self.model, system, prompt, self.params)
 
     def generate_message(self, prompt: str) -> str:
+        """One completion; failures are logged and raised, never returned as ""."""
+        key = self._key(prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content
+            with metrics.stage("message_generation", "complete", items=1):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._messages(prompt),
+                    **self.params
+                )
         except Exception as e:
-            print(f"Error generating message: {str(e)}")
-            return ""
\ No newline at end of file
+            logger.warning("Error generating message: %s: %s", type(e).__name__, e)
+            raise
+        content = response.choices[0].message.content or ""
+        if self.cache is not None:
+            self.cache.set(key, content)
+        return content
+
+    # -------------------------------
+    # Bulk generation
+    # -------------------------------
+
+    async def _complete(self, client, unit: _Unit, semaphore: asyncio.Semaphore,
+                        bucket: TokenBucket, retry: RetryPolicy) -> str:
+        attempt = 0
+        while True:
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    response = await client.chat.completions.create(
+                        model=self.model, messages=self._messages(unit.prompt, unit.system), **self.params
+                    )
+                    content = response.choices[0].message.content
+                    if not content:
+                        raise ValueError("empty completion")
+                    return content
+                except Exception as exc:
+                    if attempt >= retry.max_retries or not is_retryable(exc):
+                        raise
+            metrics.EXTERNAL_RETRIES.inc(service="openai", operation="chat")
+            # back off outside the semaphore so other prompts keep flowing
+            await asyncio.sleep(retry.delay(attempt))
+            attempt += 1
+
+    def _plan(self, template: str, items: Sequence[Mapping], prompts: List[Optional[str]],
+              reuse_fields: Sequence[str]) -> Dict[str, _Unit]:
+        """Group items into units: one per distinct prompt, or per distinct skeleton with `reuse_fields`."""
+        units: Dict[str, _Unit] = {}
+        for index, prompt in enumerate(prompts):
+            if prompt is None:
+                continue
+            system, text, fields = SYSTEM_PROMPT, prompt, ()
+            if reuse_fields:
+                skeleton = render_skeleton(template, items[index], reuse_fields)
+                if skeleton is not None and skeleton != prompt:
+                    system, text, fields = TEMPLATE_SYSTEM_PROMPT, skeleton, tuple(reuse_fields)
+            key = self._key(text, system)
+            if key not in units:
+                units[key] = _Unit(key, system, text, [], fields)
+            units[key].indices.append(index)
+        return units
+
+    def _results(self, unit: _Unit, items: Sequence[Mapping], prompts: List[Optional[str]],
+                 content: Optional[str], error: Optional[str], cached: bool) -> List[BulkMessageResult]:
+        first = unit.indices[0]
+        results = []
+        for index in unit.indices:
+            text = content
+            if unit.fields and content is not None:
+                text = fill_skeleton(content, items[index], unit.fields)
+            results.append(BulkMessageResult(index=index, prompt=prompts[index], content=text, error=error,
+                                             duplicate_of=None if index == first else first,
+                                             cached=cached, from_template=bool(unit.fields)))
+        if unit.fields and error is None and self.cache is not None:
+            self.cache.record_template_hits(len(unit.indices))
+        return results
+
+    async def agenerate_bulk(
+        self,
+        template: str,
+        items: Sequence[Mapping],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        retry: Optional[RetryPolicy] = None,
+        reuse_fields: Sequence[str] = (),
+    ) -> AsyncIterator[BulkMessageResult]:
+        """
+        Yield one result per item, in completion order. Identical prompts are
+        sent once and cached completions are yielded first, without a request.
+
+        `reuse_fields` opts into template-level reuse: those fields become
+        placeholders, items sharing the rest of the prompt share one
+        completion, and each item's values are substituted back in. Items
+        whose skeleton completion lost a placeholder are generated one by one.
+        """
+        retry = retry or RetryPolicy()
+        prompts: List[Optional[str]] = []
+        for index, (prompt, error) in enumerate(render_prompts(template, items)):
+            prompts.append(prompt)
+            if error is not None:
+                yield BulkMessageResult(index=index, prompt=None, error=error)
+        with metrics.stage("message_generation", "plan", items=len(items)):
+            units = self._plan(template, items, prompts, reuse_fields)
+        if not units:
+            return
+
+        with metrics.stage("message_generation", "cache_lookup", items=len(units)):
+            cached, pending = split_cached(self.cache, list(units))
+        for key, content in cached.items():
+            for result in self._results(units[key], items, prompts, content, None, cached=True):
+                yield result
+        if not pending:
+            return
+
+        # retries are paced by RetryPolicy here, so the shared client does not retry
+        client = self.async_client or get_client_manager().async_client(max_retries=0)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        bucket = TokenBucket(requests_per_second)
+
+        async def run(unit: _Unit) -> Tuple[_Unit, Optional[str], Optional[str]]:
+            try:
+                with metrics.stage("message_generation", "complete", items=len(unit.indices)):
+                    return unit, await self._complete(client, unit, semaphore, bucket, retry), None
+            except Exception as e:
+                return unit, None, f"{type(e).__name__}: {e}"
+
+        tasks = {asyncio.ensure_future(run(units[key])) for key in pending}
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    unit, content, error = task.result()
+                    if unit.fields and error is None and not is_reusable(unit.prompt, content):
+                        # the skeleton completion dropped or invented a placeholder: generate per item
+                        for index in unit.indices:
+                            fallback = _Unit(self._key(prompts[index]), SYSTEM_PROMPT, prompts[index], [index])
+                            tasks.add(asyncio.ensure_future(run(fallback)))
+                        continue
+                    if error is None and self.cache is not None:
+                        self.cache.set(unit.key, content)
+                    for result in self._results(unit, items, prompts, content, error, cached=False):
+                        yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def generate_bulk(self, template: str, items: Sequence[Mapping], **kwargs) -> Iterator[BulkMessageResult]:
+        """
+        Synchronous, streaming `agenerate_bulk`: the event loop runs on a
+        worker thread and results are yielded here as they complete.
+        """
+        results: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for result in self.agenerate_bulk(template, items, **kwargs):
+                    results.put(result)
+            except BaseException as e:
+                results.put(e)
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+        thread.start()
+        while True:
+            result = results.get()
+            if result is done:
+                break
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+        thread.join()
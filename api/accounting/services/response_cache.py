@@ -0,0 +1,166 @@
+"""
+Prompt-level cache for generated messages.
+
+Completions are stored in a Django cache (the `LLM_RESPONSE_CACHE` alias;
+TTL and size limit come from its CACHES entry) keyed by
+sha256(model, system prompt, user prompt, completion parameters), so a
+reminder prompt that was already generated is answered without a round-trip.
+
+Template-level reuse is opt-in: the variable fields of a prompt template
+(debtor name, amount, ...) are replaced with `[[field]]` placeholders, the
+resulting skeleton prompt is generated and cached once, and each item's
+values are substituted into the completion afterwards. A skeleton completion
+that dropped a placeholder is not reused.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from accounting.services import metrics
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+KEY_PREFIX = "llm-response:v1:"
+
+PLACEHOLDER = "[[{}]]"
+PLACEHOLDER_PATTERN = re.compile(r"\[\[(\w+)\]\]")
+
+# Appended to the system prompt of skeleton generations
+TEMPLATE_INSTRUCTION = (
+    "Copy every [[placeholder]] exactly as written, brackets included; "
+    "it is replaced with the real value afterwards."
+)
+
+
+def response_key(model: str, system: str, prompt: str, params: Optional[Mapping] = None) -> str:
+    payload = json.dumps([model, system, prompt, dict(params or {})], sort_keys=True,
+                         ensure_ascii=False, default=str)
+    return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Template skeletons
+# -------------------------------
+
+def render_skeleton(template: str, item: Mapping, fields: Sequence[str]) -> Optional[str]:
+    """
+    `template` rendered with `fields` replaced by placeholders, or None when
+    the template can't be rendered that way (e.g. a numeric format spec on a
+    variable field); such items are generated per prompt instead.
+    """
+    values = dict(item)
+    values.update({f: PLACEHOLDER.format(f) for f in fields})
+    try:
+        return template.format_map(values)
+    except (KeyError, IndexError, ValueError, AttributeError):
+        return None
+
+
+def skeleton_fields(skeleton: str) -> List[str]:
+    return sorted(set(PLACEHOLDER_PATTERN.findall(skeleton)))
+
+
+def fill_skeleton(content: str, item: Mapping, fields: Iterable[str]) -> str:
+    for f in fields:
+        content = content.replace(PLACEHOLDER.format(f), str(item[f]))
+    return content
+
+
+def is_reusable(skeleton: str, content: Optional[str]) -> bool:
+    """A skeleton completion is reusable only if it kept exactly the prompt's placeholders."""
+    return bool(content) and skeleton_fields(content) == skeleton_fields(skeleton)
+
+
+# -------------------------------
+# Cache
+# -------------------------------
+
+class ResponseCache:
+    def __init__(self, alias: str = "llm_responses", timeout: Optional[float] = None):
+        self.alias = alias
+        self.timeout = timeout  # None: the alias' configured TIMEOUT
+        self.hits = 0
+        self.misses = 0
+        self.template_hits = 0  # items answered from a shared skeleton completion
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _count(self, hits: int = 0, misses: int = 0, template_hits: int = 0, stores: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.template_hits += template_hits
+            self.stores += stores
+        metrics.cache_lookup("llm_responses", hits=hits, misses=misses)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        self._count(hits=value is not None, misses=value is None)
+        return value
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found = self.backend.get_many(list(keys)) if keys else {}
+        self._count(hits=len(found), misses=len(set(keys)) - len(found))
+        return found
+
+    def set(self, key: str, content: str) -> None:
+        if not content:
+            return
+        if self.timeout is None:
+            self.backend.set(key, content)
+        else:
+            self.backend.set(key, content, timeout=self.timeout)
+        self._count(stores=1)
+
+    def record_template_hits(self, count: int) -> None:
+        self._count(template_hits=count)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "alias": self.alias,
+            "hits": self.hits,
+            "misses": self.misses,
+            "template_hits": self.template_hits,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide cache for the configured alias (None when LLM_RESPONSE_CACHE is empty)."""
+    alias = getattr(settings, "LLM_RESPONSE_CACHE", "")
+    if not alias:
+        return None
+    with _caches_lock:
+        if alias not in _caches:
+            _caches[alias] = ResponseCache(alias)
+        return _caches[alias]
+
+
+def split_cached(cache: Optional[ResponseCache], keys: Sequence[str]) -> Tuple[Dict[str, str], List[str]]:
+    """({key: cached content}, keys still to generate), with one cache round-trip."""
+    if cache is None:
+        return {}, list(keys)
+    found = cache.get_many(keys)
+    return found, [k for k in keys if k not in found]
@@ -0,0 +1,166 @@
+"""
+Token-budgeted sample selection for column embedding payloads.
+
+`classify_columns` embeds one `HEADER: ... SAMPLES: a ; b ; ...` text per
+column. Taking the first N non-null values wastes tokens on repeated
+leading rows, subtotal lines and placeholders ("-", "yok") while missing the
+formats further down. `select_samples` instead:
+
+  - drops duplicates (case / whitespace-insensitive), and placeholder or
+    subtotal values unless nothing else is left
+  - groups the remaining candidates into strata by value shape (digit runs
+    -> "9", letter runs -> "a") and length class
+  - takes values round-robin across strata, the most common shapes first,
+    until `max_samples` values are chosen or, with a `token_budget`, the
+    payload would exceed it (estimated with `embedding_batch.estimate_tokens`)
+
+The budget is opt-in (CLASSIFICATION_SAMPLE_TOKENS, 0 = none): its effect on
+accuracy depends on the embedding model, so set it from a benchmark run
+against the embedder used in production.
+
+Selected values are returned in their original row order. Readers should
+fetch `candidate_count(samples_per_col)` values per column so there is
+something to choose from.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from accounting.services.embedding_batch import estimate_tokens
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+DEFAULTS = {
+    # estimated tokens per column payload, header included; 0: no budget
+    "CLASSIFICATION_SAMPLE_TOKENS": 0,
+    # candidate values read per column, as a multiple of samples_per_col
+    "CLASSIFICATION_SAMPLE_CANDIDATES": 5,
+}
+
+SEPARATOR = " ; "
+
+PLACEHOLDERS = {"-", "--", "---", ".", "?", "yok", "n/a", "na", "null", "none", "nan", "#n/a", "belirtilmemiş"}
+SUBTOTAL_RE = re.compile(r"^\s*(ara\s*toplam|genel\s*toplam|toplam|sub\s*total|grand\s*total|total)\b", re.IGNORECASE)
+
+_DIGITS_RE = re.compile(r"\d+")
+_LETTERS_RE = re.compile(r"[^\W\d_]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def _setting(name: str):
+    default = DEFAULTS.get(name)
+    try:
+        from django.conf import settings
+
+        if settings.configured and hasattr(settings, name):
+            return getattr(settings, name)
+    except ImportError:
+        pass
+    value = os.getenv(name)
+    return type(default)(value) if value is not None else default
+
+
+def candidate_count(samples_per_col: int) -> int:
+    """Candidate values to read per column for `select_samples` to pick `samples_per_col` from."""
+    return samples_per_col * max(1, int(_setting("CLASSIFICATION_SAMPLE_CANDIDATES")))
+
+
+# -------------------------------
+# Selection
+# -------------------------------
+
+@dataclass
+class ColumnSample:
+    values: List[str]
+    payload: str
+    tokens: int       # estimated tokens of `payload`
+    candidates: int   # non-null values offered
+    distinct: int     # usable values left after dropping duplicates and fillers
+
+
+def value_shape(text: str) -> str:
+    """Format class of a value: "+90 532 111 22 33" -> "+9 9 9 9 9", "1.234,50 TL" -> "9.9,9 a"."""
+    shape = _DIGITS_RE.sub("9", text)
+    shape = _LETTERS_RE.sub("a", shape)
+    return _SPACES_RE.sub(" ", shape)
+
+
+def _stratum(text: str) -> Tuple[str, int]:
+    return value_shape(text), len(text).bit_length()
+
+
+def _is_filler(text: str) -> bool:
+    return text.casefold() in PLACEHOLDERS or bool(SUBTOTAL_RE.match(text))
+
+
+def build_payload(header, values: Iterable[str]) -> str:
+    return f"HEADER: {header}\nSAMPLES: " + SEPARATOR.join(values)
+
+
+def select_samples(
+    header,
+    values: Iterable[object],
+    max_samples: int = 10,
+    token_budget: Optional[int] = None,
+) -> ColumnSample:
+    """
+    Up to `max_samples` distinct, format-diverse values. With a positive
+    `token_budget` (CLASSIFICATION_SAMPLE_TOKENS by default) the payload stays
+    within that many estimated tokens; at least one value is kept if the
+    column has any, cut to fit.
+    """
+    budget = int(_setting("CLASSIFICATION_SAMPLE_TOKENS") if token_budget is None else token_budget)
+
+    def fits(texts: List[str]) -> bool:
+        return budget <= 0 or estimate_tokens(build_payload(header, texts)) <= budget
+
+    offered = 0
+    seen = set()
+    distinct: List[Tuple[int, str]] = []
+    fillers: List[Tuple[int, str]] = []
+    for value in values:
+        text = str(value).strip()
+        if not text:
+            continue
+        offered += 1
+        key = _SPACES_RE.sub(" ", text.casefold())
+        if key in seen:
+            continue
+        seen.add(key)
+        (fillers if _is_filler(text) else distinct).append((offered, text))
+    pool = distinct or fillers
+
+    strata: Dict[Tuple[str, int], List[Tuple[int, str]]] = {}
+    for item in pool:
+        strata.setdefault(_stratum(item[1]), []).append(item)
+    # most common formats first; ties keep first appearance (dicts are ordered, sort is stable)
+    queues = sorted(strata.values(), key=len, reverse=True)
+
+    chosen: List[Tuple[int, str]] = []
+    depth = 0
+    while len(chosen) < max_samples and any(depth < len(q) for q in queues):
+        for queue in queues:
+            if depth >= len(queue) or len(chosen) >= max_samples:
+                continue
+            item = queue[depth]
+            if fits([t for _, t in chosen] + [item[1]]):
+                chosen.append(item)
+        depth += 1
+
+    if not chosen and pool:
+        # not even one value fits: keep the first, cut to the budget
+        position, text = pool[0]
+        while len(text) > 1 and not fits([text]):
+            text = text[:-max(1, len(text) // 8)]
+        chosen = [(position, text)]
+
+    chosen.sort()
+    samples = [text for _, text in chosen]
+    payload = build_payload(header, samples)
+    return ColumnSample(values=samples, payload=payload, tokens=estimate_tokens(payload),
+                        candidates=offered, distinct=len(pool))
@@ -0,0 +1,68 @@
+"""
+Vectorized similarity scoring.
+
+Centroids are stacked into one L2-normalized float32 matrix once; column
+embeddings are stacked and normalized the same way, so cosine similarity for
+every (column, label) pair is a single matmul. Top-k alternatives come from
+`np.partition`, sorting only the k winners per row.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """Float32 copy of `matrix` with unit-length rows (all-zero rows stay zero)."""
+    m = np.array(matrix, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row indices and values of the k highest scores, best first.
+
+    Ties keep the lower column index first, matching a stable descending sort.
+    """
+    n = scores.shape[1]
+    k = min(k, n)
+    if k < n:
+        # partition finds the k-th best score; argpartition would pick arbitrarily among ties at that
+        # boundary, so take everything above it plus the lowest-index ties (nonzero keeps column order)
+        kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+        above = scores > kth
+        tied = scores == kth
+        keep = above | (tied & (np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+        part = np.nonzero(keep)[1].reshape(scores.shape[0], k)
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    # lexsort's last key is primary: score descending, then original index
+    order = np.lexsort((part, -part_scores), axis=1)
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx, np.take_along_axis(scores, idx, axis=1)
+
+
+class CentroidScorer:
+    """Pre-normalized centroid matrix scoring many embeddings per call."""
+
+    def __init__(self, centroids: Dict[str, Sequence[float]]):
+        self.labels: List[str] = list(centroids.keys())
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.matrix = normalize_rows([np.asarray(centroids[label], dtype=np.float32) for label in self.labels])
+
+    def score(self, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        """Cosine similarity matrix of shape (len(vectors), len(labels))."""
+        if len(vectors) == 0:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        return normalize_rows(vectors) @ self.matrix.T
+
+    def ranked(self, scores: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """Top-k (label, score) pairs per row, best first."""
+        idx, vals = top_k(scores, k)
+        return [
+            [(self.labels[j], float(v)) for j, v in zip(row_idx, row_vals)]
+            for row_idx, row_vals in zip(idx, vals)
+        ]
@@ -0,0 +1,316 @@
+"""
+Synthetic Turkish debtor workbooks for benchmarks.
+
+`generate` builds a sheet with one column per `TARGET_EXEMPLARS` label
+(account code, name, phone, balance, last invoice / payment date) plus
+distractor columns (city, tax number, e-mail, notes, ...), in shuffled
+order, and returns the true label of every column. Values follow the
+exemplar formats: ERP-style account codes, Turkish names, phones with and
+without +90 / parentheses / extensions, TR-formatted amounts with TL/₺, and
+dates in several notations.
+
+`noise` (0..1) controls how messy the export is:
+
+  - blank cells and placeholder text ("-", "yok", "N/A")
+  - header variants (synonyms, abbreviations, upper case, stray spaces)
+  - mixed formats within a column (raw floats next to "1.234,50 TL",
+    datetimes next to "01.08.2025")
+
+Everything is drawn from `random.Random`s seeded with `seed`, so the same
+arguments always produce the same workbook.
+"""
+
+import csv
+import os
+import random
+import string
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# -------------------------------
+# Vocabulary
+# -------------------------------
+
+FIRST_NAMES = ["Ali", "Ayşe", "Mehmet", "Zeynep", "Hakan", "İlker", "Şule", "Çağrı", "Gökçe", "Emre",
+               "Elif", "Oğuzhan", "Nazlı", "Seda", "Barış", "Ahmet", "Fatma", "Mustafa", "Emine", "Hüseyin",
+               "Özlem", "Burak", "Gülşen", "İbrahim", "Ümit", "Deniz", "Kübra", "Serkan", "Tuğba", "Yiğit"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Yıldırım", "Öztürk", "Aydın", "Özdemir",
+              "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek",
+              "Anbar", "Karahan", "Ünsal", "Yücel", "Gür", "Öz", "Aksoy", "Ekinci", "Güneş", "Polat"]
+COMPANY_SUFFIXES = ["Ltd. Şti.", "A.Ş.", "Tic. Ltd. Şti.", "San. ve Tic. A.Ş."]
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Antalya", "Konya", "Adana", "Gaziantep", "Kocaeli", "Eskişehir"]
+MONTHS_TR = ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran", "Temmuz", "Ağustos", "Eylül", "Ekim",
+             "Kasım", "Aralık"]
+PLACEHOLDERS = ["-", "yok", "N/A", "?", "0"]
+NOTES = ["Ödeme sözü verdi", "Ulaşılamadı", "Yasal takipte", "Taksitlendirildi", "İtiraz var", "Mutabık",
+         "Tekrar aranacak", "Adres değişti"]
+
+# Header spellings per label; the first is the clean one
+HEADERS: Dict[str, List[str]] = {
+    "cari_hesap_kodu": ["Cari Hesap Kodu", "Cari Kod", "CARIKOD", "Hesap No", "CH Kodu", "Müşteri Kodu"],
+    "cari_hesap_ismi": ["Cari Hesap Ünvanı", "Ad Soyad", "Müşteri Adı", "Cari Adı", "ÜNVAN", "Adı Soyadı"],
+    "telefon_no": ["Telefon", "GSM", "Cep Tel", "Tel No", "İrtibat No", "Phone"],
+    "bakiye": ["Bakiye", "Borç Tutarı", "Toplam Borç", "Ödenecek Tutar", "BORÇ", "Tutar (TL)"],
+    "son_fatura_tarihi": ["Son Fatura Tarihi", "Son Fatura", "Fatura Kesim Tarihi", "son FT. TAR.",
+                          "En Son Fatura"],
+    "son_tahsilat_tarihi": ["Son Tahsilat Tarihi", "Son Ödeme Tarihi", "SON TAHS. TAR.", "Tahsilat Tarihi",
+                            "Ödeme Tarihi"],
+}
+DISTRACTOR_HEADERS: Dict[str, List[str]] = {
+    "sehir": ["Şehir", "İl", "SEHIR"],
+    "vergi_no": ["Vergi No", "VKN", "TCKN/VKN"],
+    "eposta": ["E-posta", "Email", "E-Mail Adresi"],
+    "aciklama": ["Açıklama", "Not", "Notlar"],
+    "temsilci": ["Temsilci", "Satış Temsilcisi", "Sorumlu"],
+    "vade_gun": ["Vade (Gün)", "Vade", "Ödeme Vadesi"],
+    "sira_no": ["Sıra No", "No", "#"],
+}
+
+
+# -------------------------------
+# Value generators
+# -------------------------------
+
+def _person(rng: random.Random) -> str:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    if rng.random() < 0.15:
+        name = f"{rng.choice(FIRST_NAMES)} {name}"
+    return name
+
+
+def _account_code(rng: random.Random, i: int) -> str:
+    style = i % 6
+    if style == 0:
+        return f"120.{rng.randint(1, 99):02d}.{i:05d}"
+    if style == 1:
+        return f"M-{i:06d}"
+    if style == 2:
+        return f"CARI-TR-{i:06d}"
+    if style == 3:
+        return f"CH{i:06d}"
+    if style == 4:
+        return f"120-{i:05d}-{rng.randint(1, 9):02d}"
+    return f"MUS-{i:05d}"
+
+
+def _name(rng: random.Random, i: int) -> str:
+    if rng.random() < 0.3:
+        return f"{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)}"
+    name = _person(rng)
+    roll = rng.random()
+    if roll < 0.1:
+        return name.upper()
+    if roll < 0.15:
+        return name.lower()
+    return name
+
+
+def _phone(rng: random.Random, i: int) -> str:
+    operator = rng.choice(["532", "533", "535", "542", "505", "555", "212", "216", "312"])
+    a, b, c = rng.randint(100, 999), rng.randint(10, 99), rng.randint(10, 99)
+    style = rng.randrange(7)
+    if style == 0:
+        return f"+90 {operator} {a} {b} {c}"
+    if style == 1:
+        return f"0{operator} {a} {b} {c}"
+    if style == 2:
+        return f"{operator}{a}{b}{c}"
+    if style == 3:
+        return f"+90{operator}{a}{b}{c}"
+    if style == 4:
+        return f"+90 ({operator}) {a} {b} {c}"
+    if style == 5:
+        return f"+90-{operator}-{a}-{b}-{c}"
+    return f"0 {operator} {a} {b} {c} dahili {rng.randint(100, 999)}"
+
+
+def _tr_amount(value: float) -> str:
+    sign = "-" if value < 0 else ""
+    whole, frac = f"{abs(value):.2f}".split(".")
+    grouped = f"{int(whole):,}".replace(",", ".")
+    return f"{sign}{grouped},{frac}"
+
+
+def _amount(rng: random.Random, i: int):
+    value = round(rng.lognormvariate(8, 1.5) * (-1 if rng.random() < 0.05 else 1), 2)
+    style = rng.randrange(5)
+    if style == 0:
+        return value  # numeric cell
+    if style == 1:
+        return f"{_tr_amount(value)} TL"
+    if style == 2:
+        return f"₺{_tr_amount(value)}"
+    if style == 3:
+        return _tr_amount(value)
+    return f"TRY {_tr_amount(value)}"
+
+
+def _date(rng: random.Random, base: datetime, spread_days: int):
+    moment = base - timedelta(days=rng.randrange(spread_days), minutes=rng.randrange(24 * 60))
+    style = rng.randrange(6)
+    if style == 0:
+        return moment.replace(hour=0, minute=0)  # date cell
+    if style == 1:
+        return moment.strftime("%d.%m.%Y")
+    if style == 2:
+        return moment.strftime("%d/%m/%Y")
+    if style == 3:
+        return moment.strftime("%Y-%m-%d")
+    if style == 4:
+        return f"{moment.day} {MONTHS_TR[moment.month - 1]} {moment.year}"
+    return moment.strftime("%Y-%m-%d %H:%M")
+
+
+def _distractor(kind: str) -> Callable[[random.Random, int], object]:
+    if kind == "sehir":
+        return lambda rng, i: rng.choice(CITIES)
+    if kind == "vergi_no":
+        return lambda rng, i: "".join(rng.choice(string.digits) for _ in range(rng.choice((10, 11))))
+    if kind == "eposta":
+        return lambda rng, i: f"{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower()}{i}@ornek.com.tr"
+    if kind == "aciklama":
+        return lambda rng, i: rng.choice(NOTES)
+    if kind == "temsilci":
+        return lambda rng, i: _person(rng)
+    if kind == "vade_gun":
+        return lambda rng, i: rng.choice((15, 30, 45, 60, 90))
+    return lambda rng, i: i + 1
+
+
+def _generators(base: datetime) -> Dict[str, Callable[[random.Random, int], object]]:
+    return {
+        "cari_hesap_kodu": _account_code,
+        "cari_hesap_ismi": _name,
+        "telefon_no": _phone,
+        "bakiye": _amount,
+        "son_fatura_tarihi": lambda rng, i: _date(rng, base, 120),
+        "son_tahsilat_tarihi": lambda rng, i: _date(rng, base, 400),
+    }
+
+
+# -------------------------------
+# Noise
+# -------------------------------
+
+def _noisy_header(rng: random.Random, variants: List[str], noise: float) -> str:
+    if rng.random() >= noise:
+        return variants[0]
+    header = rng.choice(variants)
+    roll = rng.random()
+    if roll < 0.25:
+        return header.upper()
+    if roll < 0.5:
+        return f" {header} "
+    if roll < 0.65:
+        return header.replace("Tarihi", "Tar.").replace("Telefon", "Tel.")
+    if roll < 0.75:
+        return f"{header}:"
+    return header
+
+
+def _noisy_value(rng: random.Random, value, noise: float):
+    roll = rng.random()
+    if roll < noise * 0.15:
+        return None
+    if roll < noise * 0.2:
+        return rng.choice(PLACEHOLDERS)
+    if roll < noise * 0.3:
+        # the same value in the other representation (text vs typed cell)
+        if isinstance(value, float):
+            return _tr_amount(value)
+        if isinstance(value, datetime):
+            return value.strftime("%d.%m.%Y")
+        if isinstance(value, str):
+            return value.strip() + " "
+    return value
+
+
+# -------------------------------
+# Generation
+# -------------------------------
+
+def generate(
+    rows: int,
+    columns: Optional[int] = None,
+    noise: float = 0.1,
+    seed: int = 0,
+) -> Tuple[List[str], Iterator[tuple], Dict[int, Optional[str]]]:
+    """
+    (headers, data rows, true label per column index; None for distractors).
+
+    `columns` below the number of labels keeps a random subset of them;
+    above it, distractor columns fill the rest. Rows are generated lazily.
+    """
+    if not 0 <= noise <= 1:
+        raise ValueError("noise must be between 0 and 1")
+    rng = random.Random(seed)
+    base = datetime(2025, 8, 15)
+    generators = _generators(base)
+    labels = list(HEADERS)
+    columns = len(labels) + 2 if columns is None else columns
+    if columns < 1:
+        raise ValueError("columns must be at least 1")
+
+    chosen: List[Tuple[Optional[str], str, Callable]] = []
+    for label in rng.sample(labels, min(columns, len(labels))):
+        chosen.append((label, _noisy_header(rng, HEADERS[label], noise), generators[label]))
+    kinds = list(DISTRACTOR_HEADERS)
+    for k in range(columns - len(chosen)):
+        kind = kinds[k % len(kinds)]
+        header = _noisy_header(rng, DISTRACTOR_HEADERS[kind], noise)
+        if k >= len(kinds):
+            header = f"{header} {k // len(kinds) + 1}"
+        chosen.append((None, header, _distractor(kind)))
+    rng.shuffle(chosen)
+
+    headers = [header for _, header, _ in chosen]
+    truth = {i: label for i, (label, _, _) in enumerate(chosen)}
+
+    def data() -> Iterator[tuple]:
+        row_rng = random.Random(seed + 1)
+        for i in range(rows):
+            yield tuple(_noisy_value(row_rng, make(row_rng, i), noise) if noise else make(row_rng, i)
+                        for _, _, make in chosen)
+
+    return headers, data(), truth
+
+
+def write_workbook(
+    path: str,
+    rows: int,
+    columns: Optional[int] = None,
+    noise: float = 0.1,
+    seed: int = 0,
+    sheet: str = "Cari Hesaplar",
+) -> Dict[int, Optional[str]]:
+    """Write a synthetic workbook (.xlsx or .csv by extension); returns the true labels per column."""
+    headers, data, truth = generate(rows, columns=columns, noise=noise, seed=seed)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(headers)
+            for row in data:
+                writer.writerow(["" if v is None else _csv_text(v) for v in row])
+        return truth
+    if ext not in (".xlsx", ".xlsm"):
+        raise ValueError(f"Unsupported workbook type: {ext or path}")
+
+    from accounting.services.workbook_reader import _import_openpyxl
+
+    wb = _import_openpyxl().Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(headers)
+    for row in data:
+        ws.append(row)
+    wb.save(path)
+    return truth
+
+
+def _csv_text(value) -> str:
+    if isinstance(value, float):
+        return _tr_amount(value)
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y")
+    return str(value)
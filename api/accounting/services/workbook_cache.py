@@ -0,0 +1,746 @@
+"""
+Columnar workbook cache for previews and re-reads.
+
+An uploaded workbook is parsed once per sheet (streamed with
+`workbook_reader.iter_rows`) into a directory keyed by the file's sha256:
+
+  <root>/<sha256>/source.<ext>        the original file (other sheets are converted on demand)
+  <root>/<sha256>/workbook.json       upload name, sheet names
+  <root>/<sha256>/<sheet index>.pending   conversion requested; empty, or the converter's lease expiry
+  <root>/<sha256>/<sheet index>.claim     held (O_EXCL) while a runner checks and leases the marker
+  <root>/<sha256>/<sheet index>.failed    conversion error
+  <root>/<sha256>/<sheet index>/
+      meta.json                       format version, raw header, row count
+      c<i>.data                       column i: cell texts, UTF-8, concatenated
+      c<i>.offsets.npy                int64 byte offsets, rows + 1
+      c<i>.types.npy                  uint8 cell type (null, str, int, float, ...)
+      stats/c<i>.json                 per-column stats, computed on first request
+
+The offset/type arrays and the text blobs are memory-mapped read-only, so a
+row window or a column subset costs only the pages it touches, and every
+worker shares the page cache. Cells keep their Python type (the type code
+plus a lossless text form), so `iter_rows` over the cache yields the same
+values as parsing the file: `read_samples` and ledger ingest give identical
+results whichever they read. Files are looked up by content hash, so a
+re-uploaded or job-copied workbook hits the same cache.
+
+Storing an upload is cheap; converting a sheet reads all of it, so requests
+only mark the sheet pending (`request_conversion`) and a job runner converts
+it (`convert_pending`, see `classification_jobs.enqueue_conversion`),
+renewing the marker's lease as it goes so an abandoned conversion is picked
+up again. The cache's total size is kept in <root>/.usage.json, adjusted as
+files are added, so checking it against WORKBOOK_CACHE_MAX_BYTES does not
+walk the tree; only an actual `prune` does, and it rewrites the total.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time as _time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from accounting.services import metrics, workbook_reader
+from accounting.services.column_profile import profile_series
+from accounting.services.workbook_reader import Sheet
+
+try:
+    import fcntl
+except ImportError:  # Windows: usage updates are best-effort without the lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+SOURCE_BASENAME = "source"
+WORKBOOK_FILENAME = "workbook.json"
+META_FILENAME = "meta.json"
+STATS_DIRNAME = "stats"
+PENDING_SUFFIX = ".pending"
+CLAIM_SUFFIX = ".claim"
+FAILED_SUFFIX = ".failed"
+USAGE_FILENAME = ".usage.json"
+USAGE_LOCK_FILENAME = ".usage.lock"
+
+# Seconds a converter holds a pending sheet without renewing before another runner may take it over
+CONVERSION_LEASE_SECONDS = 120.0
+
+# Sheet states
+READY, CONVERTING, FAILED = "ready", "converting", "failed"
+
+# Rows decoded per column at a time when iterating a whole cached sheet
+ITER_CHUNK_ROWS = 10_000
+TOP_VALUES = 5
+
+# Cell type codes
+NULL, STR, INT, FLOAT, BOOL, DATETIME, DATE, TIME, TIMEDELTA = range(9)
+TYPE_NAMES = ["null", "str", "int", "float", "bool", "datetime", "date", "time", "timedelta"]
+
+# Content hashes of files already hashed in this process, keyed by (path, size, mtime)
+_digests: Dict[Tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def default_root() -> str:
+    return _setting("WORKBOOK_CACHE_DIR", "workbook_cache")
+
+
+# -------------------------------
+# Cell encoding
+# -------------------------------
+
+def encode_cell(value) -> Tuple[int, str]:
+    """(type code, lossless text) of one cell value."""
+    if value is None:
+        return NULL, ""
+    # bool before int, datetime before date: both are subclasses
+    if isinstance(value, bool):
+        return BOOL, "1" if value else "0"
+    if isinstance(value, int):
+        return INT, str(value)
+    if isinstance(value, float):
+        return FLOAT, repr(value)
+    if isinstance(value, datetime):
+        return DATETIME, value.isoformat()
+    if isinstance(value, date):
+        return DATE, value.isoformat()
+    if isinstance(value, time):
+        return TIME, value.isoformat()
+    if isinstance(value, timedelta):
+        return TIMEDELTA, repr(value.total_seconds())
+    return STR, str(value)
+
+
+def decode_cell(code: int, text: str):
+    if code == STR:
+        return text
+    if code == NULL:
+        return None
+    if code == INT:
+        return int(text)
+    if code == FLOAT:
+        return float(text)
+    if code == BOOL:
+        return text == "1"
+    if code == DATETIME:
+        return datetime.fromisoformat(text)
+    if code == DATE:
+        return date.fromisoformat(text)
+    if code == TIME:
+        return time.fromisoformat(text)
+    return timedelta(seconds=float(text))
+
+
+def json_cell(code: int, text: str):
+    """Cell as a JSON value for the preview grid (NaN/inf become null)."""
+    if code == STR:
+        return text
+    if code == NULL:
+        return None
+    if code == INT:
+        return int(text)
+    if code == FLOAT:
+        value = float(text)
+        return value if math.isfinite(value) else None
+    if code == BOOL:
+        return text == "1"
+    return text  # dates and times as ISO 8601, durations as seconds
+
+
+# -------------------------------
+# Hashing and layout
+# -------------------------------
+
+def file_digest(path) -> str:
+    """sha256 of the file's contents, remembered per (path, size, mtime) in this process."""
+    st = os.stat(path)
+    key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _digests_lock:
+        _digests[key] = digest
+    return digest
+
+
+def _source_path(directory: Path) -> Optional[Path]:
+    for candidate in directory.glob(f"{SOURCE_BASENAME}.*"):
+        return candidate
+    return None
+
+
+def _write_json(path: Path, data) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _resolve_sheet(names: List[str], sheet: Sheet) -> int:
+    if sheet is None:
+        return 0
+    if isinstance(sheet, int):
+        if not 0 <= sheet < len(names):
+            raise ValueError(f"Worksheet index {sheet} out of range")
+        return sheet
+    if sheet not in names:
+        raise ValueError(f"Worksheet named '{sheet}' not found")
+    return names.index(sheet)
+
+
+# -------------------------------
+# Conversion
+# -------------------------------
+
+def _convert_sheet(source: Path, sheet_index: int, target: Path, heartbeat=None) -> None:
+    """
+    Stream one sheet into column files under `target` (written to a temp dir,
+    then renamed); `heartbeat` is called every ITER_CHUNK_ROWS rows.
+    """
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    rows = workbook_reader.iter_rows(str(source), sheet_index)
+    files = []
+    try:
+        header = tuple(next(rows, ()))
+        n_cols = len(header)
+        files = [open(tmp / f"c{i}.data", "wb") for i in range(n_cols)]
+        offsets = [array("q", [0]) for _ in range(n_cols)]
+        types = [bytearray() for _ in range(n_cols)]
+        pending = [[] for _ in range(n_cols)]
+        positions = [0] * n_cols
+        n_rows = 0
+        for row in rows:
+            n_rows += 1
+            for c in range(n_cols):
+                code, text = encode_cell(row[c] if c < len(row) else None)
+                data = text.encode("utf-8")
+                positions[c] += len(data)
+                offsets[c].append(positions[c])
+                types[c].append(code)
+                if data:
+                    pending[c].append(data)
+            if n_rows % ITER_CHUNK_ROWS == 0:
+                for c in range(n_cols):
+                    files[c].write(b"".join(pending[c]))
+                    pending[c] = []
+                if heartbeat is not None:
+                    heartbeat()
+        for c in range(n_cols):
+            files[c].write(b"".join(pending[c]))
+            np.save(tmp / f"c{c}.offsets.npy", np.frombuffer(offsets[c], dtype=np.int64))
+            np.save(tmp / f"c{c}.types.npy", np.frombuffer(bytes(types[c]), dtype=np.uint8))
+    finally:
+        for f in files:
+            f.close()
+        close = getattr(rows, "close", None)
+        if close is not None:
+            close()
+
+    _write_json(tmp / META_FILENAME, {
+        "version": CACHE_VERSION,
+        "header": [list(encode_cell(h)) for h in header],
+        "rows": n_rows,
+    })
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # another process converted the same sheet first; theirs is identical
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _install(root: Path, digest: str, tmp: Path, name: str) -> str:
+    """Move a hashed temp copy into place and record the sheet names."""
+    directory = root / digest
+    if (directory / WORKBOOK_FILENAME).exists():
+        tmp.unlink()
+        os.utime(directory)
+        return digest
+    directory.mkdir(parents=True, exist_ok=True)
+    source = directory / f"{SOURCE_BASENAME}{os.path.splitext(name)[1].lower()}"
+    os.replace(tmp, source)
+    add_usage(source.stat().st_size, root)
+    name = os.path.basename(name)
+    sheets = workbook_reader.sheet_names(str(source))
+    if workbook_reader._file_kind(name) == "csv":
+        sheets = [os.path.splitext(name)[0]]  # named after the upload, not the stored copy
+    _write_json(directory / WORKBOOK_FILENAME, {"name": name, "sheets": sheets})
+    return digest
+
+
+def store_workbook(chunks: Iterable[bytes], name: str, root=None) -> str:
+    """
+    Write an upload into the cache (once per content hash), hashing it while
+    it is written, and record its sheet names; returns the hash. Sheets are
+    converted by `open_sheet`.
+    """
+    workbook_reader._file_kind(name)  # raises ValueError on unsupported types
+    root = Path(root or default_root())
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / f".upload.{os.getpid()}.{threading.get_ident()}.tmp"
+    h = hashlib.sha256()
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                h.update(chunk)
+                f.write(chunk)
+        return _install(root, h.hexdigest(), tmp, name)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def workbook_info(digest: str, root=None) -> dict:
+    """{"name", "sheets"} of a stored workbook; KeyError if it is not in the cache."""
+    path = Path(root or default_root()) / digest / WORKBOOK_FILENAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(digest) from None
+
+
+def sheet_index(digest: str, sheet: Sheet = None, root=None) -> int:
+    """Index of `sheet` in a stored workbook; KeyError if it is not cached, ValueError if there is no such sheet."""
+    return _resolve_sheet(workbook_info(digest, root)["sheets"], sheet)
+
+
+def _directory_size(directory: Path) -> int:
+    return sum(f.stat().st_size for f in directory.rglob("*") if f.is_file())
+
+
+def _convert(directory: Path, index: int, heartbeat=None) -> None:
+    target = directory / str(index)
+    source = _source_path(directory)
+    if source is None:
+        raise KeyError(f"{directory.name}/{index}")
+    _convert_sheet(source, index, target, heartbeat)
+    add_usage(_directory_size(target), directory.parent)
+
+
+def open_sheet(digest: str, sheet: Sheet = None, root=None, convert: bool = True) -> "CachedSheet":
+    """
+    The cached sheet of a stored workbook, converting it first if needed (or
+    raising KeyError when `convert` is False). Request handlers pass
+    `convert=False` and leave conversion to a runner (`request_conversion`).
+    """
+    directory = Path(root or default_root()) / digest
+    names = workbook_info(digest, root)["sheets"]
+    index = _resolve_sheet(names, sheet)
+    target = directory / str(index)
+    if not (target / META_FILENAME).exists():
+        if not convert:
+            raise KeyError(f"{digest}/{index}")
+        _convert(directory, index)
+    os.utime(directory)  # last use, for `prune`
+    return CachedSheet(target, names[index], index)
+
+
+# -------------------------------
+# Background conversion
+# -------------------------------
+
+def _marker(directory: Path, index: int, suffix: str) -> Path:
+    return directory / f"{index}{suffix}"
+
+
+def _set_lease(path: Path, seconds: float) -> None:
+    path.write_text(repr(_time.time() + seconds), encoding="utf-8")
+
+
+def _claimable(path: Path) -> bool:
+    """Whether a pending marker is queued (empty) or its converter's lease expired."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return False
+    try:
+        return not text or float(text) < _time.time()
+    except ValueError:
+        return True
+
+
+def _take_claim(path: Path) -> bool:
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                stale = _time.time() - path.stat().st_mtime > CONVERSION_LEASE_SECONDS
+            except FileNotFoundError:
+                continue  # released meanwhile
+            if not stale:
+                return False
+            path.unlink(missing_ok=True)
+        except FileNotFoundError:  # the workbook was pruned
+            return False
+    return False
+
+
+@contextmanager
+def _claim(directory: Path, index: int):
+    """
+    Exclusive right to check and lease one sheet's pending marker, held by
+    creating its claim file with O_EXCL, so two runners can't both see a
+    marker as free and both convert the sheet. Yields False when another
+    runner holds it; a claim file left by a runner that died holding it is
+    removed once it is older than the lease.
+    """
+    path = _marker(directory, index, CLAIM_SUFFIX)
+    if not _take_claim(path):
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def sheet_status(digest: str, index: int, root=None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (state, error) of one sheet: READY, CONVERTING (queued or leased), FAILED,
+    or None when no conversion was requested or its converter went away.
+    """
+    directory = Path(root or default_root()) / digest
+    if (directory / str(index) / META_FILENAME).exists():
+        return READY, None
+    failed = _marker(directory, index, FAILED_SUFFIX)
+    if failed.exists():
+        return FAILED, failed.read_text(encoding="utf-8")
+    pending = _marker(directory, index, PENDING_SUFFIX)
+    try:
+        text = pending.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None, None
+    if not text or not _claimable(pending):
+        return CONVERTING, None
+    return None, None
+
+
+def request_conversion(digest: str, index: int, root=None, leased: bool = True) -> bool:
+    """
+    Mark a sheet pending unless it is converted, converting or failed; returns
+    whether to hand `convert_pending(digest, index)` to a runner. `leased`
+    marks it taken by that runner; otherwise it waits for `claim_pending`.
+    """
+    directory = Path(root or default_root()) / digest
+    with _claim(directory, index) as claimed:
+        if not claimed or sheet_status(digest, index, root)[0] is not None:
+            return False
+        pending = _marker(directory, index, PENDING_SUFFIX)
+        if leased:
+            _set_lease(pending, CONVERSION_LEASE_SECONDS)
+        else:
+            pending.write_text("", encoding="utf-8")
+        return True
+
+
+def convert_pending(digest: str, index: int, root=None) -> None:
+    """Runner entry point: convert a pending sheet, renewing its lease, then prune the cache if it outgrew its cap."""
+    directory = Path(root or default_root()) / digest
+    pending = _marker(directory, index, PENDING_SUFFIX)
+    if not pending.exists() or (directory / str(index) / META_FILENAME).exists():
+        pending.unlink(missing_ok=True)
+        return
+    renew = lambda: _set_lease(pending, CONVERSION_LEASE_SECONDS)  # noqa: E731
+    renew()
+    try:
+        with metrics.stage("workbook_cache", "convert"):
+            _convert(directory, index, heartbeat=renew)
+    except Exception as e:
+        logger.exception("Converting sheet %d of workbook %s failed.", index, digest)
+        if directory.is_dir():
+            _marker(directory, index, FAILED_SUFFIX).write_text(f"{type(e).__name__}: {e}", encoding="utf-8")
+    finally:
+        pending.unlink(missing_ok=True)
+    prune(_setting("WORKBOOK_CACHE_MAX_BYTES", 5 * 1024 ** 3), directory.parent)
+
+
+def claim_pending(root=None) -> Optional[Tuple[str, int]]:
+    """
+    (digest, sheet index) of a queued pending sheet, or one whose converter's
+    lease expired, taking the lease under the sheet's claim so each pending
+    sheet goes to one runner; for runners without an in-process pool.
+    """
+    root = Path(root or default_root())
+    if not root.is_dir():
+        return None
+    for marker in root.glob(f"*/*{PENDING_SUFFIX}"):
+        index = int(marker.name[:-len(PENDING_SUFFIX)])
+        with _claim(marker.parent, index) as claimed:
+            # checked again under the claim: another runner may have leased it since the glob
+            if claimed and _claimable(marker):
+                _set_lease(marker, CONVERSION_LEASE_SECONDS)
+                return marker.parent.name, index
+    return None
+
+
+# -------------------------------
+# Size accounting
+# -------------------------------
+
+@contextmanager
+def _usage_lock(root: Path):
+    if fcntl is None:
+        yield
+        return
+    with open(root / USAGE_LOCK_FILENAME, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _entries(root: Path) -> List[Tuple[float, int, Path]]:
+    """(last use, bytes, directory) of every cached workbook; walks the whole tree."""
+    entries = []
+    for directory in root.iterdir():
+        if directory.is_dir() and not directory.name.startswith("."):
+            entries.append((directory.stat().st_mtime, _directory_size(directory), directory))
+    return entries
+
+
+def _read_usage(root: Path) -> Optional[int]:
+    try:
+        with open(root / USAGE_FILENAME, encoding="utf-8") as f:
+            return int(json.load(f)["bytes"])
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def usage(root=None) -> int:
+    """Bytes the cache holds, from the running total (counted once if it is missing)."""
+    root = Path(root or default_root())
+    if not root.is_dir():
+        return 0
+    with _usage_lock(root):
+        total = _read_usage(root)
+        if total is None:
+            total = sum(size for _, size, _ in _entries(root))
+            _write_json(root / USAGE_FILENAME, {"bytes": total})
+    return total
+
+
+def add_usage(delta: int, root=None) -> None:
+    """Adjust the running total by `delta` bytes (a missing total is counted by the next `usage` instead)."""
+    root = Path(root or default_root())
+    with _usage_lock(root):
+        total = _read_usage(root)
+        if total is not None:
+            _write_json(root / USAGE_FILENAME, {"bytes": max(total + delta, 0)})
+
+
+def cached_sheet(path, sheet: Sheet = None, root=None) -> Optional["CachedSheet"]:
+    """The already-converted cache of the workbook at `path`, or None."""
+    root = Path(root or default_root())
+    if not root.is_dir():
+        return None
+    try:
+        found = open_sheet(file_digest(path), sheet, root, convert=False)
+    except (KeyError, ValueError, OSError):
+        found = None
+    metrics.cache_lookup("workbooks", hits=found is not None, misses=found is None)
+    return found
+
+
+def prune(max_bytes: int, root=None) -> int:
+    """
+    Delete least recently used workbooks until the cache fits `max_bytes`;
+    returns how many. Free while the running total is under the cap; otherwise
+    the tree is walked once and the total rewritten from what is left.
+    """
+    root = Path(root or default_root())
+    if not root.is_dir() or usage(root) <= max_bytes:
+        return 0
+    with _usage_lock(root):
+        entries = _entries(root)
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, directory in sorted(entries):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            removed += 1
+        _write_json(root / USAGE_FILENAME, {"bytes": total})
+    return removed
+
+
+# -------------------------------
+# Reading
+# -------------------------------
+
+class _Column:
+    def __init__(self, directory: Path, index: int):
+        self.offsets = np.load(directory / f"c{index}.offsets.npy", mmap_mode="r")
+        self.types = np.load(directory / f"c{index}.types.npy", mmap_mode="r")
+        path = directory / f"c{index}.data"
+        # np.memmap cannot map empty files
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if path.stat().st_size else np.empty(0, np.uint8)
+
+    def cells(self, start: int, stop: int) -> Iterator[Tuple[int, str]]:
+        """(type code, text) of rows [start, stop)."""
+        offsets = np.asarray(self.offsets[start:stop + 1])
+        base = int(offsets[0]) if len(offsets) else 0
+        blob = self.data[base:int(offsets[-1])].tobytes() if len(offsets) else b""
+        bounds = (offsets - base).tolist()
+        for i, code in enumerate(np.asarray(self.types[start:stop]).tolist()):
+            yield code, blob[bounds[i]:bounds[i + 1]].decode("utf-8")
+
+
+class CachedSheet:
+    def __init__(self, directory: Path, name: str, index: int):
+        self.directory = directory
+        self.name = name
+        self.index = index
+        with open(directory / META_FILENAME, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.header = tuple(decode_cell(code, text) for code, text in meta["header"])
+        self.headers = workbook_reader.header_names(self.header)
+        self.n_rows = meta["rows"]
+        self._columns: Dict[int, _Column] = {}
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.headers)
+
+    def column(self, index: int) -> _Column:
+        if index not in self._columns:
+            self._columns[index] = _Column(self.directory, index)
+        return self._columns[index]
+
+    def _bounds(self, offset: int, limit: int) -> Tuple[int, int]:
+        start = min(max(offset, 0), self.n_rows)
+        return start, min(start + max(limit, 0), self.n_rows)
+
+    def window(self, offset: int, limit: int, columns: Optional[Sequence[int]] = None) -> List[list]:
+        """Rows [offset, offset + limit) of the selected columns, as JSON values."""
+        start, stop = self._bounds(offset, limit)
+        columns = range(self.n_cols) if columns is None else columns
+        cols = [[json_cell(code, text) for code, text in self.column(c).cells(start, stop)] for c in columns]
+        return [list(row) for row in zip(*cols)] if cols else [[] for _ in range(stop - start)]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Header row, then data rows with their original Python values (like `workbook_reader.iter_rows`)."""
+        if not self.header:
+            return  # empty sheet: no header row either
+        yield self.header
+        for start in range(0, self.n_rows, ITER_CHUNK_ROWS):
+            stop = min(start + ITER_CHUNK_ROWS, self.n_rows)
+            cols = [[decode_cell(code, text) for code, text in self.column(c).cells(start, stop)]
+                    for c in range(self.n_cols)]
+            yield from zip(*cols) if cols else (() for _ in range(stop - start))
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+
+    def _compute_stats(self, index: int) -> dict:
+        column = self.column(index)
+        types = np.asarray(column.types)
+        by_type = np.bincount(types, minlength=len(TYPE_NAMES))
+        texts: List[str] = []
+        shown: List[Optional[str]] = []  # str() of every cell as the classifier sees it, None for nulls
+        numbers: List[float] = []
+        moments: List[str] = []
+        for start in range(0, self.n_rows, ITER_CHUNK_ROWS):
+            for code, text in column.cells(start, min(start + ITER_CHUNK_ROWS, self.n_rows)):
+                if code == NULL:
+                    shown.append(None)
+                    continue
+                texts.append(text)
+                shown.append(text if code in (STR, INT, FLOAT) else str(decode_cell(code, text)))
+                if code in (INT, FLOAT):
+                    numbers.append(float(text))
+                elif code in (DATETIME, DATE):
+                    moments.append(text)
+
+        counts = Counter(texts)
+        stats = {
+            "column_index": index,
+            "column_header": self.headers[index],
+            "rows": self.n_rows,
+            "non_null": len(texts),
+            "nulls": self.n_rows - len(texts),
+            "distinct": len(counts),
+            "types": {TYPE_NAMES[code]: int(n) for code, n in enumerate(by_type) if n and code != NULL},
+            "top_values": [{"value": v, "count": n} for v, n in counts.most_common(TOP_VALUES)],
+            "profile": profile_series(pd.Series(shown, dtype=object)).as_dict(),
+        }
+        finite = [n for n in numbers if math.isfinite(n)]
+        if finite:
+            stats["numeric"] = {"min": min(finite), "max": max(finite), "mean": sum(finite) / len(finite)}
+        if moments:
+            # ISO 8601 text orders like the dates it encodes (date-only cells sort before same-day times)
+            stats["dates"] = {"min": min(moments), "max": max(moments)}
+        return stats
+
+    def column_stats(self, index: int) -> dict:
+        """Stats of one column, computed on first request and kept next to its data."""
+        if not 0 <= index < self.n_cols:
+            raise IndexError(index)
+        path = self.directory / STATS_DIRNAME / f"c{index}.json"
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        stats = self._compute_stats(index)
+        path.parent.mkdir(exist_ok=True)
+        _write_json(path, stats)
+        add_usage(path.stat().st_size, self.directory.parent.parent)
+        return stats
+
+    def meta(self) -> dict:
+        return {"sheet": self.name, "sheet_index": self.index, "rows": self.n_rows, "headers": self.headers}
+
+
+# -------------------------------
+# Cache-aware readers
+# -------------------------------
+
+def iter_rows(path, sheet: Sheet = None, root=None) -> Iterator[tuple]:
+    """`workbook_reader.iter_rows`, served from the cache when the workbook was already converted."""
+    cached = cached_sheet(path, sheet, root)
+    if cached is not None:
+        return cached.iter_rows()
+    return workbook_reader.iter_rows(path, sheet)
+
+
+def read_samples(path, sheet: Sheet = None, root=None, **kwargs) -> pd.DataFrame:
+    """`workbook_reader.read_samples`, served from the cache when the workbook was already converted."""
+    cached = cached_sheet(path, sheet, root)
+    if cached is None:
+        return workbook_reader.read_samples(path, sheet, **kwargs)
+    with metrics.stage("classification", "read") as timer:
+        rows = cached.iter_rows()
+        try:
+            headers, samples, timer.items = workbook_reader.sample_rows(rows, **kwargs)
+        finally:
+            rows.close()
+    return workbook_reader.samples_frame(headers, samples)
@@ -0,0 +1,294 @@
+"""
+Sample-only streaming readers for .xlsx / .xls / .csv.
+
+Classification only needs the first few non-null values per column, so instead
+of parsing the whole sheet with `pd.read_excel` we iterate rows and stop as
+soon as every column has `samples_per_col` values.
+
+Columns whose leading rows are sparse (still short of samples after
+`lead_rows` rows) switch to reservoir sampling over a bounded window of
+`window_rows` rows, so one mostly-empty column cannot force a full scan and
+its sample is not just whatever clustered values happened to come first.
+
+All formats share one interface:
+  - iter_rows(path, sheet)  -> header row, then data rows (tuples)
+  - sheet_names(path)
+  - read_samples(path, sheet, samples_per_col, ...) -> small DataFrame that
+    `classify_columns` can consume directly
+
+`workbook_cache` serves the same interface from a converted workbook.
+"""
+
+import codecs
+import csv
+import os
+import random
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from accounting.services import metrics
+
+
+DEFAULT_LEAD_ROWS = 1_000
+DEFAULT_WINDOW_ROWS = 10_000
+
+CSV_ENCODINGS = ("utf-8-sig", "cp1254", "latin-1")  # cp1254: Turkish Windows exports
+# Bytes checked to pick the CSV encoding
+ENCODING_PROBE_BYTES = 1024 * 1024
+
+Sheet = Union[int, str, None]
+
+
+def _file_kind(path: str) -> str:
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext == ".xls":
+        return "xls"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Unsupported workbook type: {ext or path}")
+
+
+def _import_openpyxl():
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Reading .xlsx files requires openpyxl: pip install openpyxl") from e
+    return openpyxl
+
+
+def _import_xlrd():
+    try:
+        import xlrd
+    except ImportError as e:
+        raise ImportError("Reading .xls files requires xlrd: pip install xlrd") from e
+    return xlrd
+
+
+def parse_sheet(sheet: Optional[str]) -> Sheet:
+    """Sheet as given in a request or job: blank for the first, digits for an index, else a name."""
+    if not sheet:
+        return None
+    try:
+        return int(sheet)
+    except ValueError:
+        return sheet
+
+
+def _pick(names: List[str], sheet: Sheet) -> str:
+    if sheet is None:
+        return names[0]
+    if isinstance(sheet, int):
+        return names[sheet]
+    if sheet not in names:
+        raise ValueError(f"Worksheet named '{sheet}' not found")
+    return sheet
+
+
+# -------------------------------
+# Row iteration
+# -------------------------------
+
+def sheet_names(path: str) -> List[str]:
+    kind = _file_kind(path)
+    if kind == "xlsx":
+        wb = _import_openpyxl().load_workbook(path, read_only=True, data_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+    if kind == "xls":
+        book = _import_xlrd().open_workbook(path, on_demand=True)
+        try:
+            return book.sheet_names()
+        finally:
+            book.release_resources()
+    return [os.path.splitext(os.path.basename(str(path)))[0]]
+
+
+def _iter_xlsx(path: str, sheet: Sheet) -> Iterator[tuple]:
+    wb = _import_openpyxl().load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[_pick(wb.sheetnames, sheet)]
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_xls(path: str, sheet: Sheet) -> Iterator[tuple]:
+    xlrd = _import_xlrd()
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        ws = book.sheet_by_name(_pick(book.sheet_names(), sheet))
+        for r in range(ws.nrows):
+            row = []
+            for cell in ws.row(r):
+                if cell.ctype == xlrd.XL_CELL_EMPTY or cell.ctype == xlrd.XL_CELL_BLANK:
+                    row.append(None)
+                elif cell.ctype == xlrd.XL_CELL_DATE:
+                    row.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+                else:
+                    row.append(cell.value)
+            yield tuple(row)
+    finally:
+        book.release_resources()
+
+
+def _csv_encoding(path: str) -> str:
+    """First of CSV_ENCODINGS that decodes the file's first ENCODING_PROBE_BYTES."""
+    with open(path, "rb") as f:
+        head = f.read(ENCODING_PROBE_BYTES)
+    for encoding in CSV_ENCODINGS:
+        try:
+            # incremental, so a multi-byte character cut at the probe boundary is not an error
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Could not decode {path} as any of {CSV_ENCODINGS}")
+
+
+def _iter_csv(path: str) -> Iterator[tuple]:
+    # the encoding is fixed before the first row is yielded: restarting in another
+    # encoding after a late decode error would yield the leading rows twice
+    encoding = _csv_encoding(path)
+    with open(path, newline="", encoding=encoding) as f:
+        try:
+            head = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(head, delimiters=",;\t|")
+            except csv.Error:
+                dialect = csv.excel
+            for row in csv.reader(f, dialect):
+                yield tuple(v if v != "" else None for v in row)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"{path} is not valid {encoding} beyond its first "
+                             f"{ENCODING_PROBE_BYTES // 1024} KiB; re-save it as UTF-8") from e
+
+
+def iter_rows(path: str, sheet: Sheet = None) -> Iterator[tuple]:
+    """Yield the header row followed by data rows, without loading the sheet."""
+    kind = _file_kind(path)
+    if kind == "xlsx":
+        return _iter_xlsx(path, sheet)
+    if kind == "xls":
+        return _iter_xls(path, sheet)
+    return _iter_csv(path)
+
+
+def header_names(raw: Sequence) -> List[str]:
+    """Column names the way pandas derives them (Unnamed: i, deduplicated .1/.2)."""
+    names: List[str] = []
+    seen = {}
+    for i, h in enumerate(raw):
+        name = f"Unnamed: {i}" if h is None or str(h).strip() == "" else str(h)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+# -------------------------------
+# Sampling
+# -------------------------------
+
+def _is_null(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and value.strip() == ""
+
+
+def sample_rows(
+    rows: Iterator[tuple],
+    samples_per_col: int = 10,
+    lead_rows: int = DEFAULT_LEAD_ROWS,
+    window_rows: int = DEFAULT_WINDOW_ROWS,
+    seed: int = 0,
+) -> Tuple[List[str], List[list], int]:
+    """
+    Consume `rows` (header first) until every column has `samples_per_col`
+    non-null values or `window_rows` data rows were read.
+
+    Returns (headers, samples per column, data rows scanned).
+    """
+    try:
+        headers = header_names(next(rows))
+    except StopIteration:
+        return [], [], 0
+
+    n_cols = len(headers)
+    rng = random.Random(seed)
+    heads: List[List[Tuple[int, object]]] = [[] for _ in range(n_cols)]
+    seen = [0] * n_cols          # non-null values seen per column
+    reservoir = [False] * n_cols  # column switched to reservoir sampling
+    incomplete = set(range(n_cols))
+
+    scanned = 0
+    for row in rows:
+        if scanned >= window_rows or not incomplete:
+            break
+        for c in list(incomplete):
+            value = row[c] if c < len(row) else None
+            if _is_null(value):
+                continue
+            seen[c] += 1
+            if len(heads[c]) < samples_per_col:
+                heads[c].append((scanned, value))
+                if not reservoir[c] and len(heads[c]) >= samples_per_col:
+                    incomplete.discard(c)
+            else:
+                # Algorithm R over every non-null value seen in the window
+                j = rng.randrange(seen[c])
+                if j < samples_per_col:
+                    heads[c][j] = (scanned, value)
+        scanned += 1
+
+        if scanned == lead_rows:
+            # still short of samples: sample the rest of the window instead of taking the head
+            for c in incomplete:
+                reservoir[c] = True
+
+    # present samples in row order, like `dropna().head()` would
+    samples = [[v for _, v in sorted(col, key=lambda t: t[0])] for col in heads]
+    return headers, samples, scanned
+
+
+def read_samples(
+    path: str,
+    sheet: Sheet = None,
+    samples_per_col: int = 10,
+    lead_rows: int = DEFAULT_LEAD_ROWS,
+    window_rows: int = DEFAULT_WINDOW_ROWS,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Small DataFrame with up to `samples_per_col` non-null values per column
+    (padded with None), in place of a full `pd.read_excel`.
+    """
+    with metrics.stage("classification", "read") as timer:
+        rows = iter_rows(path, sheet)
+        try:
+            headers, samples, scanned = sample_rows(
+                rows, samples_per_col=samples_per_col,
+                lead_rows=lead_rows, window_rows=window_rows, seed=seed,
+            )
+        finally:
+            # we usually stop early; close the generator so the workbook is released
+            rows.close()
+        timer.items = scanned
+    return samples_frame(headers, samples)
+
+
+def samples_frame(headers: List[str], samples: List[list]) -> pd.DataFrame:
+    """DataFrame of `sample_rows` output, columns padded with None to equal length."""
+    n = max((len(s) for s in samples), default=0)
+    data = {h: s + [None] * (n - len(s)) for h, s in zip(headers, samples)}
+    return pd.DataFrame(data, columns=headers)
@@ -0,0 +1,24 @@
+"""
+Test doubles for the OpenAI surfaces the services call, so tests and
+benchmarks run offline:
+
+  - `FakeEmbeddingsClient` (`.embeddings`): sync `client.embeddings.create` with
+    deterministic vectors and traffic counters
+  - `FakeAsyncEmbeddingsClient` (`.async_embeddings`): async counterpart with
+    injected latency and 429/5xx errors (`FakeAPIError`)
+  - `FakeChatCompletionsServer` (`.chat`): local HTTP server for the
+    chat-completions endpoint, so the real SDK path can be exercised
+
+`uploads.csv_workbook` builds small debtor CSVs for the upload endpoints.
+"""
+
+from accounting.testing.async_embeddings import FakeAPIError, FakeAsyncEmbeddingsClient
+from accounting.testing.chat import FakeChatCompletionsServer
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+__all__ = [
+    "FakeAPIError",
+    "FakeAsyncEmbeddingsClient",
+    "FakeChatCompletionsServer",
+    "FakeEmbeddingsClient",
+]
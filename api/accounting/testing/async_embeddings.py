@@ -0,0 +1,61 @@
+"""
+Offline stand-in for the async OpenAI embeddings surface, with injected
+latency and upstream errors.
+"""
+
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Optional, Sequence
+
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"fake upstream error {status_code}")
+        self.status_code = status_code
+
+
+class FakeAsyncEmbeddingsClient:
+    """
+    Async stand-in for `AsyncOpenAI()` that injects latency and errors.
+
+    Vectors match `FakeEmbeddingsClient` of the same `dim`, so sync and async
+    runs can be compared directly. `error_rate` of calls fail with one of
+    `error_statuses` (429/5xx by default).
+    """
+
+    def __init__(
+        self,
+        dim: int = 64,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500, 503),
+        seed: Optional[int] = None,
+    ):
+        self._sync = FakeEmbeddingsClient(dim=dim)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    async def _create(self, model: str, input):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                raise FakeAPIError(self._rng.choice(self.error_statuses))
+            return self._sync.embeddings.create(model=model, input=input)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,113 @@
+"""
+Local HTTP server speaking the OpenAI chat-completions protocol, so the real
+SDK path can be exercised offline with injected latency and upstream errors.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence, Tuple
+
+from accounting.services.openai_service import DEFAULT_CHAT_MODEL
+
+
+class FakeChatCompletionsServer:
+    """
+    Local HTTP server answering POST /v1/chat/completions in the OpenAI
+    response shape, with injected latency and 429/5xx errors. Point a client
+    at `base_url`:
+
+        with FakeChatCompletionsServer(latency=0.05, error_rate=0.1) as server:
+            client = get_client_manager("fake", server.base_url).async_client()
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500, 503),
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.prompts: List[str] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _respond(self, body: dict) -> Tuple[int, dict]:
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.error_rate
+            status = self._rng.choice(self.error_statuses) if fail else 200
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        if fail:
+            return status, {"error": {"message": f"fake upstream error {status}", "type": "fake", "code": status}}
+
+        prompt = body["messages"][-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+        content = f"[fake] {prompt}"
+        return 200, {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", DEFAULT_CHAT_MODEL),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    def start(self) -> "FakeChatCompletionsServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    status, payload = 404, {"error": {"message": "not found"}}
+                else:
+                    status, payload = fake._respond(body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeChatCompletionsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,42 @@
+"""
+Offline stand-in for the sync OpenAI embeddings surface.
+"""
+
+import hashlib
+from types import SimpleNamespace
+from typing import List
+
+from accounting.services.embedding_batch import estimate_tokens
+
+
+class FakeEmbeddingsClient:
+    """
+    Stand-in for `OpenAI()` exposing `client.embeddings.create`.
+
+    Vectors are derived from a hash of (model, text), so identical inputs always
+    embed identically. `requests`, `inputs` and (estimated) `tokens` count traffic
+    for assertions.
+    """
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.requests = 0
+        self.inputs = 0
+        self.tokens = 0
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def vector(self, text: str, model: str) -> List[float]:
+        digest = hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).digest()
+        raw = (digest * (self.dim // len(digest) + 1))[:self.dim]
+        return [(b - 127.5) / 127.5 for b in raw]
+
+    def _create(self, model: str, input):
+        items = [input] if isinstance(input, str) else list(input)
+        self.requests += 1
+        self.inputs += len(items)
+        self.tokens += sum(estimate_tokens(text) for text in items)
+        data = [
+            SimpleNamespace(index=i, embedding=self.vector(text, model))
+            for i, text in enumerate(items)
+        ]
+        return SimpleNamespace(data=data, model=model)
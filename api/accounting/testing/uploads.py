@@ -0,0 +1,15 @@
+"""
+Small debtor workbooks for upload tests.
+"""
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+DEFAULT_HEADERS = ("Cari Kod", "Ünvan", "Telefon", "Bakiye")
+
+
+def csv_workbook(name: str = "cariler.csv", headers=DEFAULT_HEADERS, rows: int = 20) -> SimpleUploadedFile:
+    """A CSV upload with `rows` debtors under `headers` (code, name, phone, balance columns)."""
+    lines = [",".join(headers)]
+    for i in range(rows):
+        lines.append(f"120.{i:03d},Müşteri {i} Ltd,0532 111 22 {i:02d},{1000 + i}.50")
+    return SimpleUploadedFile(name, "\n".join(lines).encode("utf-8"), content_type="text/csv")
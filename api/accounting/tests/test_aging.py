@@ -0,0 +1,69 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounting.models import AgingSummary, DebtorAccount
+from accounting.services.aging import aging_summary, customer_aging, reconcile
+from accounting.services.ledger_ingest import ingest_rows
+
+
+LEDGER_MAPPINGS = [{"column_index": i, "predicted_category": label, "confidence": 1.0}
+                   for i, label in enumerate(["cari_hesap_kodu", "bakiye", "son_fatura_tarihi"])]
+
+
+class AgingTests(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.days_ago = lambda n: (today - timedelta(days=n)).strftime("%d.%m.%Y")
+        ingest_rows([("120.001", "1.000,00", self.days_ago(5)),
+                     ("120.002", "250,50", self.days_ago(45)),
+                     ("120.003", "4.000,00", self.days_ago(120)),
+                     ("120.004", "75,00", "")], LEDGER_MAPPINGS, source="ocak.xlsx")
+
+    def buckets(self, summary):
+        return {b["bucket"]: (b["account_count"], b["balance"]) for b in summary["buckets"]}
+
+    def test_ingest_maintains_the_summary(self):
+        buckets = self.buckets(aging_summary())
+        self.assertEqual(buckets["0-30"], (1, "1000.00"))
+        self.assertEqual(buckets["31-60"], (1, "250.50"))
+        self.assertEqual(buckets["90+"], (1, "4000.00"))
+        self.assertEqual(buckets["undated"], (1, "75.00"))
+        self.assertEqual(reconcile()["drifted"], 0)
+
+    def test_stale_summary_is_recomputed_without_writing(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        AgingSummary.objects.update(as_of=yesterday)
+        with self.assertNumQueries(3):  # staleness checks and the aggregate; no writes
+            summary = aging_summary()
+        self.assertEqual(summary["as_of"], timezone.localdate().isoformat())
+        self.assertEqual(self.buckets(summary)["90+"], (1, "4000.00"))
+        self.assertFalse(AgingSummary.objects.exclude(as_of=yesterday).exists())
+
+    def test_ingest_rolls_every_source_to_today(self):
+        AgingSummary.objects.update(as_of=timezone.localdate() - timedelta(days=1))
+        ingest_rows([("120.101", "10,00", self.days_ago(1))], LEDGER_MAPPINGS, source="subat.xlsx")
+        self.assertEqual(set(AgingSummary.objects.values_list("as_of", flat=True)), {timezone.localdate()})
+        self.assertEqual(set(AgingSummary.objects.values_list("source", flat=True)), {"ocak.xlsx", "subat.xlsx"})
+
+    def test_customer_aging(self):
+        overdue = customer_aging(bucket="90+")["customers"]
+        self.assertEqual([c["account_code"] for c in overdue], ["120.003"])
+        self.assertEqual((overdue[0]["balance"], overdue[0]["age_days"]), ("4000.00", 120))
+
+        everyone = customer_aging()["customers"]
+        self.assertEqual([c["account_code"] for c in everyone], ["120.003", "120.001", "120.002", "120.004"])
+        self.assertEqual(everyone[-1]["bucket"], "undated")
+        self.assertIsNone(everyone[-1]["reference_date"])
+        self.assertEqual(DebtorAccount.objects.get(account_code="120.002").balance, Decimal("250.50"))
+
+    def test_customer_aging_api(self):
+        client = APIClient()
+        response = client.get("/api/accounting/aging/customers/", {"bucket": "31-60"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["account_code"] for c in response.data["customers"]], ["120.002"])
+        self.assertEqual(client.get("/api/accounting/aging/customers/", {"bucket": "old"}).status_code, 400)
+        self.assertEqual(client.get("/api/accounting/aging/customers/", {"limit": "0"}).status_code, 400)
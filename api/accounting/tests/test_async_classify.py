@@ -0,0 +1,75 @@
+import asyncio
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from accounting.services.async_classify import AsyncEmbedder, RetryPolicy, classify_columns_async, is_retryable
+from accounting.services.classify_columns_with_embeddings import classify_columns
+from accounting.testing.async_embeddings import FakeAPIError, FakeAsyncEmbeddingsClient
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+
+class RetryTests(SimpleTestCase):
+    def test_retryable_statuses(self):
+        for status in (429, 500, 502, 503):
+            self.assertTrue(is_retryable(FakeAPIError(status)), status)
+        for status in (400, 401, 404, 422):
+            self.assertFalse(is_retryable(FakeAPIError(status)), status)
+        self.assertTrue(is_retryable(ConnectionError()))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(max_retries=10, base_delay=0.5, max_delay=4.0)
+        for attempt in range(10):
+            delay = policy.delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4.0, 0.5 * 2 ** attempt))
+
+    def test_transient_errors_are_retried_until_success(self):
+        client = FakeAsyncEmbeddingsClient(dim=8, error_rate=0.5, seed=7)
+        embedder = AsyncEmbedder(client, batch_size=2, requests_per_second=1000,
+                                 retry=RetryPolicy(max_retries=50, base_delay=0))
+        texts = [f"col {i}" for i in range(10)]
+        vectors = asyncio.run(embedder.embed(texts, model="m"))
+        self.assertGreater(client.errors, 0)
+        self.assertEqual(embedder.retries, client.errors)
+        self.assertEqual(vectors, [FakeEmbeddingsClient(dim=8).vector(t, "m") for t in texts])
+
+    def test_gives_up_after_max_retries(self):
+        client = FakeAsyncEmbeddingsClient(dim=8, error_rate=1.0, error_statuses=(503,))
+        embedder = AsyncEmbedder(client, requests_per_second=1000, retry=RetryPolicy(max_retries=2, base_delay=0))
+        with self.assertRaises(FakeAPIError):
+            asyncio.run(embedder.embed(["a"], model="m"))
+        self.assertEqual(client.requests, 3)
+
+    def test_client_errors_are_not_retried(self):
+        client = FakeAsyncEmbeddingsClient(dim=8, error_rate=1.0, error_statuses=(400,))
+        embedder = AsyncEmbedder(client, requests_per_second=1000, retry=RetryPolicy(max_retries=5, base_delay=0))
+        with self.assertRaises(FakeAPIError):
+            asyncio.run(embedder.embed(["a"], model="m"))
+        self.assertEqual(client.requests, 1)
+
+
+class AsyncClassifyTests(SimpleTestCase):
+    df = pd.DataFrame({
+        "Telefon": [f"+90 532 111 22 {i:02d}" for i in range(30)],
+        "Ünvan": [f"Müşteri {i} Ticaret Limited Şirketi" for i in range(30)],
+    })
+    centroids = {label: FakeEmbeddingsClient(dim=8).vector(label, "m") for label in ("telefon_no", "cari_hesap_ismi")}
+
+    def run_async(self, **kwargs):
+        client = FakeAsyncEmbeddingsClient(dim=8)
+        embedder = AsyncEmbedder(client, requests_per_second=1000)
+        result = asyncio.run(classify_columns_async(self.df, self.centroids, embedder, "m", threshold=0, **kwargs))
+        return result, client._sync.tokens
+
+    def test_token_budget_is_passed_through(self):
+        (mappings, _), tokens = self.run_async(token_budget=30)
+        (unbounded, _), all_tokens = self.run_async()
+        self.assertLess(tokens, all_tokens)
+        self.assertLess(len(mappings[1]["sample_preview"]), len(unbounded[1]["sample_preview"]))
+
+        client = FakeEmbeddingsClient(dim=8)
+        expected, _ = classify_columns(self.df, self.centroids, client, "m", threshold=0, token_budget=30)
+        self.assertEqual(mappings, expected)
+        self.assertEqual(tokens, client.tokens)
@@ -0,0 +1,100 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from accounting.services import batch_classify, classify_columns_with_embeddings
+from accounting.services.batch_classify import discover_workbooks, parse_workbook, run_batch
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+LABELS = ("cari_hesap_kodu", "cari_hesap_ismi", "telefon_no", "bakiye")
+
+
+def crashing_parse(path, *args):
+    """parse_workbook whose process dies on workbooks named crash*."""
+    if os.path.basename(path).startswith("crash"):
+        os._exit(1)
+    return parse_workbook(path, *args)
+
+
+class BatchClassifyTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.client = FakeEmbeddingsClient(dim=8)
+        self.centroids = {label: self.client.vector(label, "m") for label in LABELS}
+
+    def write(self, name, rows=5):
+        path = os.path.join(self.tmp, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Cari Kod,Ünvan,Telefon,Bakiye\n")
+            f.writelines(f"120.{i:03d},Müşteri {i},0532 111 22 {i:02d},{i}00\n" for i in range(rows))
+        return path
+
+    def run_batch(self, **kwargs):
+        prefix = os.path.join(self.tmp, "out", "mapping")
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        summary = run_batch(self.tmp, self.centroids, self.client, "m", prefix, workers=2, **kwargs)
+        with open(f"{prefix}.jsonl", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        return summary, {os.path.basename(r["file"]): r for r in records}
+
+    def test_discover_workbooks(self):
+        found = [self.write("a.csv"), self.write("alt/b.CSV")]
+        self.write("notes.txt")
+        self.write("~$a.csv")
+        self.assertEqual(discover_workbooks(self.tmp), sorted(found))
+        self.assertEqual(discover_workbooks(os.path.join(self.tmp, "*.csv")), [found[0]])
+
+    def test_every_workbook_is_classified_and_bad_ones_are_reported(self):
+        self.write("a.csv")
+        self.write("b.csv")
+        with open(os.path.join(self.tmp, "bad.xlsx"), "wb") as f:
+            f.write(b"not a zip")
+        summary, records = self.run_batch()
+        self.assertEqual((summary["files"], summary["sheets"], summary["columns"]), (3, 2, 8))
+        self.assertEqual([os.path.basename(f["file"]) for f in summary["failed_files"]], ["bad.xlsx"])
+        self.assertEqual(records["a.csv"]["status"], "ok")
+        self.assertEqual([m["column_header"] for m in records["a.csv"]["mappings"]],
+                         ["Cari Kod", "Ünvan", "Telefon", "Bakiye"])
+        self.assertEqual(records["bad.xlsx"]["status"], "error")
+        with open(summary["outputs"][1], encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 1 + 8 + 1)  # header, one row per column, one error row
+
+    def test_dead_parser_fails_only_its_own_workbook(self):
+        for name in ("a.csv", "b.csv", "crash.csv", "d.csv"):
+            self.write(name)
+        with mock.patch.object(batch_classify, "parse_workbook", crashing_parse), \
+                self.assertLogs("accounting.services.batch_classify", "WARNING"):
+            summary, records = self.run_batch()
+        self.assertEqual(summary["failed_files"], [{"file": os.path.join(self.tmp, "crash.csv"),
+                                                    "error": "BrokenProcessPool: the parser process died"}])
+        self.assertEqual(summary["sheets"], 3)
+        self.assertEqual({name: r["status"] for name, r in records.items()},
+                         {"a.csv": "ok", "b.csv": "ok", "crash.csv": "error", "d.csv": "ok"})
+
+
+class ClassifierCommandLineTests(SimpleTestCase):
+    def main(self, *argv):
+        stderr = io.StringIO()
+        with mock.patch.object(sys, "argv", ["classify", *argv]), contextlib.redirect_stderr(stderr), \
+                self.assertRaises(SystemExit) as exit:
+            classify_columns_with_embeddings.main()
+        self.assertEqual(exit.exception.code, 2)
+        return stderr.getvalue()
+
+    def test_concurrency_needs_the_openai_embedder(self):
+        error = self.main("--excel", "x.csv", "--embedder", "local", "--concurrency", "4")
+        self.assertIn("--concurrency needs the openai embedder", error)
+
+    def test_options_that_would_be_ignored_are_rejected(self):
+        self.assertIn("apply to --excel only", self.main("--batch", "exports/", "--cascade"))
+        self.assertIn("--workers applies to --batch only", self.main("--excel", "x.csv", "--workers", "2"))
+        self.assertIn("drop --concurrency", self.main("--excel", "x.csv", "--cascade", "--concurrency", "2"))
@@ -0,0 +1,106 @@
+import csv
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from accounting.services import synthetic_workbook
+from accounting.services.benchmark import SimulatedEmbeddingsClient, compare, run_size
+from accounting.services.synthetic_workbook import HEADERS, generate, write_workbook
+
+
+class SyntheticWorkbookTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_same_seed_same_workbook(self):
+        first = generate(50, columns=9, noise=0.3, seed=4)
+        second = generate(50, columns=9, noise=0.3, seed=4)
+        self.assertEqual((first[0], list(first[1]), first[2]), (second[0], list(second[1]), second[2]))
+        self.assertNotEqual(first[0], generate(50, columns=9, noise=0.3, seed=5)[0])
+
+    def test_every_label_appears_once_plus_distractors(self):
+        headers, rows, truth = generate(10, columns=len(HEADERS) + 3, noise=0)
+        self.assertEqual(len(headers), len(HEADERS) + 3)
+        self.assertEqual(sorted(label for label in truth.values() if label), sorted(HEADERS))
+        self.assertEqual(list(truth.values()).count(None), 3)
+        for index, label in truth.items():
+            if label:
+                self.assertEqual(headers[index], HEADERS[label][0])  # no noise: clean headers
+        self.assertEqual(len(list(rows)), 10)
+
+    def test_fewer_columns_keep_a_subset_of_labels(self):
+        _, _, truth = generate(5, columns=3)
+        self.assertEqual(len(truth), 3)
+        self.assertTrue(all(label in HEADERS for label in truth.values()))
+
+    def test_noise_blanks_some_cells(self):
+        _, rows, _ = generate(200, noise=1.0, seed=2)
+        self.assertTrue(any(value is None for row in rows for value in row))
+        _, rows, _ = generate(200, noise=0.0, seed=2)
+        self.assertFalse(any(value is None for row in rows for value in row))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            generate(10, noise=1.5)
+        with self.assertRaises(ValueError):
+            generate(10, columns=0)
+        with self.assertRaises(ValueError):
+            write_workbook(os.path.join(self.tmp, "x.ods"), 10)
+
+    def test_csv_round_trip(self):
+        path = os.path.join(self.tmp, "cariler.csv")
+        truth = write_workbook(path, 25, noise=0.2, seed=1)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f, delimiter=";"))
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(len(rows[0]), len(truth))
+        self.assertTrue(all(isinstance(value, str) for row in rows for value in row))
+
+    def test_tr_amount_format(self):
+        self.assertEqual(synthetic_workbook._tr_amount(1234567.5), "1.234.567,50")
+        self.assertEqual(synthetic_workbook._tr_amount(-12.345), "-12,35")
+
+
+class BenchmarkTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.workdir = Path(tmp)
+
+    def test_simulated_client_sleeps_and_counts(self):
+        client = SimulatedEmbeddingsClient(latency=0.01, per_input=0.001, vectors="hash")
+        client.embeddings.create(model="m", input=["a", "b"])
+        self.assertEqual((client.requests, client.inputs), (1, 2))
+        self.assertAlmostEqual(client.sleep_seconds, 0.012, places=6)
+        with self.assertRaises(ValueError):
+            SimulatedEmbeddingsClient(vectors="random")
+
+    def test_run_size_reports_every_stage(self):
+        run = run_size(self.workdir, 40, fmt="csv", repeat=1, client_options={"latency": 0}, memory=False)
+        self.assertEqual((run["rows"], run["columns"]), (40, len(HEADERS) + 2))
+        self.assertEqual(set(run["stages"]), {"generate_workbook", "load_samples", "load_full", "likely_heuristics",
+                                              "profile_columns", "build_centroids", "classify_columns"})
+        self.assertGreater(run["stages"]["classify_columns"]["requests"], 0)
+        self.assertEqual(run["accuracy"]["labelled_columns"], len(HEADERS))
+
+    def test_compare_flags_slower_stages_and_extra_requests(self):
+        def report(seconds, requests):
+            return {"commit": "abc", "options": {}, "runs": [{"rows": 100, "stages": {
+                "classify_columns": {"seconds_median": seconds, "requests": requests},
+                "load_full": {"seconds_median": 1.0},
+            }}]}
+
+        result = compare(report(1.0, 3), report(1.1, 3))
+        self.assertEqual(result["regressions"], [])
+        self.assertTrue(result["options_match"])
+
+        result = compare(report(1.0, 3), report(1.5, 3))
+        self.assertEqual([c["stage"] for c in result["regressions"]], ["classify_columns"])
+        self.assertEqual(result["regressions"][0]["change"], 0.5)
+
+        result = compare(report(1.0, 3), report(1.0, 4))
+        self.assertEqual([c["current_requests"] for c in result["regressions"]], [4])
@@ -0,0 +1,67 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from accounting.services.cascade import (
+    EXACT_HEADER_EVIDENCE,
+    PARTIAL_HEADER_EVIDENCE,
+    cheap_decision,
+    classify_columns_cascade,
+    header_evidence,
+)
+from accounting.services.column_profile import profile_values
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+ROWS = 12
+PHONES = [f"0532 111 22 {i:02d}" for i in range(ROWS)]
+AMOUNTS = [f"{i}.250,00 TL" for i in range(1, ROWS + 1)]
+DATES = [f"{i:02d}.07.2025" for i in range(1, ROWS + 1)]
+NOTES = ["Ödeme sözü verdi", "Ulaşılamadı", "Yasal takipte", "Mutabık"] * 3
+LABELS = ("cari_hesap_kodu", "cari_hesap_ismi", "telefon_no", "bakiye", "son_fatura_tarihi", "son_tahsilat_tarihi")
+
+
+class CheapStageTests(SimpleTestCase):
+    def test_header_evidence(self):
+        self.assertEqual(header_evidence("TELEFON"), {"telefon_no": EXACT_HEADER_EVIDENCE})
+        self.assertEqual(header_evidence("Müşteri Telefon Bilgisi"), {"telefon_no": PARTIAL_HEADER_EVIDENCE})
+        self.assertEqual(header_evidence("Telefonculuk"), {})  # whole words only
+        self.assertEqual(header_evidence("Açıklama"), {})
+
+    def test_clean_phone_column_is_decided_by_pattern(self):
+        stage, label, confidence, _ = cheap_decision("Kolon 3", profile_values(PHONES))
+        self.assertEqual((stage, label), ("pattern", "telefon_no"))
+        self.assertGreaterEqual(confidence, 0.85)
+
+    def test_header_naming_another_label_vetoes_the_pattern(self):
+        self.assertIsNone(cheap_decision("Cari Kod", profile_values(PHONES)))
+
+    def test_header_and_date_shape_combine(self):
+        stage, label, confidence, _ = cheap_decision("Son Tahsilat Tarihi", profile_values(DATES))
+        self.assertEqual((stage, label), ("header", "son_tahsilat_tarihi"))
+        self.assertGreater(confidence, EXACT_HEADER_EVIDENCE)  # noisy-OR of header and pattern
+
+    def test_date_shape_alone_is_ambiguous(self):
+        self.assertIsNone(cheap_decision("Tarih", profile_values(DATES)))
+
+
+class CascadeTests(SimpleTestCase):
+    def test_only_ambiguous_columns_are_embedded(self):
+        df = pd.DataFrame({"Telefon": PHONES, "Bakiye": AMOUNTS, "Son Fatura Tarihi": DATES, "Not": NOTES})
+        client = FakeEmbeddingsClient(dim=8)
+        centroids = {label: client.vector(label, "m") for label in LABELS}
+        client.inputs = 0
+
+        mappings, by_label, stats = classify_columns_cascade(df, centroids, client, "m", threshold=0)
+        self.assertEqual(client.inputs, 1)
+        self.assertEqual((stats["pattern"] + stats["header"], stats["embedding"], stats["columns"]), (3, 1, 4))
+        self.assertEqual(stats["embedding_skipped_ratio"], 0.75)
+        self.assertEqual([m["predicted_category"] for m in mappings[:3]],
+                         ["telefon_no", "bakiye", "son_fatura_tarihi"])
+        self.assertEqual([m["decided_by"] for m in mappings][3], "embedding")
+        self.assertEqual(mappings[3]["column_index"], 3)
+        self.assertEqual(by_label["telefon_no"], [0])
+
+    def test_nothing_is_embedded_when_every_column_is_decided(self):
+        df = pd.DataFrame({"Telefon": PHONES, "Bakiye": AMOUNTS})
+        client = FakeEmbeddingsClient(dim=8)
+        _, _, stats = classify_columns_cascade(df, {label: [1.0] * 8 for label in LABELS}, client, "m")
+        self.assertEqual((client.requests, stats["embedding_skipped_ratio"]), (0, 1.0))
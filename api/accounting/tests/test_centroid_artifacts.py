@@ -0,0 +1,80 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from accounting.services import centroid_artifacts
+from accounting.services.centroid_artifacts import (
+    MANIFEST_FILENAME,
+    MATRIX_FILENAME,
+    get_loaded,
+    get_or_build_centroids,
+    load_centroid_artifact,
+    preload,
+    write_centroid_artifact,
+)
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+EXEMPLARS = {"telefon_no": ["Telefon", "0532 111 22 33"], "bakiye": ["Bakiye", "1.250,00 TL"]}
+
+
+class CentroidArtifactTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.directory = Path(tmp) / "centroids"
+        self.addCleanup(centroid_artifacts._loaded.clear)
+
+    def test_build_writes_matrix_and_manifest(self):
+        client = FakeEmbeddingsClient(dim=8)
+        artifact = get_or_build_centroids(client, EXEMPLARS, "m", self.directory)
+        self.assertEqual(artifact.labels, ["telefon_no", "bakiye"])
+        self.assertEqual(artifact.matrix.shape, (2, 8))
+        self.assertEqual(artifact.matrix.dtype, np.float32)
+        manifest = json.loads((self.directory / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+        self.assertEqual((manifest["embed_model"], manifest["dim"]), ("m", 8))
+        self.assertEqual(sorted(p.name for p in self.directory.iterdir()), [MANIFEST_FILENAME, MATRIX_FILENAME])
+        self.assertIs(get_loaded(self.directory, "m"), artifact)
+
+    def test_fresh_artifact_is_memory_mapped_without_api_calls(self):
+        get_or_build_centroids(FakeEmbeddingsClient(dim=8), EXEMPLARS, "m", self.directory)
+        client = FakeEmbeddingsClient(dim=8)
+        artifact = get_or_build_centroids(client, EXEMPLARS, "m", self.directory)
+        self.assertEqual(client.requests, 0)
+        self.assertIsInstance(artifact.matrix, np.memmap)
+        self.assertFalse(artifact.matrix.flags.writeable)
+        row = artifact.as_dict()["bakiye"]
+        self.assertTrue(np.shares_memory(row, artifact.matrix))
+
+    def test_stale_artifacts_are_rejected(self):
+        write_centroid_artifact(self.directory, {"telefon_no": [1.0, 0.0]}, "m", EXEMPLARS)
+        self.assertIsNotNone(load_centroid_artifact(self.directory, "m", EXEMPLARS))
+        self.assertIsNone(load_centroid_artifact(self.directory, "other-model", EXEMPLARS))
+        self.assertIsNone(load_centroid_artifact(self.directory, "m", {**EXEMPLARS, "bakiye": ["Borç"]}))
+
+        manifest_path = self.directory / MANIFEST_FILENAME
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        manifest_path.write_text(json.dumps({**manifest, "version": 0}), encoding="utf-8")
+        self.assertIsNone(load_centroid_artifact(self.directory, "m", EXEMPLARS))
+        manifest_path.write_text(json.dumps({**manifest, "labels": ["telefon_no", "bakiye"]}), encoding="utf-8")
+        self.assertIsNone(load_centroid_artifact(self.directory, "m", EXEMPLARS))  # row count mismatch
+        manifest_path.write_text("{", encoding="utf-8")
+        self.assertIsNone(load_centroid_artifact(self.directory, "m", EXEMPLARS))
+
+    def test_changed_exemplars_trigger_a_rebuild(self):
+        get_or_build_centroids(FakeEmbeddingsClient(dim=8), EXEMPLARS, "m", self.directory)
+        changed = {**EXEMPLARS, "bakiye": ["Borç Tutarı"]}
+        client = FakeEmbeddingsClient(dim=8)
+        artifact = get_or_build_centroids(client, changed, "m", self.directory)
+        self.assertGreater(client.requests, 0)
+        self.assertEqual(artifact.manifest["exemplar_hash"], centroid_artifacts.exemplar_hash(changed))
+
+    def test_preload_never_builds(self):
+        self.assertIsNone(preload(self.directory, "m", EXEMPLARS))
+        self.assertIsNone(get_loaded(self.directory, "m"))
+        write_centroid_artifact(self.directory, {"telefon_no": [1.0, 0.0]}, "m", EXEMPLARS)
+        self.assertEqual(preload(self.directory, "m", EXEMPLARS).labels, ["telefon_no"])
+        self.assertIsNotNone(get_loaded(self.directory, "m"))
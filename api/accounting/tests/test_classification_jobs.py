@@ -0,0 +1,221 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounting.models import ClassificationJob, HeaderMapping
+from accounting.services import classification_jobs
+from accounting.testing.uploads import csv_workbook
+
+
+class ClassificationJobAPITests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=f"{tmp}/media",
+            WORKBOOK_CACHE_DIR=f"{tmp}/workbooks",
+            CENTROID_ARTIFACT_DIR=f"{tmp}/centroids",
+            EMBEDDING_CACHE_PATH="",
+            EMBEDDING_BACKENDS="local",
+            CLASSIFICATION_JOB_RUNNER="db",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        classification_jobs._classifier = None
+        self.addCleanup(setattr, classification_jobs, "_classifier", None)
+        self.client = APIClient()
+
+    def upload(self, file=None, **data):
+        response = self.client.post("/api/accounting/classification-jobs/", {"file": file or csv_workbook(), **data},
+                                    format="multipart")
+        self.assertEqual(response.status_code, 202, response.data)
+        return response.data
+
+    def run_queued(self):
+        job = classification_jobs.claim_next_job()
+        classification_jobs.run_job(job.pk)
+        return self.client.get(f"/api/accounting/classification-jobs/{job.pk}/").data
+
+    def test_upload_only_queues_the_job(self):
+        job = self.upload()
+        self.assertEqual(job["status"], ClassificationJob.QUEUED)
+        self.assertEqual(job["columns"], [])
+
+    def test_job_round_trip(self):
+        self.upload()
+        job = self.run_queued()
+        self.assertEqual(job["status"], ClassificationJob.DONE, job["error"])
+        self.assertEqual(job["columns_total"], 4)
+        self.assertEqual(job["progress"], 1.0)
+        self.assertEqual([c["column_header"] for c in job["columns"]], ["Cari Kod", "Ünvan", "Telefon", "Bakiye"])
+        self.assertEqual(job["columns"][2]["predicted_category"], "telefon_no")
+        self.assertEqual({c["status"] for c in job["columns"]}, {"done"})
+
+    def test_failed_job_reports_the_error(self):
+        self.upload(file=SimpleUploadedFile("cariler.xlsx", b"not a zip"))
+        job = self.run_queued()
+        self.assertEqual(job["status"], ClassificationJob.FAILED)
+        self.assertTrue(job["error"])
+
+    def test_unknown_job_is_404(self):
+        response = self.client.get("/api/accounting/classification-jobs/00000000-0000-0000-0000-000000000000/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsupported_file_type_is_rejected(self):
+        response = self.client.post("/api/accounting/classification-jobs/",
+                                    {"file": SimpleUploadedFile("notes.txt", b"x")}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rerun_against_previous_job_reports_a_diff(self):
+        self.upload()
+        first = self.run_queued()
+        self.upload(file=csv_workbook(rows=30), previous=first["id"])
+        second = self.run_queued()
+        self.assertEqual(second["status"], ClassificationJob.DONE, second["error"])
+        self.assertEqual(str(second["previous"]), first["id"])
+        self.assertEqual(second["diff"]["columns"], 4)
+        self.assertEqual(second["diff"]["changes"], [])
+        self.assertEqual([c["predicted_category"] for c in second["columns"]],
+                         [c["predicted_category"] for c in first["columns"]])
+
+    def test_changed_column_is_classified_again_despite_a_confirmed_header(self):
+        self.upload()
+        first = self.run_queued()
+        self.client.patch(f"/api/accounting/classification-jobs/{first['id']}/", {"confirm": True}, format="json")
+        lines = ["Cari Kod,Ünvan,Telefon,Bakiye"]
+        lines += [f"120.{i:03d},{city} Gıda {i} AŞ,0532 111 22 {i:02d},{1000 + i}.50"
+                  for i, city in enumerate(["Ankara", "İzmir", "Bursa", "Konya"] * 5)]
+        self.upload(file=SimpleUploadedFile("cariler.csv", "\n".join(lines).encode("utf-8"), content_type="text/csv"),
+                    previous=first["id"])
+        second = self.run_queued()
+        self.assertEqual(second["status"], ClassificationJob.DONE, second["error"])
+        self.assertEqual([c.get("decided_by") for c in second["columns"]], ["memory", None, "memory", "memory"])
+        self.assertEqual(second["columns_reused"], 0)
+
+    def test_previous_must_be_finished(self):
+        queued = self.upload()
+        response = self.client.post("/api/accounting/classification-jobs/",
+                                    {"file": csv_workbook(), "previous": queued["id"]}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("previous", response.data)
+
+    def test_corrections_are_saved_and_learned(self):
+        self.upload()
+        job = self.run_queued()
+        url = f"/api/accounting/classification-jobs/{job['id']}/"
+        response = self.client.patch(url, {"corrections": [{"column_index": 3, "label": "unknown"}]}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["columns"][3]["predicted_category"], "unknown")
+        self.assertEqual(response.data["columns"][3]["decided_by"], "correction")
+
+        self.upload()
+        again = self.run_queued()
+        self.assertEqual(again["columns"][3]["predicted_category"], "unknown")
+        self.assertEqual([c.get("decided_by") for c in again["columns"]], [None, None, None, "memory"])
+
+    def test_unconfirmed_results_are_not_remembered(self):
+        self.upload()
+        self.run_queued()
+        self.assertFalse(HeaderMapping.objects.exists())
+
+    def test_confirmed_result_is_replayed(self):
+        self.upload()
+        job = self.run_queued()
+        response = self.client.patch(f"/api/accounting/classification-jobs/{job['id']}/", {"confirm": True},
+                                     format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+
+        self.upload()
+        again = self.run_queued()
+        self.assertEqual({c["decided_by"] for c in again["columns"]}, {"memory"})
+        self.assertEqual([(c["predicted_category"], c["confidence"]) for c in again["columns"]],
+                         [(c["predicted_category"], c["confidence"]) for c in job["columns"]])
+
+    def test_invalid_corrections_are_rejected(self):
+        self.upload()
+        job = self.run_queued()
+        url = f"/api/accounting/classification-jobs/{job['id']}/"
+        for data in ({"corrections": [{"column_index": 0, "label": "nope"}]},
+                     {"corrections": [{"column_index": 9, "label": "unknown"}]}, {"corrections": []}, {}):
+            response = self.client.patch(url, data, format="json")
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_unfinished_job_cannot_be_corrected(self):
+        job = self.upload()
+        response = self.client.patch(f"/api/accounting/classification-jobs/{job['id']}/",
+                                     {"corrections": [{"column_index": 0, "label": "unknown"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class ClassificationJobLeaseTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=tmp)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.job = ClassificationJob.objects.create(file=csv_workbook(), original_name="cariler.csv")
+
+    def expire(self):
+        ClassificationJob.objects.filter(pk=self.job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    def refresh(self):
+        self.job.refresh_from_db()
+        return self.job
+
+    @override_settings(CLASSIFICATION_JOB_RUNNER="db")
+    def test_claim_takes_a_lease(self):
+        claimed = classification_jobs.claim_next_job()
+        self.assertEqual(claimed.pk, self.job.pk)
+        self.assertEqual(claimed.status, ClassificationJob.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertGreater(claimed.locked_until, timezone.now())
+        self.assertIsNone(classification_jobs.claim_next_job())
+
+    @override_settings(CLASSIFICATION_JOB_RUNNER="db")
+    def test_live_lease_is_not_reclaimed(self):
+        classification_jobs.claim_next_job()
+        self.assertEqual(classification_jobs.reclaim_jobs(), {"requeued": 0, "failed": 0, "resubmitted": 0})
+        self.assertEqual(self.refresh().status, ClassificationJob.RUNNING)
+
+    @override_settings(CLASSIFICATION_JOB_RUNNER="db")
+    def test_expired_lease_is_requeued(self):
+        classification_jobs.claim_next_job()
+        self.expire()
+        with self.assertLogs("accounting.services.classification_jobs", "WARNING"):
+            self.assertEqual(classification_jobs.reclaim_jobs()["requeued"], 1)
+        self.assertEqual(self.refresh().status, ClassificationJob.QUEUED)
+        self.assertEqual(classification_jobs.claim_next_job().attempts, 2)
+
+    @override_settings(CLASSIFICATION_JOB_RUNNER="db", CLASSIFICATION_JOB_MAX_ATTEMPTS=2)
+    def test_job_fails_after_max_attempts(self):
+        for _ in range(2):
+            classification_jobs.claim_next_job()
+            self.expire()
+            with self.assertLogs("accounting.services.classification_jobs", "WARNING"):
+                classification_jobs.reclaim_jobs()
+        self.assertEqual(self.refresh().status, ClassificationJob.FAILED)
+        self.assertIn("stopped responding", self.job.error)
+
+    @override_settings(CLASSIFICATION_JOB_RUNNER="local")
+    def test_local_runner_resubmits_queued_jobs_no_pool_picked_up(self):
+        pool = mock.Mock()
+        with mock.patch.object(classification_jobs, "_get_pool", return_value=pool), \
+                self.assertLogs("accounting.services.classification_jobs", "WARNING"):
+            self.assertEqual(classification_jobs.reclaim_jobs()["resubmitted"], 1)
+            pool.submit.assert_called_once_with(classification_jobs.run_queued_job, self.job.pk)
+            self.assertIsNotNone(self.refresh().locked_until)
+            # handed to a pool under a live lease: not resubmitted again
+            self.assertEqual(classification_jobs.reclaim_jobs()["resubmitted"], 0)
+
+    def test_queued_job_runs_once(self):
+        with mock.patch.object(classification_jobs, "run_job") as run_job:
+            classification_jobs.run_queued_job(self.job.pk)
+            classification_jobs.run_queued_job(self.job.pk)
+        run_job.assert_called_once_with(self.job.pk)
@@ -0,0 +1,51 @@
+import math
+
+from django.test import SimpleTestCase
+
+from accounting.services.classify_columns_with_embeddings import score_columns
+
+PHONES = ["0532 111 22 33", "+90 533 444 55 66", "(212) 555 10 20", "0542 123 45 67"]
+AMOUNTS = ["1.250,00 TL", "₺320,50", "15.000", "-75,25"]
+DATES = ["01.08.2025", "15.07.2025", "2025-06-30", "03/05/2025"]
+NAMES = ["Ali Yılmaz", "Ayşe Kaya", "Demir Ltd. Şti.", "Zeynep Çelik"]
+
+
+def unit(degrees):
+    return [math.cos(math.radians(degrees)), math.sin(math.radians(degrees))]
+
+
+class NudgeTests(SimpleTestCase):
+    # a column vector at 0° scores 1.0 against the name centroid and cos(10°) ≈ 0.985 against the others
+    centroids = {"cari_hesap_ismi": unit(0), "telefon_no": unit(10), "bakiye": unit(-10)}
+
+    def predict(self, samples, header="Kolon"):
+        mappings, by_label = score_columns([header], [samples], [unit(0)], self.centroids, threshold=0.6)
+        return mappings[0], by_label
+
+    def test_phone_pattern_moves_a_close_call_to_telefon_no(self):
+        prediction, by_label = self.predict(PHONES)
+        self.assertEqual(prediction["predicted_category"], "telefon_no")
+        self.assertEqual(by_label["telefon_no"], [0])
+        self.assertEqual(self.predict(NAMES)[0]["predicted_category"], "cari_hesap_ismi")
+
+    def test_amount_pattern_moves_a_close_call_to_bakiye(self):
+        self.assertEqual(self.predict(AMOUNTS)[0]["predicted_category"], "bakiye")
+
+    def test_clear_winner_is_not_nudged(self):
+        self.centroids = {"cari_hesap_ismi": unit(0), "telefon_no": unit(40)}
+        self.assertEqual(self.predict(PHONES)[0]["predicted_category"], "cari_hesap_ismi")
+
+
+class DateDisambiguationTests(SimpleTestCase):
+    centroids = {"son_fatura_tarihi": unit(0), "son_tahsilat_tarihi": unit(5)}
+
+    def test_header_keywords_pick_the_date_label(self):
+        headers = ["Son Tahsilat Tarihi", "Fatura Tarihi", "Tarih"]
+        mappings, by_label = score_columns(headers, [DATES] * 3, [unit(0)] * 3, self.centroids)
+        self.assertEqual([m["predicted_category"] for m in mappings],
+                         ["son_tahsilat_tarihi", "son_fatura_tarihi", "son_fatura_tarihi"])
+        self.assertEqual(by_label, {"son_fatura_tarihi": [1, 2], "son_tahsilat_tarihi": [0]})
+
+    def test_non_dates_are_left_alone(self):
+        mappings, _ = score_columns(["Tahsilat Notu"], [NAMES], [unit(0)], self.centroids)
+        self.assertEqual(mappings[0]["predicted_category"], "son_fatura_tarihi")
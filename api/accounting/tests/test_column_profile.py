@@ -0,0 +1,51 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from accounting.services.classify_columns_with_embeddings import amount_hit_rate, date_hit_rate, phone_hit_rate
+from accounting.services.column_profile import profile_columns, profile_series, profile_values
+
+MIXED = ["0532 111 22 33", "+90 (212) 555 10 20", "1.250,00 TL", "₺75", "01.08.2025", "2025-07-15 10:30",
+         "Ayşe Yılmaz", "", "  ", "-", "12345", "0532 111 22 33", "1.250,00 TL", "15/07/25"]
+
+
+class ColumnProfileTests(SimpleTestCase):
+    def test_pattern_rates_match_the_per_value_helpers(self):
+        for values in (MIXED, MIXED[:4], MIXED[4:9], ["x"] * 5):
+            profile = profile_values(values)
+            self.assertAlmostEqual(profile.phone_rate, phone_hit_rate(values), msg=values)
+            self.assertAlmostEqual(profile.amount_rate, amount_hit_rate(values), msg=values)
+            self.assertAlmostEqual(profile.date_rate, date_hit_rate(values), msg=values)
+
+    def test_ratios_and_lengths(self):
+        profile = profile_series(pd.Series(["ab", "ab", "abcd", None, "123"], dtype=object))
+        self.assertEqual((profile.rows, profile.non_null), (5, 4))
+        self.assertAlmostEqual(profile.null_ratio, 0.2)
+        self.assertAlmostEqual(profile.distinct_ratio, 0.75)
+        self.assertAlmostEqual(profile.numeric_rate, 0.25)
+        self.assertEqual((profile.len_min, profile.len_max), (2, 4))
+        self.assertAlmostEqual(profile.len_mean, 2.75)
+
+    def test_tr_formatted_numbers_are_numeric(self):
+        self.assertEqual(profile_values(["1.234,50", "-12", "3.5", "abc"]).numeric_rate, 0.75)
+
+    def test_likely_flags(self):
+        profile = profile_values(["0532 111 22 33"] * 3 + ["yok"] * 2)
+        self.assertTrue(profile.likely_phone)
+        self.assertFalse(profile.likely_amount or profile.likely_date)
+
+    def test_empty_column(self):
+        profile = profile_series(pd.Series([None, None], dtype=object))
+        self.assertEqual((profile.rows, profile.null_ratio, profile.phone_rate), (2, 1.0, 0.0))
+
+    def test_long_columns_are_sampled_evenly(self):
+        series = pd.Series(["1.250,00 TL", "Ali", "Veli"] * 33_333, dtype=object)
+        profile = profile_series(series, max_rows=1_000)  # every 100th row
+        self.assertEqual((profile.rows, profile.non_null), (99_999, 99_999))
+        self.assertAlmostEqual(profile.amount_rate, 1 / 3, places=2)
+        self.assertAlmostEqual(profile_series(series, max_rows=None).amount_rate, 1 / 3)
+
+    def test_profile_columns_keeps_column_order(self):
+        df = pd.DataFrame({"Telefon": ["0532 111 22 33"] * 4, "Bakiye": ["1.250,00 TL"] * 4})
+        self.assertEqual([(p.likely_phone, p.likely_amount) for p in profile_columns(df)],
+                         [(True, False), (False, True)])
+        self.assertEqual(profile_columns(df)[0].as_dict()["phone_rate"], 1.0)
@@ -0,0 +1,84 @@
+import os
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from accounting.services.embedders import (
+    Embedder,
+    LocalNgramEmbedder,
+    OpenAIEmbedder,
+    normalize_header,
+    normalize_tr,
+    resolve_embedder,
+)
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+class NormalizationTests(SimpleTestCase):
+    def test_turkish_casefold(self):
+        self.assertEqual(normalize_tr("İSTANBUL IĞDIR"), "istanbul igdir")
+        self.assertEqual(normalize_tr("Çağrı Öztürk Şişli"), "cagri ozturk sisli")
+
+    def test_digits_fold_to_format(self):
+        self.assertEqual(normalize_tr("0532 111 22 33"), "0000 000 00 00")
+        self.assertEqual(normalize_tr("0532", fold_digits=False), "0532")
+
+    def test_payload_markers_and_punctuation(self):
+        self.assertEqual(normalize_tr("HEADER: Telefon SAMPLES: x"), "telefon x")
+        self.assertEqual(normalize_header(" Son Tahs. Tar.: "), "son tahs tar")
+
+
+class LocalNgramEmbedderTests(SimpleTestCase):
+    def setUp(self):
+        self.embedder = LocalNgramEmbedder(dim=256)
+
+    def test_vectors_are_deterministic_and_unit_length(self):
+        first, second = self.embedder.embed(["Telefon Numarası", "Telefon Numarası"])
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 256)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=5)
+        self.assertEqual(self.embedder.model, "local-char-ngram-v1-d256")
+
+    def test_similar_texts_are_closer(self):
+        phone, phone_variant, amount = self.embedder.embed(["Telefon No", "TELEFON NUMARASI", "Borç Tutarı"])
+        self.assertGreater(cosine(phone, phone_variant), cosine(phone, amount))
+
+    def test_phone_formats_share_features(self):
+        a, b, name = self.embedder.embed(["0532 111 22 33", "0542 987 65 43", "Ayşe Yılmaz"])
+        self.assertAlmostEqual(cosine(a, b), 1.0, places=5)  # digits fold, so only the format remains
+        self.assertLess(cosine(a, name), 0.5)
+
+    def test_empty_text_is_a_zero_vector(self):
+        self.assertEqual(self.embedder.embed([""])[0], [0.0] * 256)
+
+
+class ResolveEmbedderTests(SimpleTestCase):
+    def test_first_available_backend_wins(self):
+        self.assertEqual(resolve_embedder("openai,local", api_key=None).name, "local")
+        embedder = resolve_embedder("openai,local", api_key="sk-test", model="m")
+        self.assertEqual((embedder.name, embedder.model), ("openai", "m"))
+        self.assertIsInstance(embedder, Embedder)
+
+    def test_chain_defaults_to_the_environment(self):
+        with mock.patch.dict(os.environ, {"EMBEDDING_BACKENDS": "local"}):
+            self.assertEqual(resolve_embedder(api_key="sk-test").name, "local")
+
+    def test_unknown_or_unavailable_backends(self):
+        with self.assertRaises(ValueError):
+            resolve_embedder("bert")
+        with self.assertRaisesMessage(RuntimeError, "tried: openai"):
+            resolve_embedder("openai", api_key=None)
+        with self.assertRaisesMessage(RuntimeError, "tried: none"):
+            resolve_embedder(" , ")
+
+    def test_openai_embedder_uses_the_given_client(self):
+        client = FakeEmbeddingsClient(dim=8)
+        embedder = OpenAIEmbedder(model="m", client=client)
+        self.assertTrue(embedder.available())
+        self.assertEqual(embedder.embed(["a", "b"]), [client.vector("a", "m"), client.vector("b", "m")])
+        self.assertEqual(client.requests, 1)
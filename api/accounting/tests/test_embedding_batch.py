@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from accounting.services.embedding_batch import embed_texts, estimate_tokens, iter_batches
+from accounting.testing.embeddings import FakeEmbeddingsClient
+
+
+class ReversedEmbeddingsClient(FakeEmbeddingsClient):
+    """Returns each batch's items in reverse, relying on `index` like the API allows."""
+
+    def _create(self, model, input):
+        response = super()._create(model, input)
+        response.data.reverse()
+        return response
+
+
+class EmbeddingBatchTests(SimpleTestCase):
+    def test_batches_respect_input_limit_and_keep_order(self):
+        texts = [f"text {i}" for i in range(10)]
+        batches = list(iter_batches(texts, max_inputs=4))
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+    def test_batches_respect_token_limit(self):
+        texts = ["x" * 20] * 5  # 10 estimated tokens each
+        batches = list(iter_batches(texts, max_tokens=25))
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+        for batch in batches:
+            self.assertLessEqual(sum(estimate_tokens(texts[i]) for i in batch), 25)
+
+    def test_oversized_input_gets_its_own_batch(self):
+        batches = list(iter_batches(["a", "b" * 100, "c"], max_tokens=10))
+        self.assertEqual(batches, [[0], [1], [2]])
+
+    def test_embed_texts_batches_requests_and_preserves_order(self):
+        client = FakeEmbeddingsClient(dim=8)
+        texts = [f"row {i}" for i in range(7)]
+        vectors = embed_texts(client, texts, model="m", max_inputs=3)
+        self.assertEqual(client.requests, 3)
+        self.assertEqual(client.inputs, 7)
+        self.assertEqual(vectors, [client.vector(t, "m") for t in texts])
+
+    def test_embed_texts_places_vectors_by_reported_index(self):
+        client = ReversedEmbeddingsClient(dim=8)
+        texts = ["a", "b", "c", "d"]
+        vectors = embed_texts(client, texts, model="m", max_inputs=3)
+        self.assertEqual(vectors, [client.vector(t, "m") for t in texts])
@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from accounting.services.embedding_cache import EmbeddingCache
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.cache = EmbeddingCache(os.path.join(tmp, "embeddings.sqlite3"))
+        self.cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+
+    def test_counts_are_exact_under_concurrent_lookups(self):
+        def lookups():
+            for _ in range(200):
+                self.cache.get_many("m", ["a", "b", "c"])
+
+        threads = [threading.Thread(target=lookups) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1600, 800))
+
+    def test_failed_last_used_update_is_rolled_back(self):
+        self.cache._connection().execute(
+            "CREATE TRIGGER no_touch BEFORE UPDATE ON embeddings BEGIN SELECT RAISE(ABORT, 'read only'); END")
+        with self.assertLogs("accounting.services.embedding_cache", "WARNING"):
+            self.assertEqual(self.cache.get_many("m", ["a", "x"]), {0: [1.0]})
+        self.assertFalse(self.cache._connection().in_transaction)
+        self.cache.put_many("m", ["c"], [[3.0]])  # the connection is still usable
+        self.assertEqual(len(self.cache), 3)
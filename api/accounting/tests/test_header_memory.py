@@ -0,0 +1,117 @@
+import pandas as pd
+from django.test import TestCase
+
+from accounting.models import HeaderMapping
+from accounting.services.column_profile import profile_values
+from accounting.services.header_memory import (
+    classify_with_memory,
+    content_fingerprint,
+    learn_correction,
+    remember_mappings,
+)
+
+ROWS = 6
+COLUMNS = {
+    "Cari Kod": [f"120.01.{i:03d}" for i in range(ROWS)],
+    "Ünvan": [f"Müşteri {i} Ltd" for i in range(ROWS)],
+    "Telefon": [f"0532 111 22 {i:02d}" for i in range(ROWS)],
+    "Bakiye": [f"{i}.250,00 TL" for i in range(1, ROWS + 1)],
+}
+LABELS = {"Cari Kod": "cari_hesap_kodu", "Ünvan": "cari_hesap_ismi", "Telefon": "telefon_no", "Bakiye": "bakiye"}
+CENTROIDS = dict.fromkeys(["cari_hesap_kodu", "cari_hesap_ismi", "telefon_no", "bakiye"], [1.0])
+
+
+def frame(columns=None, **renamed):
+    """The sample export, optionally reordered (`columns`) and with headers renamed."""
+    df = pd.DataFrame(COLUMNS)[list(columns or COLUMNS)]
+    return df.rename(columns=renamed)
+
+
+class FakeClassifier:
+    """`classify(indices)` callback: labels by original header, at confidence 0.7."""
+
+    def __init__(self, df):
+        self.df = df
+        self.calls = []
+
+    def __call__(self, indices):
+        self.calls.append(list(indices))
+        return [{"column_index": i, "column_header": str(self.df.columns[i]),
+                 "predicted_category": LABELS.get(self.df.columns[i], "unknown"),
+                 "confidence": 0.7, "alternatives": [], "sample_preview": [], "decided_by": "embedding"}
+                for i in indices]
+
+
+def classify(df):
+    classifier = FakeClassifier(df)
+    mappings, _, decided = classify_with_memory(df, CENTROIDS, None, "m", classify=classifier)
+    return mappings, decided, classifier.calls
+
+
+class ContentFingerprintTests(TestCase):
+    def test_fingerprints(self):
+        self.assertEqual(content_fingerprint(profile_values(COLUMNS["Telefon"])), "phone")
+        self.assertEqual(content_fingerprint(profile_values(COLUMNS["Bakiye"])), "amount")
+        self.assertEqual(content_fingerprint(profile_values(["2025-07-15 10:30"] * 3)), "date")
+        self.assertEqual(content_fingerprint(profile_values(COLUMNS["Ünvan"])), "text")
+        self.assertEqual(content_fingerprint(profile_values([None, None])), "empty")
+
+
+class HeaderMemoryTests(TestCase):
+    def confirm(self):
+        mappings, _, _ = classify(frame())
+        remember_mappings(mappings, source="cariler.csv")
+        return mappings
+
+    def test_classifier_output_is_not_remembered(self):
+        classify(frame())
+        mappings, decided, calls = classify(frame())
+        self.assertEqual((decided, calls), ("classifier", [[0, 1, 2, 3]]))
+        self.assertFalse(HeaderMapping.objects.exists())
+        self.assertEqual([m["content"] for m in mappings], ["text", "text", "phone", "amount"])
+
+    def test_confirmed_layout_is_replayed_at_its_confidence(self):
+        self.confirm()
+        mappings, decided, calls = classify(frame())
+        self.assertEqual((decided, calls), ("memory", []))
+        self.assertEqual([m["predicted_category"] for m in mappings], list(LABELS.values()))
+        self.assertEqual({(m["confidence"], m["decided_by"]) for m in mappings}, {(0.7, "memory")})
+        self.assertEqual(HeaderMapping.objects.get().hit_count, 1)
+
+    def test_reordered_and_renamed_headers_match_fuzzily(self):
+        self.confirm()
+        df = frame(["Bakiye", "Telefon", "Cari Kod", "Ünvan"], **{"Cari Kod": "Cari Kodu", "Ünvan": "UNVAN"})
+        mappings, decided, _ = classify(df)
+        self.assertEqual(decided, "memory")
+        self.assertEqual([(m["column_header"], m["predicted_category"]) for m in mappings],
+                         [("Bakiye", "bakiye"), ("Telefon", "telefon_no"),
+                          ("Cari Kodu", "cari_hesap_kodu"), ("UNVAN", "cari_hesap_ismi")])
+
+    def test_unrelated_layout_is_classified(self):
+        self.confirm()
+        df = frame(**{"Cari Kod": "Hesap", "Ünvan": "Firma", "Telefon": "GSM", "Bakiye": "Tutar"})
+        self.assertEqual(classify(df)[1], "classifier")
+
+    def test_changed_contents_are_classified_again(self):
+        self.confirm()
+        df = frame()
+        df["Telefon"] = df["Ünvan"]  # names exported under the phone header
+        mappings, decided, calls = classify(df)
+        self.assertEqual((decided, calls), ("memory+classifier", [[2]]))
+        self.assertEqual((mappings[2]["decided_by"], mappings[2]["content"]), ("embedding", "text"))
+        self.assertEqual(mappings[3]["decided_by"], "memory")
+
+    def test_correction_of_an_unknown_layout_is_learned_for_that_column(self):
+        learn_correction(list(COLUMNS), 3, "unknown", content="amount", source="cariler.csv")
+        mappings, decided, calls = classify(frame())
+        self.assertEqual((decided, calls), ("memory+classifier", [[0, 1, 2]]))
+        self.assertEqual((mappings[3]["predicted_category"], mappings[3]["confidence"]), ("unknown", 1.0))
+
+    def test_correction_updates_the_fuzzily_matched_layout(self):
+        self.confirm()
+        learn_correction(["Cari Kodu", "Ünvan", "Telefon", "Bakiye"], 0, "unknown", content="text")
+        self.assertEqual(HeaderMapping.objects.count(), 1)
+        mappings, decided, _ = classify(frame())
+        self.assertEqual(decided, "memory")
+        self.assertEqual([(m["predicted_category"], m["confidence"]) for m in mappings[:2]],
+                         [("unknown", 1.0), ("cari_hesap_ismi", 0.7)])
@@ -0,0 +1,29 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from accounting.models import DebtorAccount
+from accounting.services.ledger_ingest import ingest_rows
+
+MAPPINGS = [{"column_index": i, "predicted_category": label, "confidence": 1.0}
+            for i, label in enumerate(["cari_hesap_kodu", "cari_hesap_ismi", "telefon_no", "bakiye",
+                                       "son_fatura_tarihi"])]
+
+
+class LedgerIngestTests(TestCase):
+    def test_rows_are_stored_typed(self):
+        stats = ingest_rows([("120.001", "Ayşe Yılmaz", "0532 111 22 33", "1.250,50 TL", "01.08.2025"),
+                             ("", "Kodsuz", "", "", "")], MAPPINGS, source="ocak.xlsx", chunk_size=1)
+        self.assertEqual((stats["rows"], stats["upserted"], stats["skipped_no_code"], stats["chunks"]), (2, 1, 1, 2))
+        account = DebtorAccount.objects.get()
+        self.assertEqual(account.phone, "+905321112233")  # E.164, as the field documents
+        self.assertEqual((account.balance, account.last_invoice_date), (Decimal("1250.50"), date(2025, 8, 1)))
+        self.assertEqual(account.source, "ocak.xlsx")
+
+    def test_reupload_updates_by_account_code(self):
+        ingest_rows([("120.001", "Eski", "", "10,00", "")], MAPPINGS, source="ocak.xlsx")
+        stats = ingest_rows([("120.001", "Yeni", "x", "20,00", "")], MAPPINGS, source="subat.xlsx")
+        self.assertEqual(stats["parse_errors"]["phone"], 1)
+        account = DebtorAccount.objects.get()
+        self.assertEqual((account.name, account.balance, account.source), ("Yeni", Decimal("20.00"), "subat.xlsx"))
@@ -0,0 +1,131 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from accounting.services.llm_client import CircuitBreaker, CircuitOpenError, LLMClientManager
+from accounting.testing.async_embeddings import FakeAPIError
+
+
+class Clock:
+    """Stands in for `time.monotonic` in the breaker."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("accounting.services.llm_client.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = LLMClientManager(api_key="test", max_retries=0, breaker_failures=2, breaker_reset_seconds=30)
+        self.breaker = self.manager.breaker
+        self.calls = 0
+
+    def fail(self, status=503):
+        def fn(**kwargs):
+            self.calls += 1
+            raise FakeAPIError(status)
+        with self.assertRaises(FakeAPIError):
+            self.manager.call("chat", fn)
+
+    def succeed(self):
+        def fn(**kwargs):
+            self.calls += 1
+            return "ok"
+        return self.manager.call("chat", fn)
+
+    def open_circuit(self):
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.succeed()
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.manager.stats()["operations"]["chat"]["rejected"], 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.fail()
+        self.succeed()
+        self.fail()
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CircuitBreaker.CLOSED, 1))
+
+    def test_non_retryable_errors_do_not_open_the_circuit(self):
+        for _ in range(3):
+            self.fail(status=400)
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def test_half_open_lets_one_trial_through(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.acquire())
+        self.assertIsNone(self.breaker.acquire())  # trial in flight
+        self.breaker.record(True, trial=True)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.acquire())
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertEqual(self.succeed(), "ok")
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def test_failed_trial_opens_the_circuit_again(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.succeed()
+        self.clock.now += 30
+        self.assertEqual(self.succeed(), "ok")
+
+    def test_non_retryable_trial_error_closes_the_circuit(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.fail(status=400)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled_trial_is_settled_as_a_failure(self):
+        self.open_circuit()
+        self.clock.now += 30
+
+        async def cancelled(**kwargs):
+            raise asyncio.CancelledError
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.manager.acall("chat", cancelled))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now += 30
+        self.assertEqual(self.succeed(), "ok")  # the next trial is not blocked by the cancelled one
+
+    def test_cancelled_call_while_closed_is_not_a_failure(self):
+        def interrupted(**kwargs):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.manager.call("chat", interrupted)
+        self.assertEqual((self.breaker.state, self.breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def test_retries_count_as_failures(self):
+        manager = LLMClientManager(api_key="test", max_retries=3, breaker_failures=2, breaker_reset_seconds=30)
+        manager.retry.base_delay = 0
+
+        def fn(**kwargs):
+            self.calls += 1
+            raise FakeAPIError(503)
+
+        with self.assertRaises(CircuitOpenError):
+            manager.call("chat", fn)
+        self.assertEqual((self.calls, manager.breaker.state), (2, CircuitBreaker.OPEN))
@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from accounting.services import metrics
+
+
+def reset_registry():
+    for metric in metrics._registry:
+        metric.reset()
+
+
+class MetricsTestCase(SimpleTestCase):
+    directory = None
+
+    def setUp(self):
+        reset_registry()
+        self.addCleanup(reset_registry)
+        self.forget_snapshots()  # earlier tests may have started this process's snapshot elsewhere
+        if self.directory == "tmp":
+            tmp = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+            self.directory = Path(tmp)
+        # the flusher thread stays asleep; the tests write snapshots themselves
+        overrides = override_settings(METRICS_ENABLED=True, METRICS_LOG=False, METRICS_FLUSH_SECONDS=3600.0,
+                                      METRICS_DIR=str(self.directory or ""))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        metrics._config.load()
+        self.addCleanup(metrics._config.load)
+        self.addCleanup(self.forget_snapshots)
+
+    def forget_snapshots(self):
+        snapshots = metrics._snapshots
+        snapshots.pid, snapshots.path, snapshots.written = None, None, None
+
+    def rendered(self, name):
+        """{label string: value} of one metric's samples in `render()`."""
+        samples = {}
+        for line in metrics.render().splitlines():
+            if line.startswith(name) and not line.startswith("#"):
+                series, value = line.rsplit(" ", 1)
+                samples[series[len(name):]] = float(value)
+        return samples
+
+
+class RenderTests(MetricsTestCase):
+    def test_counter_exposition(self):
+        metrics.cache_lookup("embedding", hits=3, misses=1)
+        metrics.CACHE_LOOKUPS.inc(cache='a"b\\c', result="hit")
+        text = metrics.render()
+        self.assertIn("# HELP bts_cache_lookups_total Cache lookups by result.\n"
+                      "# TYPE bts_cache_lookups_total counter\n", text)
+        self.assertIn('bts_cache_lookups_total{cache="embedding",result="hit"} 3\n', text)
+        self.assertIn('bts_cache_lookups_total{cache="embedding",result="miss"} 1\n', text)
+        self.assertIn('bts_cache_lookups_total{cache="a\\"b\\\\c",result="hit"} 1\n', text)
+        self.assertIn("bts_sample_tokens_total", text)  # unlabelled metrics are listed too
+        self.assertTrue(text.endswith("\n"))
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.02, 0.02, 0.3, 500):
+            metrics.STAGE_SECONDS.observe(seconds, pipeline="classification", stage="embed")
+        samples = self.rendered("bts_stage_duration_seconds")
+        labels = 'pipeline="classification",stage="embed"'
+        self.assertEqual(samples[f'_bucket{{{labels},le="0.01"}}'], 0)
+        self.assertEqual(samples[f'_bucket{{{labels},le="0.025"}}'], 2)
+        self.assertEqual(samples[f'_bucket{{{labels},le="0.5"}}'], 3)
+        self.assertEqual(samples[f'_bucket{{{labels},le="120.0"}}'], 3)
+        self.assertEqual(samples[f'_bucket{{{labels},le="+Inf"}}'], 4)
+        self.assertEqual(samples[f"_count{{{labels}}}"], 4)
+        self.assertAlmostEqual(samples[f"_sum{{{labels}}}"], 500.34)
+
+    def test_stage_records_time_and_items(self):
+        with metrics.stage("classification", "score", items=7):
+            pass
+        self.assertEqual(self.rendered("bts_stage_items_total"),
+                         {'{pipeline="classification",stage="score"}': 7})
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics.configure(enabled=False)
+        metrics.cache_lookup("embedding", hits=3)
+        with metrics.stage("classification", "score", items=7) as timer:
+            timer.items = 9
+        self.assertEqual(self.rendered("bts_cache_lookups_total"), {})
+        self.assertEqual(self.rendered("bts_stage_items_total"), {})
+
+    def test_fold_sums_counters_and_histograms(self):
+        totals = {"c": [[["a"], 2]], "h": [[["x"], [1, 0, 0.5]]]}
+        metrics._fold(totals, {"c": [[["a"], 3], [["b"], 1]], "h": [[["x"], [0, 2, 9.0]]]})
+        self.assertEqual(sorted(totals["c"]), [[["a"], 5], [["b"], 1]])
+        self.assertEqual(totals["h"], [[["x"], [1, 2, 9.5]]])
+
+
+class MultiProcessTests(MetricsTestCase):
+    directory = "tmp"
+
+    def hits(self):
+        return self.rendered("bts_cache_lookups_total").get('{cache="embedding",result="hit"}', 0)
+
+    def other_process(self, hits, age=0.0):
+        """Snapshot file of another process that last wrote `age` seconds ago."""
+        path = self.directory / "999-deadbeef.json"
+        path.write_text(json.dumps({"bts_cache_lookups_total": [[["embedding", "hit"], hits]]}), encoding="utf-8")
+        written = time.time() - age
+        os.utime(path, (written, written))
+        return path
+
+    def aggregate(self):
+        return json.loads((self.directory / metrics.AGGREGATE_FILE).read_text(encoding="utf-8"))
+
+    def test_live_processes_are_summed(self):
+        metrics.cache_lookup("embedding", hits=2)
+        path = self.other_process(5)
+        self.assertEqual(self.hits(), 7)
+        self.assertTrue(path.exists())
+        self.assertFalse((self.directory / metrics.AGGREGATE_FILE).exists())
+
+    def test_killed_process_is_folded_into_the_aggregate_once(self):
+        path = self.other_process(5, age=metrics.STALE_INTERVALS * 3600 + 1)
+        self.assertEqual(self.hits(), 5)
+        self.assertFalse(path.exists())
+        self.assertEqual(self.aggregate(), {"bts_cache_lookups_total": [[["embedding", "hit"], 5]]})
+        self.assertEqual(self.hits(), 5)
+
+    def test_exiting_process_folds_its_values(self):
+        metrics.cache_lookup("embedding", hits=4)
+        metrics.flush()
+        snapshot = metrics._snapshots.path
+        self.assertTrue(snapshot.exists())
+
+        metrics._snapshots.retire()
+        self.assertFalse(snapshot.exists())
+        self.assertEqual(self.aggregate()["bts_cache_lookups_total"], [[["embedding", "hit"], 4]])
+        reset_registry()  # a later process starts from zero
+        self.assertEqual(self.hits(), 4)
+
+    def test_stalled_process_reconciles_after_being_folded(self):
+        metrics.cache_lookup("embedding", hits=2)
+        metrics.flush()
+        # another process's render() took our snapshot for a dead one
+        metrics._fold_stale(self.directory, [metrics._snapshots.path], time.time() + 1)
+        metrics.cache_lookup("embedding", hits=1)
+        self.assertEqual(self.hits(), 3)
+        self.assertEqual(metrics.CACHE_LOOKUPS.snapshot(), [[["embedding", "hit"], 1]])
+        metrics._snapshots.retire()
+        self.assertEqual(self.aggregate()["bts_cache_lookups_total"], [[["embedding", "hit"], 3]])
@@ -0,0 +1,61 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from accounting.services.normalizers import kurus_to_decimal, parse_amounts, parse_dates, parse_phones
+
+
+def column(*values):
+    return pd.Series(list(values), dtype=object)
+
+
+class AmountTests(SimpleTestCase):
+    def test_turkish_amounts(self):
+        out = parse_amounts(column("₺1.234,50", "(250,00)", "12.345,67 TL", "-125,00", "75-", 1750.0, "1,234.50"))
+        self.assertEqual(out.values.tolist(), [123450, -25000, 1234567, -12500, -7500, 175000, 123450])
+        self.assertFalse(out.errors.any())
+        self.assertEqual(kurus_to_decimal(out.values[0]), Decimal("1234.50"))
+
+    def test_rejected_amounts(self):
+        out = parse_amounts(column("abc", "(250,00", "1.2.3", "", None))
+        self.assertEqual(out.errors.tolist(), [True, True, True, False, False])
+        self.assertTrue(out.values.isna().all())
+
+
+class DateTests(SimpleTestCase):
+    def test_turkish_dates(self):
+        out = parse_dates(column("11 Ağustos 2025", "Ağu 2025", "10-08-25", "01.08.2025", "2024-12-31 13:45",
+                                 "2025-08-10T14:35:00", datetime(2025, 8, 1, 9, 30)))
+        self.assertEqual(out.values.tolist(), [
+            pd.Timestamp("2025-08-11"), pd.Timestamp("2025-08-01"), pd.Timestamp("2025-08-10"),
+            pd.Timestamp("2025-08-01"), pd.Timestamp("2024-12-31 13:45"), pd.Timestamp("2025-08-10 14:35"),
+            pd.Timestamp("2025-08-01 09:30"),
+        ])
+        self.assertFalse(out.errors.any())
+
+    def test_excel_serial_dates(self):
+        out = parse_dates(column(45870, 45870.5, "45870", "45870.0"))
+        self.assertEqual(out.values.tolist(), [pd.Timestamp("2025-08-01"), pd.Timestamp("2025-08-01 12:00"),
+                                               pd.Timestamp("2025-08-01"), pd.Timestamp("2025-08-01")])
+        self.assertFalse(out.errors.any())
+
+    def test_rejected_dates(self):
+        out = parse_dates(column("2025-08-01abc", "2024-09-31", "32.01.2025", "Foo 2025", "120001", 1250, "", None))
+        self.assertEqual(out.errors.tolist(), [True, True, True, True, True, True, False, False])
+        self.assertTrue(out.values.isna().all())
+
+
+class PhoneTests(SimpleTestCase):
+    def test_turkish_phones(self):
+        out = parse_phones(column("+90 (212) 345 67 89 dahili 123", "0532 123 45 67", "5321234567", 5321234567.0,
+                                  "444 12 34", "+44 20 7946 0958"))
+        self.assertEqual(out.values.tolist(), ["+902123456789", "+905321234567", "+905321234567", "+905321234567",
+                                               "+904441234", "+442079460958"])
+        self.assertEqual(out.extensions.tolist()[:2], ["123", pd.NA])
+        self.assertFalse(out.errors.any())
+
+    def test_rejected_phones(self):
+        out = parse_phones(column("yok", "12345", "1321234567", "", None))
+        self.assertEqual(out.errors.tolist(), [True, True, True, False, False])
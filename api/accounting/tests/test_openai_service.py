@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+from openai import APIStatusError
+
+from accounting.services.async_classify import RetryPolicy
+from accounting.services.llm_client import LLMClientManager
+from accounting.services.openai_service import OpenAIService, render_prompts
+from accounting.testing.chat import FakeChatCompletionsServer
+
+
+class MessageGenerationTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeChatCompletionsServer(seed=1).start()
+        self.addCleanup(self.server.stop)
+        self.manager = LLMClientManager(api_key="test", base_url=self.server.base_url, max_retries=0)
+
+    def service(self, **kwargs):
+        kwargs.setdefault("use_cache", False)
+        return OpenAIService(client=self.manager.client(), async_client=self.manager.async_client(), **kwargs)
+
+    def bulk(self, service, template, items, **kwargs):
+        kwargs.setdefault("requests_per_second", 1000)
+        kwargs.setdefault("retry", RetryPolicy(max_retries=10, base_delay=0))
+        return sorted(service.generate_bulk(template, items, **kwargs), key=lambda r: r.index)
+
+    def test_render_prompts(self):
+        self.assertEqual(render_prompts("Sayın {name}", [{"name": "Ali"}, {}]),
+                         [("Sayın Ali", None), (None, "Template field 'name' missing from item")])
+
+    def test_generate_message_returns_content(self):
+        self.assertEqual(self.service().generate_message("Merhaba"), "[fake] Merhaba")
+
+    def test_generate_message_raises_on_upstream_error(self):
+        self.server.error_rate = 1.0
+        self.server.error_statuses = [400]
+        with self.assertRaises(APIStatusError), self.assertLogs("accounting.services.openai_service", "WARNING"):
+            self.service().generate_message("Merhaba")
+
+    def test_bulk_sends_identical_prompts_once(self):
+        items = [{"name": "Ali"}, {"name": "Ali"}, {"name": "Ayşe"}, {}]
+        results = self.bulk(self.service(), "Sayın {name}, borcunuz var.", items)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual([r.ok for r in results], [True, True, True, False])
+        self.assertEqual(results[1].duplicate_of, 0)
+        self.assertEqual(results[1].content, results[0].content)
+        self.assertIsNone(results[2].duplicate_of)
+        self.assertIn("name", results[3].error)
+
+    def test_bulk_retries_transient_errors(self):
+        self.server.error_rate = 0.5
+        items = [{"name": f"Müşteri {i}"} for i in range(8)]
+        results = self.bulk(self.service(), "Sayın {name}", items)
+        self.assertGreater(self.server.errors, 0)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(results[3].content, "[fake] Sayın Müşteri 3")
+
+    def test_bulk_reports_failures_per_item(self):
+        self.server.error_rate = 1.0
+        self.server.error_statuses = [400]
+        results = self.bulk(self.service(), "Sayın {name}", [{"name": "Ali"}, {"name": "Veli"}])
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(r.content is None and r.error for r in results))
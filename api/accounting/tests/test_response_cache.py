@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+from openai import APIStatusError
+
+from accounting.services.async_classify import RetryPolicy
+from accounting.services.llm_client import LLMClientManager
+from accounting.services.openai_service import OpenAIService
+from accounting.services.response_cache import ResponseCache, is_reusable, render_skeleton, response_key
+from accounting.testing.chat import FakeChatCompletionsServer
+
+
+class SkeletonTests(SimpleTestCase):
+    def test_response_key_covers_every_input(self):
+        key = response_key("m", "system", "Merhaba", {"temperature": 0.2})
+        self.assertEqual(key, response_key("m", "system", "Merhaba", {"temperature": 0.2}))
+        self.assertNotEqual(key, response_key("m", "system", "Merhaba", {"temperature": 0.7}))
+        self.assertNotEqual(key, response_key("m2", "system", "Merhaba", {"temperature": 0.2}))
+
+    def test_skeletons(self):
+        item = {"name": "Ali", "amount": 1250.5, "company": "ACME"}
+        self.assertEqual(render_skeleton("Sayın {name}, {company} borcu {amount}", item, ["name", "amount"]),
+                         "Sayın [[name]], ACME borcu [[amount]]")
+        self.assertIsNone(render_skeleton("Borç {amount:.2f}", item, ["amount"]))  # format spec on a placeholder
+        self.assertTrue(is_reusable("Sayın [[name]]", "Merhaba [[name]]"))
+        self.assertFalse(is_reusable("Sayın [[name]]", "Merhaba Ali"))
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeChatCompletionsServer(seed=1).start()
+        self.addCleanup(self.server.stop)
+        self.manager = LLMClientManager(api_key="test", base_url=self.server.base_url, max_retries=0)
+        self.cache = ResponseCache("default")
+        self.cache.clear()
+
+    def service(self, **kwargs):
+        return OpenAIService(client=self.manager.client(), async_client=self.manager.async_client(),
+                             cache=self.cache, **kwargs)
+
+    def bulk(self, service, template, items, **kwargs):
+        kwargs.setdefault("requests_per_second", 1000)
+        kwargs.setdefault("retry", RetryPolicy(max_retries=10, base_delay=0))
+        return sorted(service.generate_bulk(template, items, **kwargs), key=lambda r: r.index)
+
+    def test_generate_message_is_cached(self):
+        service = self.service()
+        first = service.generate_message("Merhaba")
+        self.assertEqual(service.generate_message("Merhaba"), first)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual((self.cache.stats()["hits"], self.cache.stats()["stores"]), (1, 1))
+
+    def test_failures_are_not_cached(self):
+        self.server.error_rate = 1.0
+        self.server.error_statuses = [400]
+        service = self.service()
+        with self.assertRaises(APIStatusError), self.assertLogs("accounting.services.openai_service", "WARNING"):
+            service.generate_message("Merhaba")
+        self.assertIsNone(self.cache.get(service._key("Merhaba")))
+
+    def test_parameters_are_part_of_the_key(self):
+        self.service(params={"temperature": 0.2}).generate_message("Merhaba")
+        self.service(params={"temperature": 0.7}).generate_message("Merhaba")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_bulk_rerun_is_answered_from_cache(self):
+        items = [{"name": "Ali"}, {"name": "Veli"}]
+        self.bulk(self.service(), "Sayın {name}", items)
+        results = self.bulk(self.service(), "Sayın {name}", items)
+        self.assertEqual(self.server.requests, 2)
+        self.assertTrue(all(r.cached for r in results))
+
+    def test_template_reuse_shares_one_completion(self):
+        items = [{"name": "Ali", "tier": "A"}, {"name": "Veli", "tier": "A"}, {"name": "Ayşe", "tier": "B"}]
+        results = self.bulk(self.service(), "Sayın {name}, grup {tier}", items, reuse_fields=["name"])
+        self.assertEqual(self.server.requests, 2)  # one skeleton per tier
+        self.assertTrue(all(r.from_template for r in results))
+        self.assertTrue(results[1].content.endswith("Sayın Veli, grup A"))
+        self.assertNotIn("[[", results[2].content)
@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase, override_settings
+
+from accounting.services.sampling import select_samples
+
+
+class SampleSelectionTests(SimpleTestCase):
+    phones = [f"+90 532 111 22 {i:02d}" for i in range(30)]
+
+    @override_settings(CLASSIFICATION_SAMPLE_TOKENS=0)
+    def test_no_budget_by_default(self):
+        sample = select_samples("Telefon", self.phones, max_samples=10)
+        self.assertEqual(len(sample.values), 10)
+
+    def test_budget_caps_the_payload(self):
+        sample = select_samples("Telefon", self.phones, max_samples=10, token_budget=40)
+        self.assertLessEqual(sample.tokens, 40)
+        self.assertGreaterEqual(len(sample.values), 1)
+        self.assertLess(len(sample.values), 10)
@@ -0,0 +1,52 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from accounting.services.scoring import CentroidScorer, normalize_rows, top_k
+
+
+class TopKTests(SimpleTestCase):
+    def reference(self, scores, k):
+        idx = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return idx, np.take_along_axis(scores, idx, axis=1)
+
+    def test_matches_a_stable_sort(self):
+        rng = np.random.default_rng(3)
+        scores = rng.random((50, 12)).astype(np.float32)
+        for k in (1, 3, 12, 20):
+            idx, vals = top_k(scores, k)
+            expected_idx, expected_vals = self.reference(scores, min(k, 12))
+            np.testing.assert_array_equal(idx, expected_idx)
+            np.testing.assert_array_equal(vals, expected_vals)
+
+    def test_ties_keep_the_lower_index_first(self):
+        rng = np.random.default_rng(5)
+        scores = rng.integers(0, 3, size=(200, 9)).astype(np.float32)  # plenty of ties, also at the k boundary
+        for k in (1, 2, 4, 9):
+            idx, _ = top_k(scores, k)
+            np.testing.assert_array_equal(idx, self.reference(scores, k)[0])
+
+    def test_values_are_descending(self):
+        _, vals = top_k(np.array([[0.1, 0.9, 0.5, 0.7]]), 3)
+        np.testing.assert_array_almost_equal(vals, [[0.9, 0.7, 0.5]])
+
+
+class CentroidScorerTests(SimpleTestCase):
+    def setUp(self):
+        self.scorer = CentroidScorer({"a": [1.0, 0.0], "b": [0.0, 2.0], "c": [1.0, 1.0]})
+
+    def test_scores_are_cosine_similarities(self):
+        scores = self.scorer.score([[3.0, 0.0], [0.0, 0.5]])
+        expected = np.array([[1.0, 0.0, 2 ** -0.5], [0.0, 1.0, 2 ** -0.5]])
+        np.testing.assert_allclose(scores, expected, atol=1e-6)
+        self.assertEqual(scores.dtype, np.float32)
+
+    def test_ranked_labels(self):
+        ranked = self.scorer.ranked(self.scorer.score([[1.0, 0.2]]), k=2)
+        self.assertEqual([label for label, _ in ranked[0]], ["a", "c"])
+
+    def test_no_vectors(self):
+        self.assertEqual(self.scorer.score([]).shape, (0, 3))
+        self.assertEqual(self.scorer.ranked(self.scorer.score([]), k=3), [])
+
+    def test_zero_rows_stay_zero(self):
+        np.testing.assert_allclose(normalize_rows([[0.0, 0.0], [3.0, 4.0]]), [[0.0, 0.0], [0.6, 0.8]], rtol=1e-6)
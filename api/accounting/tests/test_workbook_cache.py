@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounting.services import workbook_cache, workbook_reader
+from accounting.testing.uploads import csv_workbook
+
+
+class WorkbookPreviewTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.root = f"{tmp}/workbooks"
+        overrides = override_settings(WORKBOOK_CACHE_DIR=self.root, CLASSIFICATION_JOB_RUNNER="db")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+
+    def upload(self, **kwargs):
+        return self.client.post("/api/accounting/workbooks/", {"file": csv_workbook(**kwargs)}, format="multipart")
+
+    def convert_queued(self):
+        while (pending := workbook_cache.claim_pending()) is not None:
+            workbook_cache.convert_pending(*pending)
+
+    def test_upload_defers_conversion_to_the_runner(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual((response.data["status"], response.data["sheets"]), ("converting", ["cariler"]))
+        digest = response.data["id"]
+        self.assertEqual(self.client.get(f"/api/accounting/workbooks/{digest}/rows/").status_code, 409)
+
+        self.convert_queued()
+        detail = self.client.get(f"/api/accounting/workbooks/{digest}/")
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual((detail.data["status"], detail.data["rows"]), ("ready", 20))
+        rows = self.client.get(f"/api/accounting/workbooks/{digest}/rows/", {"limit": 2}).data["rows"]
+        self.assertEqual(rows[0][:2], ["120.000", "Müşteri 0 Ltd"])
+        self.assertEqual(self.upload().status_code, 201)  # same content, already converted
+
+    def test_failed_conversion_is_reported(self):
+        digest = self.upload().data["id"]
+        with mock.patch.object(workbook_reader, "iter_rows", side_effect=ValueError("bozuk dosya")), \
+                self.assertLogs("accounting.services.workbook_cache", "ERROR"):
+            self.convert_queued()
+        detail = self.client.get(f"/api/accounting/workbooks/{digest}/").data
+        self.assertEqual((detail["status"], detail["error"]), ("failed", "ValueError: bozuk dosya"))
+        self.assertEqual(self.client.get(f"/api/accounting/workbooks/{digest}/rows/").status_code, 400)
+
+    def test_cache_size_is_tracked_without_walking_the_tree(self):
+        self.upload()
+        self.convert_queued()
+        actual = sum(size for _, size, _ in workbook_cache._entries(Path(self.root)))
+        self.assertEqual(workbook_cache.usage(), actual)
+        with mock.patch.object(workbook_cache, "_entries", wraps=workbook_cache._entries) as walk:
+            self.assertEqual(workbook_cache.prune(actual), 0)
+            walk.assert_not_called()
+            self.upload(name="baska.csv", rows=5)
+            with override_settings(WORKBOOK_CACHE_MAX_BYTES=actual):
+                self.convert_queued()  # prunes the older workbook once the cap is exceeded
+            walk.assert_called_once()
+        self.assertEqual(len([d for d in Path(self.root).iterdir() if d.is_dir()]), 1)
+        self.assertEqual(workbook_cache.usage(), sum(size for _, size, _ in workbook_cache._entries(Path(self.root))))
+
+    def test_a_pending_sheet_is_claimed_once(self):
+        digest = self.upload().data["id"]
+        set_lease = workbook_cache._set_lease
+        interleaved = []
+
+        def racing_set_lease(path, seconds):
+            if not interleaved:
+                interleaved.append(workbook_cache.claim_pending())  # a second runner between check and lease
+            set_lease(path, seconds)
+
+        with mock.patch.object(workbook_cache, "_set_lease", racing_set_lease):
+            self.assertEqual(workbook_cache.claim_pending(), (digest, 0))
+        self.assertEqual(interleaved, [None])
+        self.assertIsNone(workbook_cache.claim_pending())  # leased now
+
+    def test_concurrent_runners_convert_and_count_a_sheet_once(self):
+        self.upload()
+        barrier = threading.Barrier(8)
+        claims = []
+
+        def runner():
+            barrier.wait()
+            claims.append(workbook_cache.claim_pending())
+
+        threads = [threading.Thread(target=runner) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        claimed = [c for c in claims if c is not None]
+        self.assertEqual(len(claimed), 1)
+        workbook_cache.convert_pending(*claimed[0])
+        self.assertEqual(workbook_cache.usage(), sum(size for _, size, _ in workbook_cache._entries(Path(self.root))))
+
+    def test_claim_left_by_a_dead_runner_expires(self):
+        digest = self.upload().data["id"]
+        claim = Path(self.root) / digest / f"0{workbook_cache.CLAIM_SUFFIX}"
+        claim.touch()
+        self.assertIsNone(workbook_cache.claim_pending())
+        stale = time.time() - workbook_cache.CONVERSION_LEASE_SECONDS - 1
+        os.utime(claim, (stale, stale))
+        self.assertEqual(workbook_cache.claim_pending(), (digest, 0))
+        self.assertFalse(claim.exists())
@@ -0,0 +1,29 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from accounting.services import workbook_reader
+
+
+class CsvEncodingTests(SimpleTestCase):
+    def write(self, data: bytes) -> str:
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_turkish_windows_export_is_decoded(self):
+        path = self.write("Ünvan;Şehir\nÇağlar Ltd;İzmir\n".encode("cp1254"))
+        self.assertEqual(list(workbook_reader.iter_rows(path)), [("Ünvan", "Şehir"), ("Çağlar Ltd", "İzmir")])
+
+    def test_late_decode_error_raises_instead_of_restarting(self):
+        path = self.write(b"a,b\n" + b"x,1\n" * 40 + "ş,2\n".encode("cp1254"))
+        rows = []
+        with mock.patch.object(workbook_reader, "ENCODING_PROBE_BYTES", 64):
+            with self.assertRaisesMessage(ValueError, "is not valid utf-8-sig"):
+                for row in workbook_reader.iter_rows(path):
+                    rows.append(row)
+        self.assertLessEqual(len(rows), 41)
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('classification-jobs/', views.ClassificationJobCreateView.as_view(), name='classification-job-create'),
+    path('classification-jobs/<uuid:pk>/', views.ClassificationJobDetailView.as_view(),
+         name='classification-job-detail'),
+    path('workbooks/', views.WorkbookUploadView.as_view(), name='workbook-upload'),
+    path('workbooks/<str:digest>/', views.WorkbookDetailView.as_view(), name='workbook-detail'),
+    path('workbooks/<str:digest>/rows/', views.WorkbookRowsView.as_view(), name='workbook-rows'),
+    path('workbooks/<str:digest>/stats/', views.WorkbookStatsView.as_view(), name='workbook-stats'),
+    path('aging/', views.AgingSummaryView.as_view(), name='aging-summary'),
+    path('aging/customers/', views.CustomerAgingView.as_view(), name='aging-customers'),
+]
@@ -1,3 +1,242 @@
-from django.shortcuts import render
+import re
 
-# Create your views here.
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import ClassificationJob
+from .serializers import (
+    ClassificationCorrectionSerializer,
+    ClassificationJobSerializer,
+    ClassificationJobUploadSerializer,
+    WorkbookUploadSerializer,
+)
+from .services import workbook_cache
+from .services.aging import aging_summary, customer_aging
+from .services.classification_jobs import apply_corrections, enqueue, enqueue_conversion
+from .services.workbook_reader import parse_sheet
+
+
+class ClassificationJobCreateView(generics.CreateAPIView):
+    """
+    Upload a workbook for column classification. Only the file is stored here;
+    the response (202) carries the job id to poll. Re-uploads of an edited
+    workbook may name the earlier job as `previous`: columns whose content is
+    unchanged keep its predictions, and the finished job carries a `diff`.
+    """
+    queryset = ClassificationJob.objects.all()
+    serializer_class = ClassificationJobUploadSerializer
+    parser_classes = [MultiPartParser, FormParser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        enqueue(job)
+        return Response(ClassificationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ClassificationJobDetailView(generics.RetrieveAPIView):
+    """
+    Job status with per-column progress; the final mappings once it is done.
+    PATCH `{"corrections": [{"column_index": 3, "label": "bakiye"}]}` fixes
+    predictions of a finished job and teaches them to the mapping memory;
+    `{"confirm": true}` (with or without corrections) remembers the whole result.
+    """
+    queryset = ClassificationJob.objects.all()
+    serializer_class = ClassificationJobSerializer
+
+    def patch(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != ClassificationJob.DONE:
+            raise ValidationError({"status": "Only a finished job can be corrected."})
+        serializer = ClassificationCorrectionSerializer(data=request.data, context={"columns": len(job.columns)})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        job = apply_corrections(job, data.get("corrections", []), confirm=data["confirm"])
+        return Response(ClassificationJobSerializer(job).data)
+
+
+class AgingSummaryView(APIView):
+    """
+    Receivables totals per aging bucket, overall and per source workbook;
+    `?source=` narrows to one. Reads the maintained summary rows only, and
+    never writes them (see accounting.services.aging).
+    """
+
+    def get(self, request, *args, **kwargs):
+        return Response(aging_summary(source=request.query_params.get("source")))
+
+
+class CustomerAgingView(APIView):
+    """
+    Aging per customer (debtor account), largest balance first: `?bucket=90+`
+    lists one bucket, `?source=` one workbook, `?account_code=` one account;
+    paged with `offset` / `limit`.
+    """
+    MAX_LIMIT = 500
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            return Response(customer_aging(
+                bucket=params.get("bucket"), source=params.get("source"), account_code=params.get("account_code"),
+                limit=_int_param(params, "limit", 100, minimum=1, maximum=self.MAX_LIMIT),
+                offset=_int_param(params, "offset", 0),
+            ))
+        except ValueError as e:
+            raise ValidationError({"bucket": str(e)})
+
+
+# -------------------------------
+# Workbook preview
+# -------------------------------
+
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _int_param(params, name: str, default: int, minimum: int = 0, maximum=None) -> int:
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValidationError({name: "Must be an integer."})
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValidationError({name: f"Must be between {minimum} and {maximum}." if maximum is not None
+                                     else f"Must be at least {minimum}."})
+    return value
+
+
+def _columns_param(params, n_cols: int):
+    """`?columns=0,3,5` (column indices); None for all columns."""
+    raw = params.get("columns")
+    if not raw:
+        return None
+    try:
+        columns = [int(c) for c in raw.split(",")]
+    except ValueError:
+        raise ValidationError({"columns": "Must be comma-separated column indices."})
+    if any(not 0 <= c < n_cols for c in columns):
+        raise ValidationError({"columns": f"Column indices must be between 0 and {n_cols - 1}."})
+    return columns
+
+
+class SheetConverting(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The sheet is still being converted; poll the workbook until its status is ready."
+    default_code = "converting"
+
+
+def _sheet_state(digest: str, sheet):
+    """(sheet index, state, error) of a stored workbook's sheet, queueing its conversion if nobody is on it."""
+    if not DIGEST.match(digest):
+        raise NotFound()
+    try:
+        index = workbook_cache.sheet_index(digest, parse_sheet(sheet))
+    except KeyError:
+        raise NotFound()
+    except ValueError as e:
+        raise ValidationError({"sheet": str(e)})
+    state, error = workbook_cache.sheet_status(digest, index)
+    if state is None:
+        enqueue_conversion(digest, index)
+        state = workbook_cache.CONVERTING
+    return index, state, error
+
+
+def _open_sheet(digest: str, sheet):
+    index, state, error = _sheet_state(digest, sheet)
+    if state == workbook_cache.FAILED:
+        raise ValidationError({"sheet": error})
+    if state == workbook_cache.READY:
+        try:
+            return workbook_cache.open_sheet(digest, index, convert=False)
+        except KeyError:
+            enqueue_conversion(digest, index)  # pruned since the status check
+    raise SheetConverting()
+
+
+def _workbook_response(digest: str, sheet, ready_status=status.HTTP_200_OK) -> Response:
+    """Workbook and sheet metadata; 202 with `"status": "converting"` until the sheet is in the cache."""
+    index, state, error = _sheet_state(digest, sheet)
+    info = workbook_cache.workbook_info(digest)
+    data = {"id": digest, **info, "sheet": info["sheets"][index], "sheet_index": index, "status": state}
+    if state == workbook_cache.FAILED:
+        data["error"] = error
+        return Response(data)
+    if state == workbook_cache.READY:
+        try:
+            data.update(workbook_cache.open_sheet(digest, index, convert=False).meta())
+            return Response(data, status=ready_status)
+        except KeyError:
+            enqueue_conversion(digest, index)  # pruned since the status check
+            data["status"] = workbook_cache.CONVERTING
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class WorkbookUploadView(APIView):
+    """
+    Upload a workbook for preview. The file is stored under its content hash
+    and its sheet is converted into the columnar cache by a job runner (see
+    classification_jobs.enqueue_conversion), not in the request: the
+    response (202) carries the id and sheet names, and the workbook detail
+    reports `"status": "ready"` with the row count and headers once the
+    conversion is done. Re-uploading a converted file answers 201 right away.
+    Classifying or ingesting the same file later reads the cache instead of
+    the workbook.
+    """
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WorkbookUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        digest = workbook_cache.store_workbook(upload.chunks(), upload.name)
+        return _workbook_response(digest, serializer.validated_data.get("sheet"),
+                                  ready_status=status.HTTP_201_CREATED)
+
+
+class WorkbookDetailView(APIView):
+    """
+    Sheet names, conversion `status` and, once ready, row count and headers
+    of a cached workbook (`?sheet=` name or index; other sheets are converted
+    on first request). 202 while converting.
+    """
+
+    def get(self, request, digest, *args, **kwargs):
+        return _workbook_response(digest, request.query_params.get("sheet"))
+
+
+class WorkbookRowsView(APIView):
+    """
+    One window of rows for a virtualized grid:
+    `?offset=&limit=` (at most WORKBOOK_PREVIEW_MAX_ROWS), `?columns=0,3,5`
+    for a column subset, `?sheet=`. Only the requested slice is read; 409
+    while the sheet is still being converted.
+    """
+
+    def get(self, request, digest, *args, **kwargs):
+        params = request.query_params
+        sheet = _open_sheet(digest, params.get("sheet"))
+        offset = _int_param(params, "offset", 0)
+        limit = _int_param(params, "limit", 100, maximum=settings.WORKBOOK_PREVIEW_MAX_ROWS)
+        columns = _columns_param(params, sheet.n_cols)
+        indices = columns if columns is not None else list(range(sheet.n_cols))
+        return Response({
+            "total_rows": sheet.n_rows,
+            "offset": offset,
+            "columns": [{"column_index": i, "column_header": sheet.headers[i]} for i in indices],
+            "rows": sheet.window(offset, limit, indices),
+        })
+
+
+class WorkbookStatsView(APIView):
+    """Per-column stats (`?columns=` subset, `?sheet=`), computed on first request and cached."""
+
+    def get(self, request, digest, *args, **kwargs):
+        sheet = _open_sheet(digest, request.query_params.get("sheet"))
+        columns = _columns_param(request.query_params, sheet.n_cols)
+        indices = columns if columns is not None else range(sheet.n_cols)
+        return Response({"columns": [sheet.column_stats(i) for i in indices]})
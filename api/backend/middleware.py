@@ -0,0 +1,28 @@
+import time
+
+from accounting.services import metrics
+
+
+class RequestMetricsMiddleware:
+    """
+    Request latency per (method, route, status) into
+    `bts_http_request_duration_seconds`. The route is the URL pattern
+    (e.g. "api/accounting/classification-jobs/<uuid:pk>/"), not the path,
+    so ids do not create new series.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics.enabled():
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        seconds = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None and match.route else "unmatched"
+        metrics.HTTP_SECONDS.observe(seconds, method=request.method, route=route, status=response.status_code)
+        metrics.log_event("request", method=request.method, route=route, status=response.status_code,
+                          seconds=round(seconds, 6))
+        return response
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.RequestMetricsMiddleware',  # first, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -131,3 +132,105 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # OpenAI Settings
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+
+# Shared OpenAI client (see accounting.services.llm_client)
+OPENAI_TIMEOUT_SECONDS = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '30'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+OPENAI_BREAKER_FAILURES = int(os.getenv('OPENAI_BREAKER_FAILURES', '5'))
+OPENAI_BREAKER_RESET_SECONDS = float(os.getenv('OPENAI_BREAKER_RESET_SECONDS', '30'))
+
+# Caches; 'llm_responses' holds generated messages (see accounting.services.response_cache)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm_responses': {
+        'BACKEND': os.getenv('LLM_RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('LLM_RESPONSE_CACHE_LOCATION', str(BASE_DIR / 'llm_response_cache')),
+        'TIMEOUT': int(os.getenv('LLM_RESPONSE_CACHE_TIMEOUT', str(7 * 24 * 3600))),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('LLM_RESPONSE_CACHE_MAX_ENTRIES', '20000'))},
+    },
+}
+# Cache alias for generated messages; empty disables the response cache
+LLM_RESPONSE_CACHE = os.getenv('LLM_RESPONSE_CACHE', 'llm_responses')
+
+# Embedding cache (shared by all workers; see accounting.services.embedding_cache)
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', str(BASE_DIR / 'embedding_cache.sqlite3'))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '20000'))
+
+# Precompiled centroid artifact (build with `python manage.py build_centroids`)
+CENTROID_ARTIFACT_DIR = os.getenv('CENTROID_ARTIFACT_DIR', str(BASE_DIR / 'artifacts' / 'centroids'))
+
+# Embedding backend fallback chain; the first available backend is used
+EMBEDDING_BACKENDS = os.getenv('EMBEDDING_BACKENDS', 'openai,local')
+
+# Uploaded workbooks
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media'))
+MEDIA_URL = 'media/'
+
+# Background classification jobs: 'local' (process pool in the web process)
+# or 'db' (queued rows, run by `python manage.py classification_worker`)
+CLASSIFICATION_JOB_RUNNER = os.getenv('CLASSIFICATION_JOB_RUNNER', 'local')
+CLASSIFICATION_JOB_WORKERS = int(os.getenv('CLASSIFICATION_JOB_WORKERS', '2'))
+# A running job's worker renews its lease while alive; jobs whose lease expired (worker killed,
+# web process restarted) are queued again, and failed after this many attempts
+CLASSIFICATION_JOB_LEASE_SECONDS = float(os.getenv('CLASSIFICATION_JOB_LEASE_SECONDS', '300'))
+CLASSIFICATION_JOB_MAX_ATTEMPTS = int(os.getenv('CLASSIFICATION_JOB_MAX_ATTEMPTS', '3'))
+CLASSIFICATION_SAMPLES_PER_COLUMN = int(os.getenv('CLASSIFICATION_SAMPLES_PER_COLUMN', '10'))
+CLASSIFICATION_THRESHOLD = float(os.getenv('CLASSIFICATION_THRESHOLD', '0.6'))
+# Optional cap on estimated tokens per column embedding payload (header + samples); 0 (default)
+# keeps every selected sample, only CLASSIFICATION_SAMPLES_PER_COLUMN limits them. Pick a value
+# from a `benchmark_classifier --sample-tokens` run against the production embedder. Also how
+# many candidate values per sample are read for the sampler to choose from.
+CLASSIFICATION_SAMPLE_TOKENS = int(os.getenv('CLASSIFICATION_SAMPLE_TOKENS', '0'))
+CLASSIFICATION_SAMPLE_CANDIDATES = int(os.getenv('CLASSIFICATION_SAMPLE_CANDIDATES', '5'))
+
+# Outbound messaging (see messaging.services.dispatcher); gateways are dotted paths per channel.
+# Unset channels have no gateway and dispatch for them fails; for local development set e.g.
+# MESSAGING_SMS_GATEWAY=messaging.services.gateways.FakeGateway (accepts and "delivers" everything).
+MESSAGING_GATEWAYS = {
+    'sms': os.getenv('MESSAGING_SMS_GATEWAY', ''),
+    'whatsapp': os.getenv('MESSAGING_WHATSAPP_GATEWAY', ''),
+}
+# Messages per second, per channel
+MESSAGING_RATE_LIMITS = {
+    'sms': float(os.getenv('MESSAGING_SMS_RATE', '100')),
+    'whatsapp': float(os.getenv('MESSAGING_WHATSAPP_RATE', '20')),
+}
+MESSAGING_DEFAULT_RATE = float(os.getenv('MESSAGING_DEFAULT_RATE', '10'))
+MESSAGING_BATCH_SIZE = int(os.getenv('MESSAGING_BATCH_SIZE', '100'))
+MESSAGING_MAX_ATTEMPTS = int(os.getenv('MESSAGING_MAX_ATTEMPTS', '5'))
+MESSAGING_RETRY_BASE_SECONDS = float(os.getenv('MESSAGING_RETRY_BASE_SECONDS', '30'))
+MESSAGING_RETRY_MAX_SECONDS = float(os.getenv('MESSAGING_RETRY_MAX_SECONDS', '900'))
+MESSAGING_LEASE_SECONDS = float(os.getenv('MESSAGING_LEASE_SECONDS', '300'))
+
+# Inbound replies (see messaging.services.replies): webhook writes are buffered and flushed in bulk.
+# The webhook's 202 is not durable: replies buffered by a worker that is killed before flushing are
+# lost. 0 writes them inside the request instead (503 on failure, so the gateway redelivers).
+MESSAGING_REPLY_BUFFER_SIZE = int(os.getenv('MESSAGING_REPLY_BUFFER_SIZE', '500'))
+MESSAGING_REPLY_FLUSH_SECONDS = float(os.getenv('MESSAGING_REPLY_FLUSH_SECONDS', '1.0'))
+# Replies whose write kept failing, one webhook payload per line (post them to the webhook to replay);
+# empty logs them instead
+MESSAGING_REPLY_DEAD_LETTER_PATH = os.getenv('MESSAGING_REPLY_DEAD_LETTER_PATH',
+                                             str(BASE_DIR / 'reply_dead_letter.jsonl'))
+# Shared secret expected in the X-Webhook-Token header; empty accepts any caller
+MESSAGING_WEBHOOK_TOKEN = os.getenv('MESSAGING_WEBHOOK_TOKEN', '')
+MESSAGING_REPLIES_PAGE_SIZE = int(os.getenv('MESSAGING_REPLIES_PAGE_SIZE', '50'))
+
+# Columnar workbook cache behind the preview API (see accounting.services.workbook_cache); sheets are
+# converted by the CLASSIFICATION_JOB_RUNNER runners, not in the upload request
+WORKBOOK_CACHE_DIR = os.getenv('WORKBOOK_CACHE_DIR', str(BASE_DIR / 'workbook_cache'))
+WORKBOOK_CACHE_MAX_BYTES = int(os.getenv('WORKBOOK_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+WORKBOOK_PREVIEW_MAX_ROWS = int(os.getenv('WORKBOOK_PREVIEW_MAX_ROWS', '1000'))
+
+# Metrics (see accounting.services.metrics), scraped from /metrics in Prometheus text format
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+# One JSON log line per stage timing and request on the "bts.metrics" logger
+METRICS_LOG = os.getenv('METRICS_LOG', 'false').lower() in ('1', 'true', 'yes', 'on')
+# Per-process snapshots, summed on scrape (web workers, classification pool and workers); empty: this process only
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '10'))
+# Bearer token required by /metrics; empty allows any caller
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
@@ -15,8 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from .views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/accounting/', include('accounting.urls')),
+    path('api/messaging/', include('messaging.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,18 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from accounting.services import metrics
+
+
+def metrics_view(request):
+    """Prometheus text exposition of `accounting.services.metrics`; METRICS_TOKEN, if set, as a bearer token."""
+    token = settings.METRICS_TOKEN
+    if token:
+        given = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(given.encode(), token.encode()):
+            return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    if not metrics.enabled():
+        return HttpResponse("Metrics are disabled.\n", status=404, content_type="text/plain")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
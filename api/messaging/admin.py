@@ -1,3 +1,28 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import InboundReply, MessageBatch, OutboundMessage
+
+
+@admin.register(MessageBatch)
+class MessageBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "channel", "total", "created_at")
+    list_filter = ("channel",)
+    search_fields = ("name",)
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "channel", "status", "attempts", "next_attempt_at", "sent_at", "delivered_at")
+    list_filter = ("channel", "status")
+    search_fields = ("recipient", "idempotency_key", "gateway_message_id")
+    readonly_fields = ("idempotency_key", "created_at", "updated_at", "sent_at", "delivered_at")
+    raw_id_fields = ("batch", "debtor")
+
+
+@admin.register(InboundReply)
+class InboundReplyAdmin(admin.ModelAdmin):
+    list_display = ("sender", "channel", "status", "received_at", "debtor")
+    list_filter = ("channel", "status")
+    search_fields = ("sender", "provider_reply_id")
+    readonly_fields = ("provider_reply_id", "received_at", "created_at")
+    raw_id_fields = ("outbound", "debtor")
@@ -0,0 +1,47 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from messaging.services.dispatcher import Dispatcher
+
+
+class Command(BaseCommand):
+    help = ("Send queued outbound messages, one rate-limited dispatcher thread per channel. "
+            "Several processes can run side by side.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channel", action="append", dest="channels",
+                            help="Channel to dispatch (repeatable; default: every configured gateway).")
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Messages claimed per gateway call (default MESSAGING_BATCH_SIZE, "
+                                 "capped at the channel's rate).")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to wait when nothing is due (default 1).")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once nothing is due instead of polling.")
+
+    def handle(self, *args, **options):
+        channels = options["channels"] or list(settings.MESSAGING_GATEWAYS)
+        stop = threading.Event()
+        results = {}
+
+        def run(channel):
+            dispatcher = Dispatcher(channel, batch_size=options["batch_size"])
+            results[channel] = dispatcher.run(once=options["once"], poll_interval=options["poll_interval"],
+                                              stop=stop)
+
+        threads = [threading.Thread(target=run, args=(c,), name=f"dispatch-{c}") for c in channels]
+        self.stdout.write(f"Dispatching {', '.join(channels)}.")
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for t in threads:
+                t.join()
+        for channel, stats in results.items():
+            self.stdout.write(f"{channel}: {stats}")
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:37
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounting', '0003_debtoraccount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('channel', models.CharField(max_length=20)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Messages queued (duplicates excluded).')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Message batch',
+                'verbose_name_plural': 'Message batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('whatsapp', 'WhatsApp')], default='sms', max_length=20)),
+                ('recipient', models.CharField(help_text='E.164 phone number or channel address.', max_length=255)),
+                ('body', models.TextField()),
+                ('idempotency_key', models.CharField(help_text='Enqueueing the same key twice is a no-op; also passed to the gateway.', max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Lease of the dispatcher sending it; expired leases are retried.', null=True)),
+                ('gateway_message_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='messaging.messagebatch')),
+                ('debtor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbound_messages', to='accounting.debtoraccount')),
+            ],
+            options={
+                'verbose_name': 'Outbound message',
+                'verbose_name_plural': 'Outbound messages',
+                'indexes': [models.Index(fields=['channel', 'status', 'next_attempt_at'], name='messaging_o_channel_784025_idx'), models.Index(fields=['batch', 'status'], name='messaging_o_batch_i_7e1241_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_debtoraccount'),
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboundReply',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('whatsapp', 'WhatsApp')], default='sms', max_length=20)),
+                ('sender', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('provider_reply_id', models.CharField(blank=True, help_text="Gateway's id for the reply; redelivered webhooks are ignored.", max_length=100, null=True, unique=True)),
+                ('status', models.CharField(choices=[('new', 'New'), ('read', 'Read'), ('handled', 'Handled')], default='new', max_length=10)),
+                ('received_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Inbound reply',
+                'verbose_name_plural': 'Inbound replies',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboundmessage',
+            index=models.Index(fields=['recipient', '-sent_at'], name='messaging_o_recipie_6500db_idx'),
+        ),
+        migrations.AddField(
+            model_name='inboundreply',
+            name='debtor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='accounting.debtoraccount'),
+        ),
+        migrations.AddField(
+            model_name='inboundreply',
+            name='outbound',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='messaging.outboundmessage'),
+        ),
+        migrations.AddIndex(
+            model_name='inboundreply',
+            index=models.Index(fields=['-received_at', '-id'], name='reply_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inboundreply',
+            index=models.Index(fields=['debtor', '-received_at', '-id'], name='reply_debtor_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inboundreply',
+            index=models.Index(fields=['status', '-received_at', '-id'], name='reply_status_received_idx'),
+        ),
+    ]
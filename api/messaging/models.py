@@ -1,3 +1,128 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+
+
+class MessageBatch(models.Model):
+    """
+    One bulk send (e.g. a reminder campaign). Its messages are queued as
+    `OutboundMessage` rows and sent by the dispatcher (see
+    messaging.services.dispatcher), not by the request that created it.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255, blank=True)
+    channel = models.CharField(max_length=20)
+    total = models.PositiveIntegerField(default=0, help_text="Messages queued (duplicates excluded).")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name or self.id} ({self.channel}, {self.total})"
+
+    class Meta:
+        verbose_name = "Message batch"
+        verbose_name_plural = "Message batches"
+        ordering = ["-created_at"]
+
+
+class OutboundMessage(models.Model):
+    """
+    One queued message and its delivery state:
+    queued -> sending -> sent -> delivered, or failed. Transient gateway errors
+    put it back to queued with a later `next_attempt_at`.
+    """
+    SMS = "sms"
+    WHATSAPP = "whatsapp"
+    CHANNEL_CHOICES = [
+        (SMS, "SMS"),
+        (WHATSAPP, "WhatsApp"),
+    ]
+
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (DELIVERED, "Delivered"),
+        (FAILED, "Failed"),
+    ]
+
+    batch = models.ForeignKey(MessageBatch, null=True, blank=True, on_delete=models.CASCADE,
+                              related_name="messages")
+    debtor = models.ForeignKey("accounting.DebtorAccount", null=True, blank=True, on_delete=models.SET_NULL,
+                               related_name="outbound_messages")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default=SMS)
+    recipient = models.CharField(max_length=255, help_text="E.164 phone number or channel address.")
+    body = models.TextField()
+    idempotency_key = models.CharField(max_length=64, unique=True,
+                                       help_text="Enqueueing the same key twice is a no-op; "
+                                                 "also passed to the gateway.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True,
+                                        help_text="Lease of the dispatcher sending it; expired leases are retried.")
+    gateway_message_id = models.CharField(max_length=100, blank=True, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+    class Meta:
+        verbose_name = "Outbound message"
+        verbose_name_plural = "Outbound messages"
+        indexes = [
+            models.Index(fields=["channel", "status", "next_attempt_at"]),
+            models.Index(fields=["batch", "status"]),
+            models.Index(fields=["recipient", "-sent_at"]),  # links replies without a provider reference
+        ]
+
+
+class InboundReply(models.Model):
+    """
+    A debtor's reply, received through the gateway webhook and written in
+    buffered bulk inserts (see messaging.services.replies).
+    """
+    NEW = "new"
+    READ = "read"
+    HANDLED = "handled"
+    STATUS_CHOICES = [
+        (NEW, "New"),
+        (READ, "Read"),
+        (HANDLED, "Handled"),
+    ]
+
+    outbound = models.ForeignKey(OutboundMessage, null=True, blank=True, on_delete=models.SET_NULL,
+                                 related_name="replies")
+    debtor = models.ForeignKey("accounting.DebtorAccount", null=True, blank=True, on_delete=models.SET_NULL,
+                               related_name="replies")
+    channel = models.CharField(max_length=20, choices=OutboundMessage.CHANNEL_CHOICES,
+                               default=OutboundMessage.SMS)
+    sender = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    provider_reply_id = models.CharField(max_length=100, null=True, blank=True, unique=True,
+                                         help_text="Gateway's id for the reply; redelivered webhooks are ignored.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=NEW)
+    received_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sender}: {self.body[:40]}"
 
-# Create your models here.
+    class Meta:
+        verbose_name = "Inbound reply"
+        verbose_name_plural = "Inbound replies"
+        # keyset pagination walks (received_at, id) descending, optionally within a debtor or status
+        indexes = [
+            models.Index(fields=["-received_at", "-id"], name="reply_received_idx"),
+            models.Index(fields=["debtor", "-received_at", "-id"], name="reply_debtor_received_idx"),
+            models.Index(fields=["status", "-received_at", "-id"], name="reply_status_received_idx"),
+        ]
@@ -0,0 +1,78 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ReceivedAtKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over (received_at, id), newest first. The
+    cursor is the last row's key, so every page is one index range scan
+    (`received_at <= t`, ties broken by id) whatever its depth, unlike
+    OFFSET, which reads and discards every earlier row.
+    """
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, settings.MESSAGING_REPLIES_PAGE_SIZE))
+        except ValueError:
+            size = settings.MESSAGING_REPLIES_PAGE_SIZE
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, received_at: datetime, pk: int) -> str:
+        return base64.urlsafe_b64encode(f"{received_at.isoformat()}|{pk}".encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            received_at, pk = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            return datetime.fromisoformat(received_at), int(pk)
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        queryset = queryset.order_by("-received_at", "-id")
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            received_at, pk = cursor
+            queryset = queryset.filter(received_at__lte=received_at).exclude(received_at=received_at, id__gte=pk)
+        rows = list(queryset[:size + 1])
+        self.next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            self.next_cursor = self.encode_cursor(rows[-1].received_at, rows[-1].pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "first": self.get_first_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "first": {"type": "string", "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+from .models import InboundReply, MessageBatch, OutboundMessage
+from .services.dispatcher import batch_status_counts
+
+
+class MessageBatchCreateSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
+    channel = serializers.ChoiceField(choices=OutboundMessage.CHANNEL_CHOICES, default=OutboundMessage.SMS)
+    messages = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_messages(self, value):
+        # plain checks rather than a nested serializer: batches run to tens of thousands of items
+        errors = {}
+        for i, item in enumerate(value):
+            recipient, body = item.get("recipient"), item.get("body")
+            if not isinstance(recipient, str) or not recipient.strip() or len(recipient) > 255:
+                errors[i] = "recipient must be a non-empty string of at most 255 characters."
+            elif not isinstance(body, str) or not body.strip():
+                errors[i] = "body must be a non-empty string."
+            elif item.get("debtor_id") is not None and not isinstance(item["debtor_id"], int):
+                errors[i] = "debtor_id must be an integer."
+            elif item.get("idempotency_key") is not None and (
+                    not isinstance(item["idempotency_key"], str) or len(item["idempotency_key"]) > 64):
+                errors[i] = "idempotency_key must be a string of at most 64 characters."
+            if len(errors) >= 20:
+                break
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+
+class MessageBatchSerializer(serializers.ModelSerializer):
+    status_counts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MessageBatch
+        fields = ["id", "name", "channel", "total", "status_counts", "created_at"]
+        read_only_fields = fields
+
+    def get_status_counts(self, obj):
+        return batch_status_counts(obj)
+
+
+class InboundReplySerializer(serializers.ModelSerializer):
+    account_code = serializers.SerializerMethodField()
+
+    class Meta:
+        model = InboundReply
+        fields = ["id", "outbound", "debtor", "account_code", "channel", "sender", "body", "status",
+                  "received_at"]
+        read_only_fields = fields
+
+    def get_account_code(self, obj):
+        return obj.debtor.account_code if obj.debtor_id else None
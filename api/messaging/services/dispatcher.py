@@ -0,0 +1,315 @@
+"""
+Outbound message queue and dispatcher.
+
+Requests only enqueue: `create_batch` / `enqueue_messages` write
+`OutboundMessage` rows (deduplicated by idempotency key). Sending happens in
+`python manage.py dispatch_messages`, which runs one `Dispatcher` per channel:
+
+  - claims due messages in batches (`select_for_update(skip_locked)` plus a
+    status-guarded update, with a lease so a crashed dispatcher's messages
+    are picked up again)
+  - paces sends with a per-channel token bucket (MESSAGING_RATE_LIMITS,
+    messages per second)
+  - sends through the channel's gateway; transient failures are re-queued
+    with jittered backoff until MESSAGING_MAX_ATTEMPTS, permanent ones fail
+  - applies the gateway's delivery reports (sent -> delivered / failed)
+
+The idempotency key also goes to the gateway, so a message re-sent after an
+expired lease is not delivered twice by providers that honour it.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounting.services.async_classify import RetryPolicy
+from messaging.models import MessageBatch, OutboundMessage
+from messaging.services.gateways import (
+    BaseGateway,
+    DeliveryReport,
+    OutgoingMessage,
+    SendResult,
+    get_gateway,
+)
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+ENQUEUE_CHUNK_SIZE = 5_000
+
+# Written per row with executemany: bulk_create / bulk_update compile SQL per
+# value and dominated dispatch time at campaign sizes
+INSERT_FIELDS = ["batch", "debtor", "channel", "recipient", "body", "idempotency_key", "status", "attempts",
+                 "next_attempt_at", "gateway_message_id", "last_error", "created_at", "updated_at"]
+RESULT_FIELDS = ["status", "attempts", "locked_until", "gateway_message_id", "sent_at", "next_attempt_at",
+                 "last_error", "updated_at"]
+
+
+def retry_policy() -> RetryPolicy:
+    return RetryPolicy(max_retries=settings.MESSAGING_MAX_ATTEMPTS - 1,
+                       base_delay=settings.MESSAGING_RETRY_BASE_SECONDS,
+                       max_delay=settings.MESSAGING_RETRY_MAX_SECONDS)
+
+
+def make_idempotency_key(channel: str, recipient: str, body: str, scope: str = "") -> str:
+    """Default key: the same text to the same recipient within `scope` (e.g. a batch) is sent once."""
+    return hashlib.sha256(f"{scope}\x00{channel}\x00{recipient}\x00{body}".encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Enqueueing
+# -------------------------------
+
+def _columns(fields: List[str]) -> List[str]:
+    qn = connection.ops.quote_name
+    return [qn(OutboundMessage._meta.get_field(f).column) for f in fields]
+
+
+def _insert_statement() -> str:
+    qn = connection.ops.quote_name
+    return (
+        f"INSERT INTO {qn(OutboundMessage._meta.db_table)} ({', '.join(_columns(INSERT_FIELDS))}) "
+        f"VALUES ({', '.join(['%s'] * len(INSERT_FIELDS))}) "
+        f"ON CONFLICT ({_columns(['idempotency_key'])[0]}) DO NOTHING"
+    )
+
+
+def _update_statement(fields: List[str]) -> str:
+    qn = connection.ops.quote_name
+    return (
+        f"UPDATE {qn(OutboundMessage._meta.db_table)} SET "
+        + ", ".join(f"{c} = %s" for c in _columns(fields))
+        + f" WHERE {qn('id')} = %s"
+    )
+
+
+def enqueue_messages(channel: str, messages: Iterable[Mapping], batch: Optional[MessageBatch] = None,
+                     chunk_size: int = ENQUEUE_CHUNK_SIZE) -> dict:
+    """
+    Queue messages ({"recipient", "body", optional "debtor_id" and
+    "idempotency_key"}); keys already queued, now or before, are skipped.
+    """
+    scope = str(batch.pk) if batch is not None else ""
+    batch_id = MessageBatch._meta.pk.get_db_prep_value(batch.pk, connection) if batch is not None else None
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = _insert_statement()
+    stats = {"queued": 0, "duplicates": 0}
+    chunk: Dict[str, tuple] = {}
+
+    def flush():
+        if not chunk:
+            return
+        existing = set(OutboundMessage.objects.filter(idempotency_key__in=list(chunk))
+                       .values_list("idempotency_key", flat=True))
+        rows = [row for key, row in chunk.items() if key not in existing]
+        # ON CONFLICT DO NOTHING covers a concurrent enqueue of the same key
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        stats["queued"] += len(rows)
+        stats["duplicates"] += len(existing)
+        chunk.clear()
+
+    for item in messages:
+        recipient, body = item["recipient"], item["body"]
+        key = item.get("idempotency_key") or make_idempotency_key(channel, recipient, body, scope)
+        if key in chunk:
+            stats["duplicates"] += 1
+            continue
+        chunk[key] = (batch_id, item.get("debtor_id"), channel, recipient, body, key,
+                      OutboundMessage.QUEUED, 0, now, "", "", now, now)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return stats
+
+
+def create_batch(channel: str, messages: Iterable[Mapping], name: str = "") -> Tuple[MessageBatch, dict]:
+    with transaction.atomic():
+        batch = MessageBatch.objects.create(name=name, channel=channel)
+        stats = enqueue_messages(channel, messages, batch=batch)
+        batch.total = stats["queued"]
+        batch.save(update_fields=["total"])
+    return batch, stats
+
+
+def batch_status_counts(batch: MessageBatch) -> Dict[str, int]:
+    counts = {status: 0 for status, _ in OutboundMessage.STATUS_CHOICES}
+    for row in batch.messages.values("status").annotate(n=Count("id")):
+        counts[row["status"]] = row["n"]
+    return counts
+
+
+# -------------------------------
+# Claiming and state updates
+# -------------------------------
+
+def _claimable(now) -> Q:
+    return (Q(status=OutboundMessage.QUEUED, next_attempt_at__lte=now)
+            | Q(status=OutboundMessage.SENDING, locked_until__lt=now))
+
+
+def claim_messages(channel: str, limit: int, lease_seconds: float) -> List[OutboundMessage]:
+    """Atomically lease up to `limit` due messages of `channel` to this dispatcher."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=lease_seconds)
+    with transaction.atomic():
+        ids = list(OutboundMessage.objects
+                   .select_for_update(skip_locked=True)
+                   .filter(_claimable(now), channel=channel)
+                   .order_by("next_attempt_at")
+                   .values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        # the status guard keeps the claim safe where row locks are unsupported (SQLite);
+        # the lease timestamp identifies the rows this call won
+        (OutboundMessage.objects
+         .filter(_claimable(now), id__in=ids)
+         .update(status=OutboundMessage.SENDING, locked_until=lease))
+    return list(OutboundMessage.objects.filter(id__in=ids, status=OutboundMessage.SENDING, locked_until=lease))
+
+
+def apply_send_results(messages: Sequence[OutboundMessage], results: Sequence[SendResult],
+                       retry: RetryPolicy) -> Dict[str, int]:
+    by_key = {r.idempotency_key: r for r in results}
+    now = timezone.now()
+    adapt = connection.ops.adapt_datetimefield_value
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    for m in messages:
+        result = by_key.get(m.idempotency_key) or SendResult(m.idempotency_key, False,
+                                                             error="no result from gateway", retryable=True)
+        m.attempts += 1
+        m.locked_until = None
+        if result.ok:
+            m.status = OutboundMessage.SENT
+            m.gateway_message_id = result.gateway_message_id
+            m.sent_at = now
+            m.last_error = ""
+            counts["sent"] += 1
+        elif result.retryable and m.attempts <= retry.max_retries:
+            m.status = OutboundMessage.QUEUED
+            m.next_attempt_at = now + timedelta(seconds=retry.delay(m.attempts - 1))
+            m.last_error = result.error
+            counts["retried"] += 1
+        else:
+            m.status = OutboundMessage.FAILED
+            m.last_error = result.error
+            counts["failed"] += 1
+        m.updated_at = now
+    rows = [(m.status, m.attempts, adapt(m.locked_until), m.gateway_message_id, adapt(m.sent_at),
+             adapt(m.next_attempt_at), m.last_error, adapt(m.updated_at), m.pk) for m in messages]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_update_statement(RESULT_FIELDS), rows)
+    return counts
+
+
+def apply_delivery_reports(reports: Iterable[DeliveryReport]) -> Dict[str, int]:
+    """Move sent messages to delivered / failed from gateway reports (polled or webhook)."""
+    now = timezone.now()
+    delivered: List[str] = []
+    undelivered: Dict[str, List[str]] = {}
+    for r in reports:
+        if r.delivered:
+            delivered.append(r.gateway_message_id)
+        else:
+            undelivered.setdefault(r.error or "undelivered", []).append(r.gateway_message_id)
+
+    sent = OutboundMessage.objects.filter(status=OutboundMessage.SENT)
+    counts = {"delivered": 0, "undelivered": 0}
+    if delivered:
+        counts["delivered"] = sent.filter(gateway_message_id__in=delivered).update(
+            status=OutboundMessage.DELIVERED, delivered_at=now, updated_at=now)
+    for error, ids in undelivered.items():
+        counts["undelivered"] += sent.filter(gateway_message_id__in=ids).update(
+            status=OutboundMessage.FAILED, last_error=error, updated_at=now)
+    return counts
+
+
+# -------------------------------
+# Dispatcher
+# -------------------------------
+
+class RateLimiter:
+    """Blocking token bucket: `rate` messages per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def acquire(self, tokens: int = 1) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens
+        if self.tokens < 0:
+            # a batch larger than the bucket runs into debt and waits it off
+            time.sleep(-self.tokens / self.rate)
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        channel: str,
+        gateway: Optional[BaseGateway] = None,
+        rate: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        retry: Optional[RetryPolicy] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.channel = channel
+        self.gateway = gateway or get_gateway(channel)
+        rate = rate or settings.MESSAGING_RATE_LIMITS.get(channel, settings.MESSAGING_DEFAULT_RATE)
+        self.limiter = RateLimiter(rate)
+        # no claimed batch should wait longer than about a second for its tokens
+        self.batch_size = batch_size or max(1, min(settings.MESSAGING_BATCH_SIZE, int(rate)))
+        self.retry = retry or retry_policy()
+        self.lease_seconds = lease_seconds or settings.MESSAGING_LEASE_SECONDS
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "delivered": 0, "undelivered": 0, "batches": 0}
+
+    def _count(self, counts: Dict[str, int]) -> None:
+        for name, n in counts.items():
+            self.stats[name] += n
+
+    def run_once(self) -> int:
+        """Send one claimed batch; returns the number of messages claimed (0: nothing due)."""
+        messages = claim_messages(self.channel, self.batch_size, self.lease_seconds)
+        if messages:
+            self.limiter.acquire(len(messages))
+            outgoing = [OutgoingMessage(m.idempotency_key, m.recipient, m.body) for m in messages]
+            try:
+                results = self.gateway.send_batch(outgoing)
+            except Exception as e:
+                results = [SendResult(m.idempotency_key, False, error=f"{type(e).__name__}: {e}", retryable=True)
+                           for m in outgoing]
+            self._count(apply_send_results(messages, results, self.retry))
+            self.stats["batches"] += 1
+        self._count(apply_delivery_reports(self.gateway.delivery_reports()))
+        return len(messages)
+
+    def run(self, once: bool = False, poll_interval: float = 1.0,
+            stop: Optional[threading.Event] = None) -> dict:
+        """Dispatch until stopped, or until nothing is due when `once`."""
+        stop = stop or threading.Event()
+        started = time.perf_counter()
+        try:
+            while not stop.is_set():
+                if self.run_once():
+                    continue
+                if once:
+                    break
+                stop.wait(poll_interval)
+        finally:
+            close_old_connections()
+        seconds = time.perf_counter() - started
+        return {**self.stats, "seconds": round(seconds, 3),
+                "per_second": round(self.stats["sent"] / seconds, 1) if seconds else 0.0}
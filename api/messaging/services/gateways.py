@@ -0,0 +1,136 @@
+"""
+Outbound message gateways.
+
+A gateway sends a batch of messages on one channel and reports a
+`SendResult` per message; the dispatcher owns queueing, rate limits and
+retries. Gateways are configured per channel in MESSAGING_GATEWAYS (dotted
+paths) and built once per process by `get_gateway`.
+
+`FakeGateway` is the local stand-in: it accepts everything after an optional
+latency, injects transient / permanent failures, honours idempotency keys
+like a real provider (a resent key returns the original message id) and
+produces delivery reports for what it sent.
+"""
+
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class OutgoingMessage:
+    idempotency_key: str
+    recipient: str
+    body: str
+
+
+@dataclass
+class SendResult:
+    idempotency_key: str
+    ok: bool
+    gateway_message_id: str = ""
+    error: str = ""
+    retryable: bool = False  # transient failure (throttled, provider down): try again later
+
+
+@dataclass
+class DeliveryReport:
+    gateway_message_id: str
+    delivered: bool
+    error: str = ""
+
+
+class BaseGateway:
+    """Gateways override `send` (one message) or `send_batch` (provider bulk APIs)."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    def send(self, message: OutgoingMessage) -> SendResult:
+        raise NotImplementedError
+
+    def send_batch(self, messages: Sequence[OutgoingMessage]) -> List[SendResult]:
+        return [self.send(m) for m in messages]
+
+    def delivery_reports(self) -> List[DeliveryReport]:
+        """Reports collected since the last call, for gateways that are polled rather than calling back."""
+        return []
+
+
+class FakeGateway(BaseGateway):
+    def __init__(
+        self,
+        channel: str,
+        latency: float = 0.0,
+        transient_error_rate: float = 0.0,
+        permanent_error_rate: float = 0.0,
+        undelivered_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(channel)
+        self.latency = latency
+        self.transient_error_rate = transient_error_rate
+        self.permanent_error_rate = permanent_error_rate
+        self.undelivered_rate = undelivered_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.sent: Dict[str, str] = {}  # idempotency key -> gateway message id
+        self.calls = 0
+        self._reports: List[DeliveryReport] = []
+
+    def send_batch(self, messages: Sequence[OutgoingMessage]) -> List[SendResult]:
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        with self._lock:
+            self.calls += 1
+            for m in messages:
+                if m.idempotency_key in self.sent:
+                    results.append(SendResult(m.idempotency_key, True, self.sent[m.idempotency_key]))
+                    continue
+                roll = self._rng.random()
+                if roll < self.transient_error_rate:
+                    results.append(SendResult(m.idempotency_key, False, error="throttled by fake gateway",
+                                              retryable=True))
+                elif roll < self.transient_error_rate + self.permanent_error_rate:
+                    results.append(SendResult(m.idempotency_key, False, error="invalid recipient"))
+                else:
+                    message_id = f"fake-{uuid.uuid4().hex}"
+                    self.sent[m.idempotency_key] = message_id
+                    results.append(SendResult(m.idempotency_key, True, message_id))
+                    delivered = self._rng.random() >= self.undelivered_rate
+                    self._reports.append(DeliveryReport(message_id, delivered,
+                                                        "" if delivered else "handset unreachable"))
+        return results
+
+    def send(self, message: OutgoingMessage) -> SendResult:
+        return self.send_batch([message])[0]
+
+    def delivery_reports(self) -> List[DeliveryReport]:
+        with self._lock:
+            reports, self._reports = self._reports, []
+        return reports
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+
+_gateways: Dict[str, BaseGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(channel: str) -> BaseGateway:
+    with _gateways_lock:
+        if channel not in _gateways:
+            path = settings.MESSAGING_GATEWAYS.get(channel)
+            if not path:
+                raise ValueError(f"No gateway configured for channel {channel!r}.")
+            _gateways[channel] = import_string(path)(channel)
+        return _gateways[channel]
@@ -0,0 +1,325 @@
+"""
+Inbound reply ingestion.
+
+The gateway webhook only validates and buffers: `ReplyBuffer.add` returns
+immediately and a per-process flusher thread writes the buffered replies
+when MESSAGING_REPLY_BUFFER_SIZE are pending or MESSAGING_REPLY_FLUSH_SECONDS
+have passed, whichever comes first. A batch whose write fails is retried
+with backoff up to MAX_WRITE_ATTEMPTS times and then dead-lettered: appended
+as webhook payloads to MESSAGING_REPLY_DEAD_LETTER_PATH (and logged), from
+where it can be posted to the webhook again. Replies that do not fit in the
+buffer are dead-lettered the same way.
+
+The webhook's 202 therefore does not mean the reply is stored: buffered
+replies live in worker memory until flushed, and are lost if the worker is
+killed (SIGKILL, OOM, a recycle that skips atexit) in between; gateways do
+not redeliver acknowledged webhooks. With MESSAGING_REPLY_FLUSH_SECONDS = 0
+replies are written inside the request instead, and a failed write answers
+503 so the gateway retries.
+
+Each flush links the whole batch with two indexed lookups (the provider id
+the reply answers -> `OutboundMessage.gateway_message_id`, else the
+sender's latest message -> `OutboundMessage.recipient`) and inserts it with
+one executemany `INSERT ... ON CONFLICT (provider_reply_id) DO NOTHING`, so
+webhook redeliveries are dropped.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from messaging.models import InboundReply, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Configuration
+# -------------------------------
+
+# Pending replies kept while the database is unreachable; beyond this, new replies are dead-lettered
+MAX_PENDING = 100_000
+
+# Writes of one batch before its replies are dead-lettered; retry i waits RETRY_BASE_SECONDS * 2**i
+MAX_WRITE_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 1.0
+
+INSERT_FIELDS = ["outbound", "debtor", "channel", "sender", "body", "provider_reply_id", "status",
+                 "received_at", "created_at"]
+
+CHANNELS = {c for c, _ in OutboundMessage.CHANNEL_CHOICES}
+
+
+# -------------------------------
+# Payloads
+# -------------------------------
+
+def parse_reply(payload: Mapping) -> dict:
+    """
+    Normalize one webhook reply:
+    {"from", "body", optional "id", "in_reply_to", "channel", "received_at"}.
+    Raises ValueError with the reason when it is unusable.
+    """
+    if not isinstance(payload, Mapping):
+        raise ValueError("reply must be an object.")
+    sender = payload.get("from")
+    if not isinstance(sender, str) or not sender.strip() or len(sender) > 255:
+        raise ValueError("from must be a non-empty string of at most 255 characters.")
+    body = payload.get("body", "")
+    if not isinstance(body, str):
+        raise ValueError("body must be a string.")
+    channel = payload.get("channel") or OutboundMessage.SMS
+    if channel not in CHANNELS:
+        raise ValueError(f"channel must be one of {', '.join(sorted(CHANNELS))}.")
+    provider_id = payload.get("id")
+    if provider_id is not None and (not isinstance(provider_id, (str, int)) or len(str(provider_id)) > 100):
+        raise ValueError("id must be a string of at most 100 characters.")
+    in_reply_to = payload.get("in_reply_to")
+    if in_reply_to is not None and not isinstance(in_reply_to, str):
+        raise ValueError("in_reply_to must be a string.")
+
+    received_at = timezone.now()
+    if payload.get("received_at"):
+        try:
+            received_at = parse_datetime(str(payload["received_at"]))
+        except ValueError:
+            received_at = None
+        if received_at is None:
+            raise ValueError("received_at must be an ISO 8601 datetime.")
+        if timezone.is_naive(received_at):
+            received_at = timezone.make_aware(received_at)
+    return {
+        "sender": sender.strip(),
+        "body": body,
+        "channel": channel,
+        "provider_reply_id": str(provider_id) if provider_id is not None else None,
+        "in_reply_to": in_reply_to or None,
+        "received_at": received_at,
+    }
+
+
+# -------------------------------
+# Bulk write
+# -------------------------------
+
+def _insert_statement() -> str:
+    qn = connection.ops.quote_name
+    opts = InboundReply._meta
+    columns = [qn(opts.get_field(f).column) for f in INSERT_FIELDS]
+    return (
+        f"INSERT INTO {qn(opts.db_table)} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({qn(opts.get_field('provider_reply_id').column)}) DO NOTHING"
+    )
+
+
+def _link(replies: List[dict]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """(outbound id, debtor id) per reply, from two lookups over the whole batch."""
+    by_gateway_id: Dict[str, Tuple[int, Optional[int]]] = {}
+    references = {r["in_reply_to"] for r in replies if r["in_reply_to"]}
+    if references:
+        for pk, gateway_id, debtor_id in (OutboundMessage.objects
+                                          .filter(gateway_message_id__in=references)
+                                          .values_list("id", "gateway_message_id", "debtor_id")):
+            by_gateway_id[gateway_id] = (pk, debtor_id)
+
+    by_recipient: Dict[str, Tuple[int, Optional[int]]] = {}
+    senders = {r["sender"] for r in replies if r["in_reply_to"] not in by_gateway_id}
+    if senders:
+        # newest first, so the first row seen per recipient is the message being answered
+        for pk, recipient, debtor_id in (OutboundMessage.objects
+                                         .filter(recipient__in=senders, sent_at__isnull=False)
+                                         .order_by("recipient", "-sent_at")
+                                         .values_list("id", "recipient", "debtor_id")):
+            by_recipient.setdefault(recipient, (pk, debtor_id))
+
+    return [by_gateway_id.get(r["in_reply_to"]) or by_recipient.get(r["sender"]) or (None, None)
+            for r in replies]
+
+
+def ingest_replies(replies: Iterable[dict]) -> int:
+    """Link and insert parsed replies (see `parse_reply`); returns how many were written."""
+    replies = list(replies)
+    if not replies:
+        return 0
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(timezone.now())
+    rows, seen = [], set()
+    for reply, (outbound_id, debtor_id) in zip(replies, _link(replies)):
+        provider_id = reply["provider_reply_id"]
+        if provider_id is not None:
+            if provider_id in seen:
+                continue
+            seen.add(provider_id)
+        rows.append((outbound_id, debtor_id, reply["channel"], reply["sender"], reply["body"], provider_id,
+                     InboundReply.NEW, adapt(reply["received_at"]), now))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_insert_statement(), rows)
+    return len(rows)
+
+
+# -------------------------------
+# Dead letters
+# -------------------------------
+
+_dead_letter_lock = threading.Lock()
+
+
+def _webhook_payload(reply: dict) -> dict:
+    """The webhook body `parse_reply` turns into `reply`, so dead letters can be posted again."""
+    return {"id": reply["provider_reply_id"], "from": reply["sender"], "body": reply["body"],
+            "channel": reply["channel"], "in_reply_to": reply["in_reply_to"],
+            "received_at": reply["received_at"].isoformat()}
+
+
+def dead_letter(replies: List[dict], reason: str) -> None:
+    """Append replies that could not be written to MESSAGING_REPLY_DEAD_LETTER_PATH, one JSON line each."""
+    if not replies:
+        return
+    lines = [json.dumps(_webhook_payload(r), ensure_ascii=False) for r in replies]
+    path = getattr(settings, "MESSAGING_REPLY_DEAD_LETTER_PATH", "")
+    logger.error("Dead-lettering %d replies (%s) to %s.", len(replies), reason, path or "the log")
+    if path:
+        try:
+            with _dead_letter_lock, open(path, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+            return
+        except OSError:
+            logger.exception("Writing the reply dead-letter file %s failed.", path)
+    for line in lines:
+        logger.error("Lost reply: %s", line)
+
+
+# -------------------------------
+# Buffer
+# -------------------------------
+
+@dataclass
+class _FailedBatch:
+    replies: List[dict]
+    attempts: int
+    retry_at: float  # time.monotonic()
+
+
+class ReplyBuffer:
+    def __init__(self, max_size: int, max_delay: float):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending: List[dict] = []
+        self._failed: List[_FailedBatch] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.written = 0
+        self.dead_lettered = 0
+
+    @property
+    def synchronous(self) -> bool:
+        return self.max_delay <= 0
+
+    def add(self, replies: List[dict]) -> None:
+        """Buffer `replies`; in synchronous mode write them now, raising on failure."""
+        if self.synchronous:
+            self.written += ingest_replies(replies)
+            return
+        overflow: List[dict] = []
+        with self._cond:
+            if self._pid != os.getpid():
+                # first use in this (possibly forked) worker: start its own flusher
+                self._pending, self._failed = [], []
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="reply-buffer", daemon=True)
+                self._thread.start()
+            room = max(MAX_PENDING - self._size(), 0)
+            if room < len(replies):
+                replies, overflow = replies[:room], replies[room:]
+                self.dead_lettered += len(overflow)
+            self._pending.extend(replies)
+            if len(self._pending) >= self.max_size:
+                self._cond.notify()
+        dead_letter(overflow, "reply buffer full")
+
+    def _size(self) -> int:
+        return len(self._pending) + sum(len(b.replies) for b in self._failed)
+
+    def _take(self, due_before: Optional[float]) -> Tuple[List[dict], List[_FailedBatch]]:
+        """Pending replies, and failed batches due for a retry (all of them when `due_before` is None)."""
+        taken, self._pending = self._pending, []
+        due = [b for b in self._failed if due_before is None or b.retry_at <= due_before]
+        self._failed = [b for b in self._failed if b not in due]
+        return taken, due
+
+    def _write(self, replies: List[dict], attempts: int = 0) -> None:
+        try:
+            self.written += ingest_replies(replies)
+            return
+        except Exception:
+            attempts += 1
+            logger.exception("Writing %d replies failed (attempt %d of %d).", len(replies), attempts,
+                             MAX_WRITE_ATTEMPTS)
+        finally:
+            close_old_connections()
+        if attempts >= MAX_WRITE_ATTEMPTS:
+            with self._cond:
+                self.dead_lettered += len(replies)
+            dead_letter(replies, f"write failed {attempts} times")
+            return
+        with self._cond:
+            self._failed.append(_FailedBatch(replies, attempts,
+                                             time.monotonic() + RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+    def _next_wait(self) -> float:
+        if not self._failed:
+            return self.max_delay
+        return max(0.0, min(self.max_delay, min(b.retry_at for b in self._failed) - time.monotonic()))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_size, timeout=self._next_wait())
+                replies, due = self._take(time.monotonic())
+            if replies:
+                self._write(replies)
+            for batch in due:
+                self._write(batch.replies, batch.attempts)
+
+    def flush(self) -> None:
+        """Write everything pending now, failed batches included (where a reply must be visible immediately)."""
+        with self._cond:
+            replies, due = self._take(None)
+        if replies:
+            self._write(replies)
+        for batch in due:
+            self._write(batch.replies, batch.attempts)
+
+    def close(self) -> None:
+        """At exit: flush, then dead-letter whatever still could not be written."""
+        self.flush()
+        with self._cond:
+            _, failed = self._take(None)
+            self.dead_lettered += sum(len(b.replies) for b in failed)
+        for batch in failed:
+            dead_letter(batch.replies, "write failed at shutdown")
+
+
+_buffer: Optional[ReplyBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_reply_buffer() -> ReplyBuffer:
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ReplyBuffer(settings.MESSAGING_REPLY_BUFFER_SIZE, settings.MESSAGING_REPLY_FLUSH_SECONDS)
+            atexit.register(_buffer.close)
+        return _buffer
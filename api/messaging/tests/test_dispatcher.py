@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounting.services.async_classify import RetryPolicy
+from messaging.models import MessageBatch, OutboundMessage
+from messaging.services import gateways
+from messaging.services.dispatcher import Dispatcher, claim_messages, create_batch, enqueue_messages
+from messaging.services.gateways import FakeGateway, OutgoingMessage, get_gateway
+
+FAKE_GATEWAYS = {"sms": "messaging.services.gateways.FakeGateway",
+                 "whatsapp": "messaging.services.gateways.FakeGateway"}
+
+
+def messages(n, prefix="Ödeme hatırlatması"):
+    return [{"recipient": f"+90532111{i:04d}", "body": f"{prefix} {i}"} for i in range(n)]
+
+
+class GatewayRegistryTests(TestCase):
+    def setUp(self):
+        gateways._gateways.clear()
+        self.addCleanup(gateways._gateways.clear)
+
+    @override_settings(MESSAGING_GATEWAYS={"sms": "", "whatsapp": ""})
+    def test_unconfigured_channel_raises(self):
+        with self.assertRaisesMessage(ValueError, "No gateway configured for channel 'sms'."):
+            get_gateway("sms")
+
+    @override_settings(MESSAGING_GATEWAYS=FAKE_GATEWAYS)
+    def test_configured_gateway_is_built_once(self):
+        gateway = get_gateway("sms")
+        self.assertIsInstance(gateway, FakeGateway)
+        self.assertIs(get_gateway("sms"), gateway)
+
+
+class EnqueueTests(TestCase):
+    def test_duplicates_within_a_batch_are_queued_once(self):
+        batch, stats = create_batch("sms", messages(3) + messages(2), name="Nisan")
+        self.assertEqual(stats, {"queued": 3, "duplicates": 2})
+        self.assertEqual(batch.total, 3)
+        self.assertEqual(batch.messages.count(), 3)
+
+    def test_explicit_idempotency_key_is_queued_once_across_calls(self):
+        item = {"recipient": "+905321110000", "body": "Merhaba", "idempotency_key": "campaign-7:120.001"}
+        self.assertEqual(enqueue_messages("sms", [item]), {"queued": 1, "duplicates": 0})
+        self.assertEqual(enqueue_messages("sms", [dict(item, body="Merhaba!")]), {"queued": 0, "duplicates": 1})
+        self.assertEqual(OutboundMessage.objects.get().body, "Merhaba")
+
+    def test_chunked_enqueue_keeps_every_message(self):
+        stats = enqueue_messages("sms", messages(25), chunk_size=4)
+        self.assertEqual(stats["queued"], 25)
+        self.assertEqual(OutboundMessage.objects.filter(status=OutboundMessage.QUEUED).count(), 25)
+
+
+class DispatcherTests(TestCase):
+    def dispatch(self, gateway, retry=None):
+        dispatcher = Dispatcher("sms", gateway=gateway, rate=1000, batch_size=10,
+                                retry=retry or RetryPolicy(max_retries=2, base_delay=0))
+        return dispatcher.run(once=True)
+
+    def test_sends_and_applies_delivery_reports(self):
+        batch, _ = create_batch("sms", messages(25))
+        gateway = FakeGateway("sms", seed=1)
+        stats = self.dispatch(gateway)
+        self.assertEqual(stats["sent"], 25)
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(stats["delivered"], 25)
+        self.assertEqual(gateway.calls, 3)
+        self.assertEqual(set(batch.messages.values_list("status", flat=True)), {OutboundMessage.DELIVERED})
+
+    def test_only_the_dispatchers_channel_is_claimed(self):
+        create_batch("sms", messages(2))
+        create_batch("whatsapp", messages(3))
+        self.assertEqual(self.dispatch(FakeGateway("sms"))["sent"], 2)
+        self.assertEqual(OutboundMessage.objects.filter(channel="whatsapp", status=OutboundMessage.QUEUED).count(), 3)
+
+    def test_transient_failures_are_retried_then_failed(self):
+        create_batch("sms", messages(2))
+        stats = self.dispatch(FakeGateway("sms", transient_error_rate=1.0),
+                              retry=RetryPolicy(max_retries=1, base_delay=0))
+        self.assertEqual(stats["retried"], 2)
+        self.assertEqual(stats["failed"], 2)
+        for m in OutboundMessage.objects.all():
+            self.assertEqual(m.status, OutboundMessage.FAILED)
+            self.assertEqual(m.attempts, 2)
+            self.assertEqual(m.last_error, "throttled by fake gateway")
+
+    def test_retried_messages_wait_for_their_backoff(self):
+        create_batch("sms", messages(1))
+        stats = self.dispatch(FakeGateway("sms", transient_error_rate=1.0),
+                              retry=RetryPolicy(max_retries=3, base_delay=60, max_delay=60))
+        self.assertEqual(stats["retried"], 1)
+        m = OutboundMessage.objects.get()
+        self.assertEqual(m.status, OutboundMessage.QUEUED)
+        self.assertEqual(m.attempts, 1)
+        self.assertGreaterEqual(m.next_attempt_at, m.updated_at)
+
+    def test_permanent_failures_are_not_retried(self):
+        create_batch("sms", messages(2))
+        stats = self.dispatch(FakeGateway("sms", permanent_error_rate=1.0))
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(list(OutboundMessage.objects.values_list("attempts", flat=True)), [1, 1])
+
+    def test_gateway_exception_requeues_the_batch(self):
+        create_batch("sms", messages(2))
+        gateway = FakeGateway("sms")
+        with mock.patch.object(gateway, "send_batch", side_effect=ConnectionError("provider down")):
+            stats = self.dispatch(gateway, retry=RetryPolicy(max_retries=3, base_delay=60, max_delay=60))
+        self.assertEqual(stats["retried"], 2)
+        self.assertTrue(all("provider down" in e for e in OutboundMessage.objects.values_list("last_error", flat=True)))
+
+    def test_resend_after_expired_lease_is_not_delivered_twice(self):
+        create_batch("sms", messages(3))
+        gateway = FakeGateway("sms")
+        # a dispatcher claims and sends, then dies before recording the results
+        claimed = claim_messages("sms", limit=10, lease_seconds=-1)
+        first_ids = {r.idempotency_key: r.gateway_message_id for r in gateway.send_batch(
+            [OutgoingMessage(m.idempotency_key, m.recipient, m.body) for m in claimed])}
+
+        stats = self.dispatch(gateway)
+        self.assertEqual(stats["sent"], 3)
+        self.assertEqual(len(gateway.sent), 3)
+        for m in OutboundMessage.objects.all():
+            self.assertEqual(m.gateway_message_id, first_ids[m.idempotency_key])
+
+    def test_live_lease_is_not_reclaimed(self):
+        create_batch("sms", messages(2))
+        self.assertEqual(len(claim_messages("sms", limit=10, lease_seconds=300)), 2)
+        self.assertEqual(claim_messages("sms", limit=10, lease_seconds=300), [])
+
+
+class MessageBatchAPITests(TestCase):
+    def test_create_and_poll_batch(self):
+        client = APIClient()
+        response = client.post("/api/messaging/batches/",
+                               {"name": "Nisan", "channel": "sms", "messages": messages(3) + messages(1)},
+                               format="json")
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data["total"], 3)
+        self.assertEqual(response.data["duplicates"], 1)
+
+        detail = client.get(f"/api/messaging/batches/{response.data['id']}/").data
+        self.assertEqual(detail["status_counts"][OutboundMessage.QUEUED], 3)
+
+    def test_invalid_items_are_reported_by_index(self):
+        response = APIClient().post("/api/messaging/batches/",
+                                    {"messages": [{"recipient": "+905321110000", "body": "ok"},
+                                                  {"recipient": "", "body": "x"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(1, response.data["messages"])
+        self.assertFalse(MessageBatch.objects.exists())
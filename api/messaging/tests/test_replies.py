@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounting.models import DebtorAccount
+from messaging.models import InboundReply, OutboundMessage
+from messaging.services import replies as reply_service
+from messaging.services.dispatcher import enqueue_messages
+from messaging.services.replies import ReplyBuffer, ingest_replies, parse_reply
+
+
+class ReplyIngestTests(TestCase):
+    def test_replies_are_linked_and_redeliveries_dropped(self):
+        debtor = DebtorAccount.objects.create(account_code="120.001", name="Müşteri")
+        enqueue_messages("sms", [{"recipient": "+905321110000", "body": "Hatırlatma", "debtor_id": debtor.pk}])
+        OutboundMessage.objects.update(status=OutboundMessage.SENT, gateway_message_id="gw-1",
+                                       sent_at=timezone.now())
+        outbound = OutboundMessage.objects.get()
+
+        replies = [parse_reply({"id": "r-1", "from": "+905321110000", "body": "Ödedim", "in_reply_to": "gw-1"}),
+                   parse_reply({"id": "r-2", "from": "+905321110000", "body": "Yarın"}),
+                   parse_reply({"id": "r-3", "from": "+905329999999", "body": "?"})]
+        ingest_replies(replies)
+        ingest_replies(replies[:1])  # webhook redelivery
+
+        self.assertEqual(InboundReply.objects.count(), 3)
+        linked = dict(InboundReply.objects.values_list("provider_reply_id", "outbound_id"))
+        self.assertEqual(linked, {"r-1": outbound.pk, "r-2": outbound.pk, "r-3": None})
+        self.assertEqual(InboundReply.objects.get(provider_reply_id="r-1").debtor_id, debtor.pk)
+
+    def test_webhook_buffers_valid_replies_and_reports_invalid_ones(self):
+        buffer = mock.Mock()
+        with mock.patch("messaging.views.get_reply_buffer", return_value=buffer):
+            response = APIClient().post("/api/messaging/replies/webhook/",
+                                        [{"from": "+905321110000", "body": "Tamam"}, {"body": "no sender"}],
+                                        format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["accepted"], 1)
+        self.assertEqual(list(response.data["rejected"]), [1])
+        (replies,), _ = buffer.add.call_args
+        self.assertEqual(replies[0]["sender"], "+905321110000")
+
+    @override_settings(MESSAGING_WEBHOOK_TOKEN="s3cret")
+    def test_webhook_checks_the_token(self):
+        response = APIClient().post("/api/messaging/replies/webhook/", {"from": "+90532", "body": "x"},
+                                    format="json", HTTP_X_WEBHOOK_TOKEN="wrong")
+        self.assertEqual(response.status_code, 403)
+
+
+class ReplyBufferTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.dead_letters = os.path.join(directory, "dead.jsonl")
+        patcher = override_settings(MESSAGING_REPLY_DEAD_LETTER_PATH=self.dead_letters)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.replies = [parse_reply({"id": f"r-{i}", "from": "+905321110000", "body": f"Ödedim {i}"})
+                        for i in range(3)]
+
+    def buffer(self):
+        buffer = ReplyBuffer(max_size=100, max_delay=60)
+        buffer._pid = os.getpid()  # no flusher thread; the test flushes
+        return buffer
+
+    def test_failed_batch_is_retried_then_dead_lettered(self):
+        buffer = self.buffer()
+        buffer.add(self.replies)
+        failing = mock.patch("messaging.services.replies.ingest_replies", side_effect=OperationalError("locked"))
+        with failing as ingest, mock.patch.object(reply_service, "RETRY_BASE_SECONDS", 0), \
+                self.assertLogs("messaging.services.replies", "ERROR"):
+            for _ in range(reply_service.MAX_WRITE_ATTEMPTS + 2):
+                buffer.flush()
+        self.assertEqual(ingest.call_count, reply_service.MAX_WRITE_ATTEMPTS)
+        self.assertEqual(buffer._size(), 0)
+        self.assertEqual(buffer.dead_lettered, 3)
+        with open(self.dead_letters, encoding="utf-8") as f:
+            payloads = [json.loads(line) for line in f]
+        self.assertEqual([p["id"] for p in payloads], ["r-0", "r-1", "r-2"])
+        # dead letters are webhook payloads, so they can be posted again
+        self.assertEqual(parse_reply(payloads[0])["body"], "Ödedim 0")
+
+    def test_batch_written_on_retry_is_not_dead_lettered(self):
+        buffer = self.buffer()
+        buffer.add(self.replies)
+        with mock.patch("messaging.services.replies.ingest_replies", side_effect=OperationalError("locked")), \
+                self.assertLogs("messaging.services.replies", "ERROR"):
+            buffer.flush()
+        buffer.flush()
+        self.assertEqual(InboundReply.objects.count(), 3)
+        self.assertEqual(buffer.dead_lettered, 0)
+        self.assertFalse(os.path.exists(self.dead_letters))
+
+    def test_overflow_is_dead_lettered(self):
+        buffer = self.buffer()
+        with mock.patch.object(reply_service, "MAX_PENDING", 2), self.assertLogs("messaging.services.replies", "ERROR"):
+            buffer.add(self.replies)
+        self.assertEqual(buffer._size(), 2)
+        self.assertEqual(buffer.dead_lettered, 1)
+
+    def test_close_dead_letters_what_still_fails(self):
+        buffer = self.buffer()
+        buffer.add(self.replies)
+        with mock.patch("messaging.services.replies.ingest_replies", side_effect=OperationalError("locked")), \
+                self.assertLogs("messaging.services.replies", "ERROR"):
+            buffer.close()
+        self.assertEqual(buffer.dead_lettered, 3)
+        self.assertEqual(buffer._size(), 0)
+
+    def test_synchronous_webhook_answers_503_when_the_write_fails(self):
+        with mock.patch("messaging.views.get_reply_buffer", return_value=ReplyBuffer(100, 0)), \
+                mock.patch("messaging.services.replies.ingest_replies", side_effect=OperationalError("locked")), \
+                self.assertLogs("messaging.views", "ERROR"):
+            response = APIClient().post("/api/messaging/replies/webhook/", {"from": "+90532", "body": "x"},
+                                        format="json")
+        self.assertEqual(response.status_code, 503)
+
+
+class ReplyPaginationTests(TestCase):
+    def setUp(self):
+        self.debtor = DebtorAccount.objects.create(account_code="120.001")
+        base = timezone.now().replace(microsecond=0)
+        # pairs share a received_at, so pages must break ties by id
+        self.replies = [
+            InboundReply.objects.create(sender=f"+90532{i}", body=str(i), received_at=base - timedelta(minutes=i // 2),
+                                        debtor=self.debtor if i % 3 == 0 else None,
+                                        status=InboundReply.HANDLED if i % 4 == 0 else InboundReply.NEW)
+            for i in range(11)
+        ]
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids.extend(r["id"] for r in response.data["results"])
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def expected(self, replies):
+        return [r.pk for r in sorted(replies, key=lambda r: (r.received_at, r.pk), reverse=True)]
+
+    def test_pages_cover_every_reply_once_newest_first(self):
+        ids, pages = self.walk("/api/messaging/replies/?page_size=3")
+        self.assertEqual(ids, self.expected(self.replies))
+        self.assertEqual(pages, 4)
+
+    def test_cursor_is_stable_when_newer_replies_arrive(self):
+        first = self.client.get("/api/messaging/replies/?page_size=4").data
+        InboundReply.objects.create(sender="+90", received_at=timezone.now() + timedelta(hours=1))
+        ids, _ = self.walk(first["next"])
+        self.assertEqual([r["id"] for r in first["results"]] + ids, self.expected(self.replies))
+
+    def test_filters_combine_with_pagination(self):
+        ids, _ = self.walk("/api/messaging/replies/?page_size=2&account_code=120.001")
+        self.assertEqual(ids, self.expected(r for r in self.replies if r.debtor_id))
+        ids, _ = self.walk("/api/messaging/replies/?page_size=2&status=handled")
+        self.assertEqual(ids, self.expected(r for r in self.replies if r.status == InboundReply.HANDLED))
+
+    def test_unknown_account_code_is_empty(self):
+        self.assertEqual(self.client.get("/api/messaging/replies/?account_code=nope").data["results"], [])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get("/api/messaging/replies/?cursor=not-a-cursor").status_code, 404)
+
+    def test_invalid_filters_are_400(self):
+        self.assertEqual(self.client.get("/api/messaging/replies/?debtor=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/messaging/replies/?received_after=yesterday").status_code, 400)
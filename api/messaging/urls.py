@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('batches/', views.MessageBatchCreateView.as_view(), name='message-batch-create'),
+    path('batches/<uuid:pk>/', views.MessageBatchDetailView.as_view(), name='message-batch-detail'),
+    path('replies/', views.InboundReplyListView.as_view(), name='reply-list'),
+    path('replies/webhook/', views.ReplyWebhookView.as_view(), name='reply-webhook'),
+]
@@ -1,3 +1,130 @@
-from django.shortcuts import render
+import hmac
+import logging
+from datetime import datetime, time, timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounting.models import DebtorAccount
+
+from .models import InboundReply, MessageBatch
+from .pagination import ReceivedAtKeysetPagination
+from .serializers import InboundReplySerializer, MessageBatchCreateSerializer, MessageBatchSerializer
+from .services.dispatcher import create_batch
+from .services.replies import get_reply_buffer, parse_reply
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchCreateView(generics.CreateAPIView):
+    """
+    Queue a batch of messages. Nothing is sent here: the response (202) carries
+    the batch id, and `dispatch_messages` workers send at the channel's rate.
+    """
+    queryset = MessageBatch.objects.all()
+    serializer_class = MessageBatchCreateSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        batch, stats = create_batch(data["channel"], data["messages"], name=data["name"])
+        return Response({**MessageBatchSerializer(batch).data, "duplicates": stats["duplicates"]},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class MessageBatchDetailView(generics.RetrieveAPIView):
+    """Batch delivery progress: message counts per status."""
+    queryset = MessageBatch.objects.all()
+    serializer_class = MessageBatchSerializer
+
+
+class ReplyWebhookView(APIView):
+    """
+    Gateway webhook for debtor replies: one reply object or a list. Replies
+    are validated and buffered, then written in bulk off the request, so the
+    gateway gets its 202 right away. Invalid items are reported, not retried.
+
+    The 202 is not durable: a worker killed before its next flush loses the
+    replies it buffered (see messaging.services.replies). With
+    MESSAGING_REPLY_FLUSH_SECONDS = 0 the replies are written before the
+    response, and a database error answers 503 so the gateway redelivers.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        token = settings.MESSAGING_WEBHOOK_TOKEN
+        if token and not hmac.compare_digest(request.headers.get("X-Webhook-Token", ""), token):
+            return Response({"detail": "Invalid webhook token."}, status=status.HTTP_403_FORBIDDEN)
+
+        payload = request.data
+        items = payload if isinstance(payload, list) else [payload]
+        replies, rejected = [], {}
+        for i, item in enumerate(items):
+            try:
+                replies.append(parse_reply(item))
+            except ValueError as e:
+                rejected[i] = str(e)
+        if replies:
+            try:
+                get_reply_buffer().add(replies)
+            except DatabaseError:
+                logger.exception("Writing %d replies failed; asking the gateway to retry.", len(replies))
+                return Response({"detail": "Replies could not be stored; retry later."},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({"accepted": len(replies), "rejected": rejected}, status=status.HTTP_202_ACCEPTED)
+
+
+def _parse_bound(value: str, end: bool) -> datetime:
+    """A date or datetime query bound; a bare date covers that whole day."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({"detail": f"Invalid date: {value!r}; expected YYYY-MM-DD or ISO 8601."})
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class InboundReplyListView(generics.ListAPIView):
+    """
+    Replies, newest first, with cursor pagination. Filters: `debtor` (id),
+    `account_code`, `status`, `channel`, `outbound` (message id),
+    `received_after` / `received_before` (date or datetime).
+    """
+    serializer_class = InboundReplySerializer
+    pagination_class = ReceivedAtKeysetPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = InboundReply.objects.select_related("debtor")
+        if params.get("account_code"):
+            # resolved up front so the listing stays on the (debtor, received_at, id) index
+            debtor_id = (DebtorAccount.objects.filter(account_code=params["account_code"])
+                         .values_list("id", flat=True).first())
+            if debtor_id is None:
+                return queryset.none()
+            queryset = queryset.filter(debtor_id=debtor_id)
+        for param, lookup in (("debtor", "debtor_id"), ("outbound", "outbound_id")):
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: int(params[param])})
+                except ValueError:
+                    raise ValidationError({param: "Must be an integer."})
+        if params.get("status"):
+            queryset = queryset.filter(status=params["status"])
+        if params.get("channel"):
+            queryset = queryset.filter(channel=params["channel"])
+        if params.get("received_after"):
+            queryset = queryset.filter(received_at__gte=_parse_bound(params["received_after"], end=False))
+        if params.get("received_before"):
+            queryset = queryset.filter(received_at__lt=_parse_bound(params["received_before"], end=True))
+        return queryset